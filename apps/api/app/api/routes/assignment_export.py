@@ -1,20 +1,22 @@
 from __future__ import annotations
 
-import csv
-import io
 import logging
-from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from collections.abc import AsyncIterator
+from typing import Any
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy import and_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_current_verified_user, get_db
 from app.core.security import verify_token
+from app.repositories import course_submissions as submissions_repo
 from app.repositories import users
 from app.models.course_assignment import CourseAssignment
 from app.models.course_participant import CourseParticipant, ParticipantRole
 from app.models.course_submission import CourseSubmission
 from app.models.user import User
+from app.services.csv_export import EXPORT_BATCH_SIZE, csv_response, export_filename, stream_rows
 
 router = APIRouter(prefix="/assignment-export", tags=["assignment-export"])
 
@@ -58,110 +60,80 @@ async def export_assignment_csv(
             detail="Tarea no encontrada"
         )
 
-    # Get all students in the course
-    students_result = await session.execute(
-        select(CourseParticipant).where(
-            and_(
-                CourseParticipant.course_id == assignment.course_id,
-                CourseParticipant.role == ParticipantRole.STUDENT
-            )
+    logger.info(f"Exporting assignment {assignment_id} to CSV")
+
+    async def _rows(stream_session: AsyncSession) -> AsyncIterator[list[Any]]:
+        yield CSV_HEADERS
+        roster = submissions_repo.stream_roster_submissions(
+            stream_session, assignment.course_id, assignment_id, batch_size=EXPORT_BATCH_SIZE
         )
+        async for student, submission in roster:
+            yield _student_row(student, submission, assignment)
+
+    return csv_response(
+        stream_rows(session, _rows),
+        export_filename("tarea", assignment.title),
     )
-    students = students_result.scalars().all()
-    
-    # Get all submissions for this assignment
-    submissions_result = await session.execute(
-        select(CourseSubmission).where(CourseSubmission.coursework_id == assignment_id)
-    )
-    submissions = submissions_result.scalars().all()
-    
-    # Create submission lookup by google_user_id
-    submissions_by_user = {sub.google_user_id: sub for sub in submissions}
-    
-    # Create CSV content
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
-    # Write header
-    headers = [
-        'Nombre del Estudiante',
-        'Email',
-        'Estado de Entrega',
-        'Fecha de Entrega',
-        'Es Tardía',
-        'Calificación Asignada',
-        'Calificación Borrador',
-        'Estado Detallado',
-        'Puntos Máximos',
-        'Porcentaje'
-    ]
-    writer.writerow(headers)
-    
-    # Write student data
-    for student in students:
-        submission = submissions_by_user.get(student.google_user_id)
-        
-        # Determine submission status
-        if submission:
-            if submission.state in ['TURNED_IN', 'RETURNED']:
-                estado = "Entregada"
-            elif submission.state == 'CREATED':
-                estado = "Borrador"
-            else:
-                estado = "Otro"
-                
-            fecha_entrega = submission.turned_in_at.strftime('%Y-%m-%d %H:%M:%S') if submission.turned_in_at else 'No entregada'
-            es_tardia = 'Sí' if submission.late else 'No'
-            calificacion = submission.assigned_grade if submission.assigned_grade is not None else ''
-            borrador = submission.draft_grade if submission.draft_grade is not None else ''
-            estado_detallado = submission.state
+
+
+CSV_HEADERS = [
+    'Nombre del Estudiante',
+    'Email',
+    'Estado de Entrega',
+    'Fecha de Entrega',
+    'Es Tardía',
+    'Calificación Asignada',
+    'Calificación Borrador',
+    'Estado Detallado',
+    'Puntos Máximos',
+    'Porcentaje'
+]
+
+
+def _student_row(
+    student: CourseParticipant,
+    submission: CourseSubmission | None,
+    assignment: CourseAssignment,
+) -> list[Any]:
+    # Determine submission status
+    if submission:
+        if submission.state in ['TURNED_IN', 'RETURNED']:
+            estado = "Entregada"
+        elif submission.state == 'CREATED':
+            estado = "Borrador"
         else:
-            estado = "Sin entregar"
-            fecha_entrega = 'No entregada'
-            es_tardia = 'No'
-            calificacion = ''
-            borrador = ''
-            estado_detallado = 'NO_SUBMISSION'
-        
-        # Calculate percentage if we have grade and max points
-        porcentaje = ''
-        if calificacion and assignment.max_points:
-            porcentaje = f"{(float(calificacion) / assignment.max_points * 100):.1f}%"
-        
-        row = [
-            student.full_name or 'Sin nombre',
-            student.email or 'Sin email',
-            estado,
-            fecha_entrega,
-            es_tardia,
-            calificacion,
-            borrador,
-            estado_detallado,
-            assignment.max_points or '',
-            porcentaje
-        ]
-        writer.writerow(row)
-    
-    # Prepare response
-    csv_content = output.getvalue()
-    output.close()
-    
-    # Generate filename
-    safe_title = "".join(c for c in assignment.title if c.isalnum() or c in (' ', '-', '_')).rstrip()[:50]
-    filename = f"tarea_{safe_title}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+            estado = "Otro"
+            
+        fecha_entrega = submission.turned_in_at.strftime('%Y-%m-%d %H:%M:%S') if submission.turned_in_at else 'No entregada'
+        es_tardia = 'Sí' if submission.late else 'No'
+        calificacion = submission.assigned_grade if submission.assigned_grade is not None else ''
+        borrador = submission.draft_grade if submission.draft_grade is not None else ''
+        estado_detallado = submission.state
+    else:
+        estado = "Sin entregar"
+        fecha_entrega = 'No entregada'
+        es_tardia = 'No'
+        calificacion = ''
+        borrador = ''
+        estado_detallado = 'NO_SUBMISSION'
     
-    logger.info(f"Exporting assignment {assignment_id} with {len(students)} students to CSV")
+    # Calculate percentage if we have grade and max points
+    porcentaje = ''
+    if calificacion and assignment.max_points:
+        porcentaje = f"{(float(calificacion) / assignment.max_points * 100):.1f}%"
     
-    # Return CSV file
-    return Response(
-        content=csv_content,
-        media_type='text/csv; charset=utf-8',
-        headers={
-            'Content-Disposition': f'attachment; filename="{filename}"',
-            'Access-Control-Expose-Headers': 'Content-Disposition',
-            'Cache-Control': 'no-cache',
-        }
-    )
+    return [
+        student.full_name or 'Sin nombre',
+        student.email or 'Sin email',
+        estado,
+        fecha_entrega,
+        es_tardia,
+        calificacion,
+        borrador,
+        estado_detallado,
+        assignment.max_points or '',
+        porcentaje
+    ]
 
 
 @router.get("/{assignment_id}/summary")
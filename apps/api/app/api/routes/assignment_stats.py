@@ -11,6 +11,7 @@ from app.models.course_assignment import CourseAssignment
 from app.models.course_participant import CourseParticipant, ParticipantRole
 from app.models.course_submission import CourseSubmission
 from app.models.user import User
+from app.repositories import course_metrics as course_metrics_repo
 
 router = APIRouter(prefix="/assignment-stats", tags=["assignment-stats"])
 
@@ -55,17 +56,20 @@ async def get_assignment_statistics(
     # Create submission lookup by google_user_id
     submissions_by_user = {sub.google_user_id: sub for sub in submissions}
     
-    # Build statistics
+    # Build statistics; the counters come from the rollup kept by the sync when available
     total_students = len(students)
-    submitted_count = len([s for s in submissions if s.state in ['TURNED_IN', 'RETURNED']])
-    draft_count = len([s for s in submissions if s.state == 'CREATED'])
+    rollup = await course_metrics_repo.get_assignment(session, assignment.course_id, assignment_id)
+    if rollup is not None:
+        submitted_count, draft_count, late_count = rollup.submitted, rollup.drafts, rollup.late
+    else:
+        submitted_count = len([s for s in submissions if s.state in ['TURNED_IN', 'RETURNED']])
+        draft_count = len([s for s in submissions if s.state == 'CREATED'])
+        late_count = len([s for s in submissions if s.late])
     
     # Count students who have any submission (draft or final)
     students_with_submissions = set(s.google_user_id for s in submissions)
     not_submitted_count = total_students - len(students_with_submissions)
     
-    late_count = len([s for s in submissions if s.late])
-    
     logger.info(f"Stats for assignment {assignment_id}: {total_students} students, {len(submissions)} submissions, {submitted_count} final, {draft_count} drafts")
     
     # Build student details
@@ -9,6 +9,7 @@ from app.api.deps import get_current_verified_user, get_db, require_roles
 from app.models.attendance import Attendance
 from app.models.user import User, UserRole
 from app.repositories import attendance as attendance_repo
+from app.repositories import course_data_versions as data_versions_repo
 from app.schemas.attendance import AttendanceCreate, AttendanceRead
 from app.services.analytics import summarize_attendance
 
@@ -56,6 +57,8 @@ async def create_attendance(
     session: AsyncSession = Depends(get_db),
     _: User = Depends(require_roles(UserRole.ADMIN, UserRole.COORDINATOR, UserRole.TEACHER)),
 ) -> AttendanceRead:
+    # Same transaction as the insert (the repository commits)
+    await data_versions_repo.bump(session, [payload.course_id])
     attendance = await attendance_repo.create(session, payload)
     return AttendanceRead.model_validate(attendance)
 
@@ -66,5 +69,6 @@ async def create_bulk_attendance(
     session: AsyncSession = Depends(get_db),
     _: User = Depends(require_roles(UserRole.ADMIN, UserRole.COORDINATOR, UserRole.TEACHER)),
 ) -> list[AttendanceRead]:
+    await data_versions_repo.bump(session, [item.course_id for item in payload])
     attendances = await attendance_repo.create_bulk(session, payload)
     return [AttendanceRead.model_validate(attendance) for attendance in attendances]
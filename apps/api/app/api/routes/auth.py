@@ -34,6 +34,7 @@ from app.services.google_oauth import (
     GOOGLE_AUTH_URL,
     GOOGLE_TOKEN_URL,
     GOOGLE_USERINFO_URL,
+    google_token_manager,
 )
 from urllib.parse import urlencode, urlparse
 import logging
@@ -298,6 +299,7 @@ async def google_exchange(
         refresh_token=google_refresh_token,
         expires_at=google_token_expires_at,
     )
+    google_token_manager.store(user.id, credential.access_token, credential.token_expires_at)
 
     google_refresh_token = credential.refresh_token
 
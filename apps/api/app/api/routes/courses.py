@@ -7,6 +7,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.api.deps import get_current_verified_user, get_db, require_roles
 from app.models.course import Course
 from app.models.user import User, UserRole
+from app.repositories import course_data_versions as data_versions_repo
 from app.repositories import courses
 from app.schemas.course import CourseCreate, CourseRead, CourseUpdate
 
@@ -76,6 +77,8 @@ async def update_course_endpoint(
     if not course:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Curso no encontrado")
 
+    # Same transaction as the update (the repository commits)
+    await data_versions_repo.bump(session, [course.id])
     course = await courses.update(session, course, payload)
     return CourseRead.model_validate(course)
 
@@ -90,5 +93,7 @@ async def delete_course_endpoint(
     if not course:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Curso no encontrado")
 
+    # The version row outlives the course, so a re-created id never hits old entries
+    await data_versions_repo.bump(session, [course.id])
     await courses.delete(session, course)
     return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -15,6 +15,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.api.deps import get_current_verified_user, get_db, require_roles
 from app.models.notification import Notification, NotificationStatus
 from app.models.user import User, UserRole
+from app.repositories import course_data_versions as data_versions_repo
 from app.repositories import notifications as notifications_repo
 from app.schemas.notification import (
     NotificationCreate,
@@ -64,6 +65,8 @@ async def create_notification(
     session: AsyncSession = Depends(get_db),
     _: User = Depends(require_roles(UserRole.ADMIN, UserRole.COORDINATOR, UserRole.TEACHER)),
 ) -> NotificationRead:
+    # Same transaction as the insert (the repository commits)
+    await data_versions_repo.bump_for_students(session, [payload.student_id])
     notification = await notifications_repo.create(session, payload)
     read_model = NotificationRead.model_validate(notification)
     await notification_hub.broadcast(notification.student_id, {"event": "created", "notification": read_model.model_dump()})
@@ -81,6 +84,7 @@ async def update_notification(
     if not notification:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Notificación no encontrada")
 
+    await data_versions_repo.bump_for_students(session, [notification.student_id])
     notification = await notifications_repo.update(session, notification, payload)
     read_model = NotificationRead.model_validate(notification)
     await notification_hub.broadcast(
@@ -99,6 +103,7 @@ async def delete_notification(
     if not notification:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Notificación no encontrada")
 
+    await data_versions_repo.bump_for_students(session, [notification.student_id])
     await notifications_repo.delete(session, notification)
     await notification_hub.broadcast(notification.student_id, {"event": "deleted", "id": notification_id})
     return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -125,6 +130,7 @@ async def send_test_assignment_notification(
     from app.repositories import course_participants as participants_repo
     from app.repositories import user_contacts as user_contacts_repo
     from app.models.course_participant import ParticipantRole
+    from app.services.notifications.base import OutboundMessage
     from app.services.notifications.http_wa import get_notifier
     
     notifier = get_notifier()
@@ -155,16 +161,17 @@ async def send_test_assignment_notification(
         f"*Este es un mensaje de prueba.*"
     )
     
-    # Send to all students with phone numbers
-    notifications_sent = 0
-    for participant in participants:
-        if participant.matched_user_id and participant.matched_user_id in phone_map:
-            phone = phone_map[participant.matched_user_id]
-            try:
-                await notifier.send_message(phone, message)
-                notifications_sent += 1
-            except Exception as e:
-                logger.exception("Error sending test notification to %s", phone)
+    # Send to all students with phone numbers in one batch
+    phones = [
+        phone_map[participant.matched_user_id]
+        for participant in participants
+        if participant.matched_user_id and participant.matched_user_id in phone_map
+    ]
+    errors = await notifier.send_bulk([OutboundMessage(phone, message) for phone in phones])
+    for phone, error in zip(phones, errors):
+        if error is not None:
+            logger.error("Error sending test notification to %s: %s", phone, error)
+    notifications_sent = sum(1 for error in errors if error is None)
     
     return {
         "status": "sent", 
@@ -180,5 +187,8 @@ async def notifications_stream(channel: str, websocket: WebSocket) -> None:
     try:
         while True:
             await websocket.receive_text()
-    except WebSocketDisconnect:
+    except (WebSocketDisconnect, RuntimeError):
+        # RuntimeError: the hub already closed the socket (slow consumer).
+        pass
+    finally:
         await notification_hub.disconnect(websocket, channel)
@@ -8,6 +8,7 @@ from app.api.deps import get_current_verified_user, get_db, require_roles
 from app.models.notification import NotificationStatus
 from app.models.student import Student
 from app.models.user import User, UserRole
+from app.repositories import course_data_versions as data_versions_repo
 from app.repositories import notifications as notifications_repo
 from app.repositories import students as students_repo
 from app.schemas.attendance import AttendanceRead
@@ -161,6 +162,8 @@ async def update_student_endpoint(
     if not student:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Estudiante no encontrado")
 
+    # Same transaction as the update (the repository commits)
+    await data_versions_repo.bump_for_students(session, [student.id])
     student = await students_repo.update(session, student, payload)
     return StudentRead.model_validate(student)
 
@@ -175,5 +178,7 @@ async def delete_student_endpoint(
     if not student:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Estudiante no encontrado")
 
+    # Resolved before the delete cascades to attendance and notifications
+    await data_versions_repo.bump_for_students(session, [student.id])
     await students_repo.delete(session, student)
     return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -86,10 +86,43 @@ class Settings(BaseSettings):
     google_oauth_redirect_uri: str = "http://localhost:5001/oauth/callback"
 
     classroom_scheduler_user_id: str | None = None
+    classroom_sync_workers: int = 4
+    classroom_scheduler_workers: int = 4
+    classroom_job_lease_seconds: int = 60
+    sync_lease_backend: str = "auto"
+    classroom_poll_min_seconds: int = 60
+    classroom_poll_base_seconds: int = 300
+    classroom_poll_max_seconds: int = 3600
+    sync_run_retention_days: int = 30
+
+    http_max_connections: int = 100
+    http_max_keepalive_connections: int = 20
+    http_keepalive_expiry: float = 30.0
+    http_timeout_seconds: float = 20.0
+
+    google_rate_limit_per_second: float = 10.0
+    google_rate_limit_burst: int = 20
+    google_max_concurrency: int = 12
+    google_throttle_retries: int = 5
 
     wa_http_base_url: str | None = None
     wa_http_api_key: str | None = None
     wa_http_timeout: float = 20.0
+    wa_delivery_mode: str = "auto"
+    wa_redis_queue: str = "whatsapp:pending"
+
+    notification_dispatch_concurrency: int = 8
+    notification_dispatch_batch: int = 100
+    notification_max_attempts: int = 5
+    notification_poll_seconds: float = 5.0
+    notification_backplane: str = "auto"
+    notification_ws_queue_size: int = 100
+    notification_ws_send_timeout: float = 5.0
+    notification_ws_drop_policy: str = "drop_oldest"
+
+    report_cache_backend: str = "auto"
+    report_cache_ttl_seconds: float = 300.0
+    report_cache_max_entries: int = 256
 
     @field_validator("cors_origins", mode="before")
     @classmethod
@@ -1,16 +1,25 @@
 from app.db.session import Base  # noqa: F401
 from app.models import (
+    assignment_announcement,
     attendance,
     course,
     course_assignment,
+    course_data_version,
     course_membership,
+    course_metrics,
     course_participant,
     course_submission,
+    course_sync_schedule,
     etag_cache,
     notification,
+    notification_outbox,
     oauth_credential,
     report,
     student,
+    sync_job,
+    sync_lease,
+    sync_run,
+    sync_watermark,
     token,
     user,
     user_contact,
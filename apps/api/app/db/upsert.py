@@ -0,0 +1,78 @@
+from collections.abc import Iterable, Sequence
+from typing import Any
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+SUPPORTED_DIALECTS = {"sqlite", "postgresql"}
+
+
+def dialect_name(session: AsyncSession) -> str:
+    return session.get_bind().dialect.name
+
+
+def supports_upsert(session: AsyncSession) -> bool:
+    return dialect_name(session) in SUPPORTED_DIALECTS
+
+
+def upsert_statement(
+    session: AsyncSession,
+    model: Any,
+    *,
+    index_elements: Sequence[str],
+    update_columns: Iterable[str],
+    where: Any = None,
+) -> Any:
+    """Build an ``INSERT ... ON CONFLICT DO UPDATE`` for the session's dialect.
+
+    The statement is meant to be executed with a list of row dicts (executemany),
+    and copies ``update_columns`` from the excluded row when the key already exists.
+    ``where`` restricts which existing rows may be overwritten.
+    """
+
+    name = dialect_name(session)
+    stmt: postgresql.Insert | sqlite.Insert
+    if name == "postgresql":
+        stmt = postgresql.insert(model)
+    elif name == "sqlite":
+        stmt = sqlite.insert(model)
+    else:  # pragma: no cover - guarded by supports_upsert
+        raise NotImplementedError(f"Upsert no soportado para el dialecto {name}")
+
+    columns = list(update_columns)
+    if not columns:
+        return stmt.on_conflict_do_nothing(index_elements=list(index_elements))
+    return stmt.on_conflict_do_update(
+        index_elements=list(index_elements),
+        set_={column: getattr(stmt.excluded, column) for column in columns},
+        where=where,
+    )
+
+
+def increment_statement(
+    session: AsyncSession,
+    model: Any,
+    *,
+    index_elements: Sequence[str],
+    increment_columns: Iterable[str],
+    set_columns: Iterable[str] = (),
+) -> Any:
+    """Build an ``INSERT ... ON CONFLICT`` that adds the row's values to the stored ones.
+
+    New keys are inserted as given; existing rows get ``column = column + excluded.column``
+    for ``increment_columns`` and a plain copy for ``set_columns``.
+    """
+
+    name = dialect_name(session)
+    stmt: postgresql.Insert | sqlite.Insert
+    if name == "postgresql":
+        stmt = postgresql.insert(model)
+    elif name == "sqlite":
+        stmt = sqlite.insert(model)
+    else:  # pragma: no cover - guarded by supports_upsert
+        raise NotImplementedError(f"Upsert no soportado para el dialecto {name}")
+
+    table = model.__table__
+    set_ = {column: table.c[column] + getattr(stmt.excluded, column) for column in increment_columns}
+    set_.update({column: getattr(stmt.excluded, column) for column in set_columns})
+    return stmt.on_conflict_do_update(index_elements=list(index_elements), set_=set_)
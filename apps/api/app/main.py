@@ -1,3 +1,4 @@
+import asyncio
 import logging
 
 from fastapi import FastAPI
@@ -9,9 +10,16 @@ from app.core.config import settings
 from app.core.logging import configure_logging
 from app.db.session import AsyncSessionLocal, Base, sync_engine
 from app.models.user import User, UserRole
+from app.services.classroom_jobs import fail_interrupted_jobs, shutdown_jobs
 from app.services.google_oauth import GoogleOAuthError, ensure_google_access_token
+from app.services.http_client import close_http_client, open_http_client
+from app.services.notifications import notification_hub
+from app.services.notifications.dispatcher import notification_dispatcher
+from app.services.redis_client import close_redis
 from app.sync.scheduler import shutdown_scheduler, start_scheduler
 
+TOKEN_REFRESH_CONCURRENCY = 8
+
 
 def create_app() -> FastAPI:
     configure_logging()
@@ -31,6 +39,10 @@ def create_app() -> FastAPI:
     @app.on_event("startup")
     async def on_startup() -> None:  # pragma: no cover - boot hook
         Base.metadata.create_all(bind=sync_engine)
+        await open_http_client()
+        await fail_interrupted_jobs()
+        notification_dispatcher.start()
+        await notification_hub.start()
 
         async def _token_provider() -> list[tuple[str, str]]:
             async with AsyncSessionLocal() as session:
@@ -41,34 +53,44 @@ def create_app() -> FastAPI:
                     )
                 )
                 target_user_ids = set(result.scalars().all())
-                if settings.classroom_scheduler_user_id:
-                    target_user_ids.add(settings.classroom_scheduler_user_id)
+            if settings.classroom_scheduler_user_id:
+                target_user_ids.add(settings.classroom_scheduler_user_id)
+
+            slots = asyncio.Semaphore(TOKEN_REFRESH_CONCURRENCY)
 
-                tokens: list[tuple[str, str]] = []
-                for user_id in target_user_ids:
+            async def _token_for(user_id: str) -> tuple[str, str] | None:
+                async with slots, AsyncSessionLocal() as session:
                     try:
-                        token = await ensure_google_access_token(
-                            session,
-                            user_id,
-                            force_refresh=True,
-                        )
+                        # Cached until shortly before expiry; refreshes are single-flight.
+                        token = await ensure_google_access_token(session, user_id)
                     except GoogleOAuthError as exc:
                         logger.debug(
                             "No hay token válido de Classroom para scheduler user=%s: %s",
                             user_id,
                             exc,
                         )
-                        continue
-                    tokens.append((user_id, token))
-                if not tokens:
-                    logger.info("Scheduler: sin coordinadores con token válido por ahora")
-                return tokens
+                        return None
+                return user_id, token
+
+            tokens = [
+                item
+                for item in await asyncio.gather(*(_token_for(user_id) for user_id in target_user_ids))
+                if item is not None
+            ]
+            if not tokens:
+                logger.info("Scheduler: sin coordinadores con token válido por ahora")
+            return tokens
 
         start_scheduler(_token_provider)
 
     @app.on_event("shutdown")
     async def on_shutdown() -> None:  # pragma: no cover - shutdown hook
         shutdown_scheduler()
+        await shutdown_jobs()
+        await notification_dispatcher.stop()
+        await notification_hub.stop()
+        await close_http_client()
+        await close_redis()
 
     return app
 
@@ -0,0 +1,15 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, String
+
+from app.db.session import Base
+
+
+class PendingAssignmentAnnouncement(Base):
+    """A new assignment not yet announced, written in the transaction of its course sync."""
+
+    __tablename__ = "pending_assignment_announcements"
+
+    course_id = Column(String, primary_key=True)
+    coursework_id = Column(String, primary_key=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -0,0 +1,15 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, String
+
+from app.db.session import Base
+
+
+class CourseDataVersion(Base):
+    """Bumped in the same transaction as any write a course report depends on."""
+
+    __tablename__ = "course_data_versions"
+
+    course_id = Column(String, primary_key=True)
+    version = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
@@ -0,0 +1,38 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Integer, String
+
+from app.db.session import Base
+
+
+class _SubmissionCounters:
+    """Rollup counters kept in step with ``course_submissions`` by the sync."""
+
+    total = Column(Integer, default=0, nullable=False)
+    submitted = Column(Integer, default=0, nullable=False)
+    drafts = Column(Integer, default=0, nullable=False)
+    late = Column(Integer, default=0, nullable=False)
+    graded = Column(Integer, default=0, nullable=False)
+    grade_sum = Column(Float, default=0.0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+
+class CourseMetrics(_SubmissionCounters, Base):
+    __tablename__ = "course_metrics"
+
+    course_id = Column(String, ForeignKey("courses.id", ondelete="CASCADE"), primary_key=True)
+
+
+class StudentCourseMetrics(_SubmissionCounters, Base):
+    __tablename__ = "student_course_metrics"
+
+    course_id = Column(String, ForeignKey("courses.id", ondelete="CASCADE"), primary_key=True)
+    google_user_id = Column(String, primary_key=True)
+
+
+class AssignmentMetrics(_SubmissionCounters, Base):
+    __tablename__ = "assignment_metrics"
+
+    # Classroom coursework ids are only unique within their course
+    course_id = Column(String, ForeignKey("courses.id", ondelete="CASCADE"), primary_key=True)
+    coursework_id = Column(String, primary_key=True)
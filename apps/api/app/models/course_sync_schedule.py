@@ -0,0 +1,19 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Float, Integer, String
+
+from app.db.session import Base
+
+
+class CourseSyncSchedule(Base):
+    __tablename__ = "course_sync_schedules"
+
+    course_id = Column(String, primary_key=True)
+    change_rate = Column(Float, default=0.0, nullable=False)
+    interval_seconds = Column(Integer, nullable=False)
+    last_updates = Column(Integer, default=0, nullable=False)
+    last_synced_at = Column(DateTime, nullable=True)
+    next_sync_at = Column(DateTime, nullable=False, index=True)
+    updated_at = Column(
+        DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False
+    )
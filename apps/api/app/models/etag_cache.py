@@ -10,7 +10,11 @@ class EtagCache(Base):
 
     course_id = Column(String, primary_key=True)
     cache_key = Column(String, primary_key=True)
+    # Cursor the page was requested with ("" for the first page) and the cursor of
+    # the following page, so a 304 can still be followed through the collection.
+    page_token = Column(String, primary_key=True, default="")
     etag = Column(String, nullable=True)
+    next_page_token = Column(String, nullable=True)
     updated_at = Column(
         DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False
     )
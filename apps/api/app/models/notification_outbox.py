@@ -0,0 +1,33 @@
+from datetime import datetime
+from enum import Enum
+
+from sqlalchemy import Column, DateTime, Enum as SqlEnum, Integer, String, Text
+
+from app.db.session import Base
+
+
+class OutboxStatus(str, Enum):
+    PENDING = "pending"
+    SENT = "sent"
+    FAILED = "failed"
+
+
+class NotificationOutbox(Base):
+    __tablename__ = "notification_outbox"
+
+    # Deterministic per intent (e.g. one per submission change or per assignment
+    # and student), so re-running a sync never enqueues the same message twice.
+    id = Column(String, primary_key=True)
+    kind = Column(String(50), nullable=False)
+    user_id = Column(String, nullable=True, index=True)
+    phone = Column(String(32), nullable=True)
+    email = Column(String, nullable=True)
+    message = Column(Text, nullable=False)
+    status = Column(SqlEnum(OutboxStatus), default=OutboxStatus.PENDING, nullable=False, index=True)
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    locked_by = Column(String, nullable=True)
+    locked_until = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    sent_at = Column(DateTime, nullable=True)
@@ -0,0 +1,44 @@
+from datetime import datetime
+from enum import Enum
+
+from sqlalchemy import Column, DateTime, Enum as SqlEnum, ForeignKey, Index, Integer, String, Text
+
+from app.db.session import Base
+
+
+class SyncJobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+class SyncJob(Base):
+    __tablename__ = "sync_jobs"
+
+    id = Column(String, primary_key=True)
+    user_id = Column(String, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    status = Column(SqlEnum(SyncJobStatus), default=SyncJobStatus.QUEUED, nullable=False, index=True)
+    total_courses = Column(Integer, default=0, nullable=False)
+    completed_courses = Column(Integer, default=0, nullable=False)
+    progress = Column(Text, nullable=True)
+    result = Column(Text, nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    # Process running the job; it renews the lease while it works, so only jobs
+    # whose lease lapsed (their process died) are considered interrupted.
+    owner = Column(String, nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True, index=True)
+
+
+# A user only ever has one import in flight, even across requests and replicas
+_ACTIVE = SyncJob.status.in_([SyncJobStatus.QUEUED, SyncJobStatus.RUNNING])
+Index(
+    "uq_sync_jobs_active_user",
+    SyncJob.user_id,
+    unique=True,
+    sqlite_where=_ACTIVE,
+    postgresql_where=_ACTIVE,
+)
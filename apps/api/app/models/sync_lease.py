@@ -0,0 +1,14 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, String
+
+from app.db.session import Base
+
+
+class SyncLease(Base):
+    __tablename__ = "sync_leases"
+
+    name = Column(String, primary_key=True)
+    owner = Column(String, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    acquired_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -0,0 +1,31 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Float, Integer, String, Text
+
+from app.db.session import Base
+
+
+class SyncRun(Base):
+    __tablename__ = "sync_runs"
+
+    id = Column(String, primary_key=True)
+    kind = Column(String(20), nullable=False, index=True)
+    trigger = Column(String(20), nullable=False)
+    user_id = Column(String, nullable=True, index=True)
+    status = Column(String(20), nullable=False)
+    started_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    finished_at = Column(DateTime, nullable=True)
+    duration_seconds = Column(Float, default=0.0, nullable=False)
+    courses = Column(Integer, default=0, nullable=False)
+    requests = Column(Integer, default=0, nullable=False)
+    not_modified = Column(Integer, default=0, nullable=False)
+    bytes = Column(Integer, default=0, nullable=False)
+    rows_inserted = Column(Integer, default=0, nullable=False)
+    rows_updated = Column(Integer, default=0, nullable=False)
+    rows_deleted = Column(Integer, default=0, nullable=False)
+    fetch_seconds = Column(Float, default=0.0, nullable=False)
+    parse_seconds = Column(Float, default=0.0, nullable=False)
+    db_seconds = Column(Float, default=0.0, nullable=False)
+    notify_seconds = Column(Float, default=0.0, nullable=False)
+    course_breakdown = Column(Text, nullable=True)
+    error = Column(Text, nullable=True)
@@ -0,0 +1,16 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, String
+
+from app.db.session import Base
+
+
+class SyncWatermark(Base):
+    __tablename__ = "sync_watermarks"
+
+    course_id = Column(String, primary_key=True)
+    cache_key = Column(String, primary_key=True)
+    high_water_mark = Column(DateTime, nullable=True)
+    updated_at = Column(
+        DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False
+    )
@@ -0,0 +1,52 @@
+from collections.abc import Sequence
+from datetime import datetime
+
+from sqlalchemy import delete, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.upsert import supports_upsert, upsert_statement
+from app.models.assignment_announcement import PendingAssignmentAnnouncement
+from app.models.course_assignment import CourseAssignment
+
+
+async def add(session: AsyncSession, course_id: str, coursework_id: str) -> None:
+    """Mark an assignment as pending announcement in the caller's transaction."""
+
+    row = {"course_id": course_id, "coursework_id": coursework_id, "created_at": datetime.utcnow()}
+    if supports_upsert(session):
+        stmt = upsert_statement(
+            session,
+            PendingAssignmentAnnouncement,
+            index_elements=["course_id", "coursework_id"],
+            update_columns=(),
+        )
+        await session.execute(stmt, [row])
+        return
+    await session.merge(PendingAssignmentAnnouncement(**row))  # pragma: no cover
+
+
+async def take_pending(session: AsyncSession) -> Sequence[CourseAssignment]:
+    """Delete every pending row and return the assignments they point to.
+
+    The rows are claimed with ``DELETE ... RETURNING``: two processes running the
+    digest at once never both get the same row, and if the caller rolls back they
+    stay pending. Rows whose assignment has been deleted since are dropped.
+    """
+
+    result = await session.execute(
+        delete(PendingAssignmentAnnouncement).returning(
+            PendingAssignmentAnnouncement.course_id, PendingAssignmentAnnouncement.coursework_id
+        )
+    )
+    keys = [tuple(row) for row in result.all()]
+    if not keys:
+        return []
+    assignments = await session.execute(
+        select(CourseAssignment)
+        .where(tuple_(CourseAssignment.course_id, CourseAssignment.id).in_(keys))
+        .order_by(CourseAssignment.course_id, CourseAssignment.id)
+    )
+    return assignments.scalars().all()
+
+
+__all__ = ["add", "take_pending"]
@@ -3,7 +3,7 @@ from datetime import datetime
 from typing import Optional
 import json
 
-from sqlalchemy import select
+from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.course_assignment import CourseAssignment
@@ -81,6 +81,16 @@ async def list_for_course(session: AsyncSession, course_id: str) -> Sequence[Cou
     return result.scalars().all()
 
 
+async def next_due_at(session: AsyncSession, course_id: str, since: datetime) -> datetime | None:
+    result = await session.execute(
+        select(func.min(CourseAssignment.due_at)).where(
+            CourseAssignment.course_id == course_id,
+            CourseAssignment.due_at >= since,
+        )
+    )
+    return result.scalar_one_or_none()
+
+
 async def delete(session: AsyncSession, assignment: CourseAssignment) -> None:
     await session.delete(assignment)
     await session.flush()
@@ -0,0 +1,65 @@
+from collections.abc import Iterable
+from datetime import datetime
+
+from sqlalchemy import select, union, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.upsert import increment_statement, supports_upsert
+from app.models.attendance import Attendance
+from app.models.course_data_version import CourseDataVersion
+from app.models.course_participant import CourseParticipant
+
+
+async def get(session: AsyncSession, course_id: str) -> int:
+    result = await session.execute(
+        select(CourseDataVersion.version).where(CourseDataVersion.course_id == course_id)
+    )
+    return result.scalar_one_or_none() or 0
+
+
+async def bump(session: AsyncSession, course_ids: Iterable[str]) -> None:
+    """Increment the data version of ``course_ids``; visible once the caller commits."""
+
+    now = datetime.utcnow()
+    rows = [{"course_id": course_id, "version": 1, "updated_at": now} for course_id in set(course_ids)]
+    if not rows:
+        return
+    if supports_upsert(session):
+        stmt = increment_statement(
+            session,
+            CourseDataVersion,
+            index_elements=["course_id"],
+            increment_columns=["version"],
+            set_columns=["updated_at"],
+        )
+        await session.execute(stmt, rows)
+        return
+
+    for row in rows:  # pragma: no cover - only sqlite/postgresql are deployed
+        result = await session.execute(
+            update(CourseDataVersion)
+            .where(CourseDataVersion.course_id == row["course_id"])
+            .values(version=CourseDataVersion.version + 1, updated_at=row["updated_at"])
+        )
+        if not result.rowcount:
+            session.add(CourseDataVersion(**row))
+    await session.flush()
+
+
+async def bump_for_students(session: AsyncSession, student_ids: Iterable[str]) -> None:
+    """Bump every course whose report shows data of ``student_ids``.
+
+    The comprehensive report lists notifications by participant id and counts
+    attendance by course, so both links are followed.
+    """
+
+    student_ids = list(set(student_ids))
+    if not student_ids:
+        return
+    result = await session.execute(
+        union(
+            select(CourseParticipant.course_id).where(CourseParticipant.id.in_(student_ids)),
+            select(Attendance.course_id).where(Attendance.student_id.in_(student_ids)),
+        )
+    )
+    await bump(session, result.scalars().all())
@@ -0,0 +1,161 @@
+from collections import defaultdict
+from collections.abc import Iterable, Sequence
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.upsert import increment_statement, supports_upsert
+from app.models.course_metrics import AssignmentMetrics, CourseMetrics, StudentCourseMetrics
+from app.models.course_submission import CourseSubmission
+from app.repositories.course_report_aggregates import DRAFT_STATE, SUBMITTED_STATES, tally_columns
+from app.repositories.course_submissions import SubmissionSnapshot
+
+COUNTER_FIELDS = ("total", "submitted", "drafts", "late", "graded", "grade_sum")
+
+# (model, submission columns it is grouped by, primary key columns)
+_ROLLUPS: tuple[tuple[Any, tuple[str, ...], tuple[str, ...]], ...] = (
+    (CourseMetrics, ("course_id",), ("course_id",)),
+    (StudentCourseMetrics, ("course_id", "google_user_id"), ("course_id", "google_user_id")),
+    (AssignmentMetrics, ("course_id", "coursework_id"), ("course_id", "coursework_id")),
+)
+
+
+def _contribution(snapshot: SubmissionSnapshot) -> tuple[float, ...]:
+    """What a single submission adds to each counter of ``COUNTER_FIELDS``."""
+
+    grade = snapshot.assigned_grade
+    return (
+        1,
+        int(snapshot.state in SUBMITTED_STATES),
+        int(snapshot.state == DRAFT_STATE),
+        int(bool(snapshot.late)),
+        int(grade is not None),
+        grade if grade is not None else 0.0,
+    )
+
+
+async def apply_submission_changes(
+    session: AsyncSession,
+    changes: Iterable[tuple[SubmissionSnapshot | None, SubmissionSnapshot | None]],
+) -> None:
+    """Fold the ``(previous, current)`` pairs of a submission write into the rollups.
+
+    ``previous`` is ``None`` for inserts and ``current`` is ``None`` for deletes.
+    Each pair contributes ``current - previous`` to its course, student and
+    assignment rows; the net deltas are applied with one increment upsert per table.
+    Courses that were never rolled up are rebuilt from scratch instead, so a
+    partial delta never passes for the full count. Call it after the write.
+    """
+
+    deltas: dict[Any, defaultdict[tuple[str, ...], list[float]]] = {
+        model: defaultdict(lambda: [0] * len(COUNTER_FIELDS)) for model, _, _ in _ROLLUPS
+    }
+    courses: set[str] = set()
+    for prev, current in changes:
+        for snapshot, sign in ((prev, -1), (current, 1)):
+            if snapshot is None:
+                continue
+            courses.add(snapshot.course_id)
+            contribution = _contribution(snapshot)
+            for model, keys, _ in _ROLLUPS:
+                counters = deltas[model][tuple(getattr(snapshot, key) for key in keys)]
+                for position, value in enumerate(contribution):
+                    counters[position] += sign * value
+    if not courses:
+        return
+
+    rolled_up = set(
+        (
+            await session.execute(
+                select(CourseMetrics.course_id).where(CourseMetrics.course_id.in_(courses))
+            )
+        ).scalars()
+    )
+    if not supports_upsert(session):  # pragma: no cover - only sqlite/postgresql are deployed
+        rolled_up = set()
+    for course_id in courses - rolled_up:
+        await rebuild(session, course_id)
+
+    now = datetime.utcnow()
+    for model, keys, primary_key in _ROLLUPS:
+        rows = []
+        for key, counters in deltas[model].items():
+            values = dict(zip(keys, key))
+            if values["course_id"] in rolled_up and any(counters):
+                rows.append({**values, **dict(zip(COUNTER_FIELDS, counters)), "updated_at": now})
+        if rows:
+            stmt = increment_statement(
+                session,
+                model,
+                index_elements=primary_key,
+                increment_columns=COUNTER_FIELDS,
+                set_columns=("updated_at",),
+            )
+            await session.execute(stmt, rows)
+
+
+async def rebuild(session: AsyncSession, course_id: str | None = None) -> None:
+    """Recompute the rollups from ``course_submissions`` (one course, or all of them)."""
+
+    for model, keys, _ in _ROLLUPS:
+        clear = delete(model)
+        source = select(*(getattr(CourseSubmission, key) for key in keys), *tally_columns())
+        if course_id is not None:
+            clear = clear.where(model.course_id == course_id)
+            source = source.where(CourseSubmission.course_id == course_id)
+        await session.execute(clear)
+        await session.execute(
+            insert(model).from_select(
+                [*keys, *COUNTER_FIELDS],
+                source.group_by(*(getattr(CourseSubmission, key) for key in keys)),
+            )
+        )
+
+
+# The increments are core statements that bypass the identity map, so every
+# read refreshes whatever the session may already hold.
+
+
+async def get_course(session: AsyncSession, course_id: str) -> CourseMetrics | None:
+    return await session.get(CourseMetrics, course_id, populate_existing=True)
+
+
+async def get_assignment(
+    session: AsyncSession, course_id: str, coursework_id: str
+) -> AssignmentMetrics | None:
+    return await session.get(
+        AssignmentMetrics,
+        {"course_id": course_id, "coursework_id": coursework_id},
+        populate_existing=True,
+    )
+
+
+async def list_students(session: AsyncSession, course_id: str) -> Sequence[StudentCourseMetrics]:
+    result = await session.execute(
+        select(StudentCourseMetrics).where(
+            StudentCourseMetrics.course_id == course_id, StudentCourseMetrics.total > 0
+        ).execution_options(populate_existing=True)
+    )
+    return result.scalars().all()
+
+
+async def list_assignments(session: AsyncSession, course_id: str) -> Sequence[AssignmentMetrics]:
+    result = await session.execute(
+        select(AssignmentMetrics).where(
+            AssignmentMetrics.course_id == course_id, AssignmentMetrics.total > 0
+        ).execution_options(populate_existing=True)
+    )
+    return result.scalars().all()
+
+
+__all__ = [
+    "COUNTER_FIELDS",
+    "apply_submission_changes",
+    "get_assignment",
+    "get_course",
+    "list_assignments",
+    "list_students",
+    "rebuild",
+]
@@ -1,10 +1,11 @@
-from collections.abc import Sequence
+from collections.abc import Iterable, Sequence
 from datetime import datetime
-from typing import Optional
+from typing import Any, Optional
 
-from sqlalchemy import select
+from sqlalchemy import delete as sa_delete, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.db.upsert import supports_upsert, upsert_statement
 from app.models.course_participant import CourseParticipant, ParticipantRole
 from app.utils.ids import generate_id
 
@@ -58,6 +59,93 @@ async def upsert(
     return participant
 
 
+async def bulk_upsert(
+    session: AsyncSession,
+    course_id: str,
+    rows: Iterable[dict[str, Any]],
+) -> list[dict[str, Any]]:
+    """Upsert a whole roster of a course with one ``INSERT ... ON CONFLICT``.
+
+    Rows carry the keyword arguments of :func:`upsert` (minus ``course_id``) and keep
+    its merge rules: missing email, name or photo never overwrite stored values.
+    Returns the values written for each participant, keyed like the model columns.
+    """
+
+    existing = {p.google_user_id: p for p in await list_for_course(session, course_id)}
+    now = datetime.utcnow()
+    values_by_google_id: dict[str, dict[str, Any]] = {}
+    for row in rows:
+        google_user_id = row["google_user_id"]
+        current = existing.get(google_user_id)
+        values_by_google_id[google_user_id] = {
+            "id": current.id if current else generate_id(),
+            "course_id": course_id,
+            "google_user_id": google_user_id,
+            "email": row.get("email") or (current.email if current else None),
+            "full_name": row.get("full_name") or (current.full_name if current else None),
+            "photo_url": row.get("photo_url") or (current.photo_url if current else None),
+            "role": row["role"],
+            "matched_user_id": row.get("matched_user_id"),
+            "last_seen_at": now,
+            "updated_at": now,
+        }
+    written = list(values_by_google_id.values())
+    if not written:
+        return []
+
+    if not supports_upsert(session):  # pragma: no cover - only sqlite/postgresql are deployed
+        for values in written:
+            await upsert(
+                session,
+                course_id=course_id,
+                google_user_id=values["google_user_id"],
+                email=values["email"],
+                full_name=values["full_name"],
+                photo_url=values["photo_url"],
+                role=values["role"],
+                matched_user_id=values["matched_user_id"],
+            )
+        return written
+
+    stmt = upsert_statement(
+        session,
+        CourseParticipant,
+        index_elements=["course_id", "google_user_id"],
+        update_columns=(
+            "email",
+            "full_name",
+            "photo_url",
+            "role",
+            "matched_user_id",
+            "last_seen_at",
+            "updated_at",
+        ),
+    )
+    await session.execute(stmt, written)
+    for google_user_id in values_by_google_id:
+        if google_user_id in existing:
+            session.expire(existing[google_user_id])
+    return written
+
+
+async def delete_missing(
+    session: AsyncSession,
+    course_id: str,
+    keep_google_user_ids: Iterable[str],
+    *,
+    roles: Iterable[ParticipantRole] | None = None,
+) -> int:
+    """Delete the course participants (optionally of ``roles``) not in ``keep_google_user_ids``."""
+    stmt = sa_delete(CourseParticipant).where(
+        CourseParticipant.course_id == course_id,
+        CourseParticipant.google_user_id.not_in(list(keep_google_user_ids)),
+    )
+    if roles is not None:
+        stmt = stmt.where(CourseParticipant.role.in_(list(roles)))
+    result = await session.execute(stmt)
+    return result.rowcount or 0
+
+
 async def list_for_course(session: AsyncSession, course_id: str) -> Sequence[CourseParticipant]:
     result = await session.execute(
         select(CourseParticipant).where(CourseParticipant.course_id == course_id)
@@ -65,6 +153,21 @@ async def list_for_course(session: AsyncSession, course_id: str) -> Sequence[Cou
     return result.scalars().all()
 
 
+async def list_students_for_courses(
+    session: AsyncSession, course_ids: Iterable[str]
+) -> Sequence[CourseParticipant]:
+    course_ids = list(course_ids)
+    if not course_ids:
+        return []
+    result = await session.execute(
+        select(CourseParticipant).where(
+            CourseParticipant.course_id.in_(course_ids),
+            CourseParticipant.role == ParticipantRole.STUDENT,
+        )
+    )
+    return result.scalars().all()
+
+
 async def delete(session: AsyncSession, participant: CourseParticipant) -> None:
     await session.delete(participant)
     await session.flush()
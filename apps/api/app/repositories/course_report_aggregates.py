@@ -0,0 +1,303 @@
+from collections.abc import AsyncIterator, Sequence
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import Integer, and_, case, cast, extract, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.upsert import dialect_name
+from app.models.attendance import Attendance, AttendanceStatus
+from app.models.course import Course
+from app.models.course_assignment import CourseAssignment
+from app.models.course_participant import CourseParticipant, ParticipantRole
+from app.models.course_submission import CourseSubmission
+
+# Every query here aggregates in the database (SQLite or PostgreSQL), so a report
+# never loads the submission or attendance rows of a course.
+
+SUBMITTED_STATES = ("TURNED_IN", "RETURNED")
+DRAFT_STATE = "CREATED"
+GRADE_BUCKETS = (
+    ("A (90-100)", 90, None),
+    ("B (80-89)", 80, 90),
+    ("C (70-79)", 70, 80),
+    ("D (60-69)", 60, 70),
+    ("F (<60)", None, 60),
+)
+
+_submitted = CourseSubmission.state.in_(SUBMITTED_STATES)
+
+
+def _count_if(condition: Any) -> Any:
+    return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+
+def _weekday(session: AsyncSession, column: Any) -> Any:
+    """Day of week with Sunday = 0 on both dialects."""
+
+    if dialect_name(session) == "postgresql":
+        return cast(extract("dow", column), Integer)
+    return cast(func.strftime("%w", column), Integer)
+
+
+def _hour(session: AsyncSession, column: Any) -> Any:
+    if dialect_name(session) == "postgresql":
+        return cast(extract("hour", column), Integer)
+    return cast(func.strftime("%H", column), Integer)
+
+
+def _week_start(session: AsyncSession, column: Any) -> Any:
+    """Monday of the week of ``column``, as ``YYYY-MM-DD`` text."""
+
+    if dialect_name(session) == "postgresql":
+        return func.to_char(func.date_trunc("week", column), "YYYY-MM-DD")
+    days_since_monday = (cast(func.strftime("%w", column), Integer) + 6) % 7
+    return func.date(column, func.printf("-%d days", days_since_monday))
+
+
+def _hours_between(session: AsyncSession, later: Any, earlier: Any) -> Any:
+    if dialect_name(session) == "postgresql":
+        return extract("epoch", later - earlier) / 3600
+    return (func.julianday(later) - func.julianday(earlier)) * 24
+
+
+def tally_columns() -> list[Any]:
+    """The submission counters shared with the ``course_metrics`` rollups."""
+
+    return [
+        func.count().label("total"),
+        _count_if(_submitted).label("submitted"),
+        _count_if(CourseSubmission.state == DRAFT_STATE).label("drafts"),
+        _count_if(CourseSubmission.late.is_(True)).label("late"),
+        func.count(CourseSubmission.assigned_grade).label("graded"),
+        func.coalesce(func.sum(CourseSubmission.assigned_grade), 0).label("grade_sum"),
+    ]
+
+
+async def submission_tallies_by_student(
+    session: AsyncSession, course_id: str
+) -> Sequence[Any]:
+    """One row per ``google_user_id``: total, submitted, drafts, late, graded, grade_sum."""
+
+    result = await session.execute(
+        select(CourseSubmission.google_user_id.label("key"), *tally_columns())
+        .where(CourseSubmission.course_id == course_id)
+        .group_by(CourseSubmission.google_user_id)
+    )
+    return result.all()
+
+
+async def submission_tallies_by_assignment(
+    session: AsyncSession, course_id: str
+) -> Sequence[Any]:
+    """One row per ``coursework_id``, with the same counters as per student."""
+
+    result = await session.execute(
+        select(CourseSubmission.coursework_id.label("key"), *tally_columns())
+        .where(CourseSubmission.course_id == course_id)
+        .group_by(CourseSubmission.coursework_id)
+    )
+    return result.all()
+
+
+async def turn_in_timing(session: AsyncSession, course_id: str, *, recent_since: datetime) -> Any:
+    """Recent and last-minute turn-ins of the course.
+
+    These depend on the clock, so unlike the counters they are never rolled up.
+    A turn-in is "last minute" when it is completed within the 24 hours before
+    the assignment's due date.
+    """
+
+    hours_before_due = _hours_between(session, CourseAssignment.due_at, CourseSubmission.turned_in_at)
+    result = await session.execute(
+        select(
+            _count_if(CourseSubmission.turned_in_at >= recent_since).label("recent"),
+            _count_if(
+                and_(
+                    _submitted,
+                    CourseSubmission.turned_in_at.is_not(None),
+                    CourseAssignment.due_at.is_not(None),
+                    hours_before_due >= 0,
+                    hours_before_due <= 24,
+                )
+            ).label("last_minute"),
+        )
+        .select_from(CourseSubmission)
+        .outerjoin(CourseAssignment, CourseAssignment.id == CourseSubmission.coursework_id)
+        .where(CourseSubmission.course_id == course_id)
+    )
+    return result.one()
+
+
+async def grade_stats(session: AsyncSession, course_id: str) -> dict[str, Any] | None:
+    """Count, min, max, median and bucket counts of the graded submissions."""
+
+    graded = and_(
+        CourseSubmission.course_id == course_id,
+        CourseSubmission.assigned_grade.is_not(None),
+    )
+    grade = CourseSubmission.assigned_grade
+    buckets = []
+    for label, low, high in GRADE_BUCKETS:
+        conditions = []
+        if low is not None:
+            conditions.append(grade >= low)
+        if high is not None:
+            conditions.append(grade < high)
+        buckets.append(_count_if(and_(*conditions)).label(label))
+
+    row = (
+        await session.execute(
+            select(
+                func.count(grade).label("count"),
+                func.sum(grade).label("sum"),
+                func.min(grade).label("min"),
+                func.max(grade).label("max"),
+                *buckets,
+            ).where(graded)
+        )
+    ).one()
+    count = row._mapping["count"]
+    if not count:
+        return None
+    # Upper median, like ``sorted(grades)[n // 2]``
+    median = await session.scalar(
+        select(grade).where(graded).order_by(grade).offset(count // 2).limit(1)
+    )
+    return {
+        "count": count,
+        "sum": row._mapping["sum"],
+        "min": row._mapping["min"],
+        "max": row._mapping["max"],
+        "median": median,
+        "buckets": {label: row._mapping[label] for label, _, _ in GRADE_BUCKETS},
+    }
+
+
+async def completed_turn_in_histogram(session: AsyncSession, course_id: str) -> Sequence[Any]:
+    """Completed turn-ins counted per (weekday, hour); weekday uses Sunday = 0."""
+
+    weekday = _weekday(session, CourseSubmission.turned_in_at).label("weekday")
+    hour = _hour(session, CourseSubmission.turned_in_at).label("hour")
+    result = await session.execute(
+        select(weekday, hour, func.count().label("count"))
+        .where(
+            CourseSubmission.course_id == course_id,
+            CourseSubmission.turned_in_at.is_not(None),
+            _submitted,
+        )
+        .group_by(weekday, hour)
+        .order_by(weekday, hour)
+    )
+    return result.all()
+
+
+async def turn_ins_per_week(session: AsyncSession, course_id: str) -> Sequence[Any]:
+    """Turn-ins (any state) per week, keyed by the Monday of the week."""
+
+    week = _week_start(session, CourseSubmission.turned_in_at).label("week")
+    result = await session.execute(
+        select(week, func.count().label("count"))
+        .where(
+            CourseSubmission.course_id == course_id,
+            CourseSubmission.turned_in_at.is_not(None),
+        )
+        .group_by(week)
+        .order_by(week)
+    )
+    return result.all()
+
+
+async def attendance_by_student(session: AsyncSession, course_id: str) -> Sequence[Any]:
+    result = await session.execute(
+        select(
+            Attendance.student_id,
+            func.count().label("total"),
+            _count_if(Attendance.status == AttendanceStatus.PRESENTE).label("present"),
+        )
+        .where(Attendance.course_id == course_id)
+        .group_by(Attendance.student_id)
+    )
+    return result.all()
+
+
+async def attendance_session_count(session: AsyncSession, course_id: str) -> int:
+    return await session.scalar(
+        select(func.count(func.distinct(Attendance.date))).where(Attendance.course_id == course_id)
+    ) or 0
+
+
+async def stream_school_student_tallies(
+    session: AsyncSession, *, batch_size: int
+) -> AsyncIterator[Any]:
+    """One row per student of every course, ordered by course, with their tallies.
+
+    Submissions and attendance are grouped in the database and joined to the
+    rosters; the rows come through a server-side cursor, ``batch_size`` at a time.
+    """
+
+    submissions = (
+        select(CourseSubmission.course_id, CourseSubmission.google_user_id, *tally_columns())
+        .group_by(CourseSubmission.course_id, CourseSubmission.google_user_id)
+        .subquery()
+    )
+    attendance = (
+        select(
+            Attendance.course_id,
+            Attendance.student_id,
+            func.count().label("total"),
+            _count_if(Attendance.status == AttendanceStatus.PRESENTE).label("present"),
+        )
+        .group_by(Attendance.course_id, Attendance.student_id)
+        .subquery()
+    )
+    result = await session.stream(
+        select(
+            Course.id.label("course_id"),
+            Course.name.label("course_name"),
+            CourseParticipant.full_name,
+            CourseParticipant.email,
+            func.coalesce(submissions.c.total, 0).label("total"),
+            func.coalesce(submissions.c.submitted, 0).label("submitted"),
+            func.coalesce(submissions.c.drafts, 0).label("drafts"),
+            func.coalesce(submissions.c.late, 0).label("late"),
+            func.coalesce(submissions.c.graded, 0).label("graded"),
+            func.coalesce(submissions.c.grade_sum, 0).label("grade_sum"),
+            func.coalesce(attendance.c.total, 0).label("attendance_total"),
+            func.coalesce(attendance.c.present, 0).label("attendance_present"),
+        )
+        .join(CourseParticipant, CourseParticipant.course_id == Course.id)
+        .outerjoin(
+            submissions,
+            and_(
+                submissions.c.course_id == CourseParticipant.course_id,
+                submissions.c.google_user_id == CourseParticipant.google_user_id,
+            ),
+        )
+        .outerjoin(
+            attendance,
+            and_(
+                attendance.c.course_id == CourseParticipant.course_id,
+                attendance.c.student_id == CourseParticipant.id,
+            ),
+        )
+        .where(CourseParticipant.role == ParticipantRole.STUDENT)
+        .order_by(Course.name, Course.id, CourseParticipant.full_name, CourseParticipant.id)
+        .execution_options(yield_per=batch_size)
+    )
+    async for row in result:
+        yield row
+
+
+__all__ = [
+    "attendance_by_student",
+    "attendance_session_count",
+    "completed_turn_in_histogram",
+    "grade_stats",
+    "stream_school_student_tallies",
+    "submission_tallies_by_assignment",
+    "submission_tallies_by_student",
+    "tally_columns",
+    "turn_in_timing",
+    "turn_ins_per_week",
+]
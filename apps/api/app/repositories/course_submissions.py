@@ -1,13 +1,52 @@
-from collections.abc import Sequence
-from datetime import datetime
+from collections.abc import AsyncIterator, Iterable, Sequence
+from dataclasses import dataclass
+from datetime import datetime, timezone
 from typing import Any, Optional
 import json
 
-from sqlalchemy import select
+from sqlalchemy import and_, delete as sql_delete, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.db.upsert import supports_upsert, upsert_statement
+from app.models.course_participant import CourseParticipant, ParticipantRole
 from app.models.course_submission import CourseSubmission
 
+SUBMISSION_FIELDS = (
+    "course_id",
+    "coursework_id",
+    "google_user_id",
+    "matched_user_id",
+    "state",
+    "late",
+    "turned_in_at",
+    "assigned_grade",
+    "draft_grade",
+    "attachments",
+    "updated_time",
+)
+
+
+@dataclass(slots=True)
+class SubmissionSnapshot:
+    """Detached copy of a submission row, safe to keep across bulk writes."""
+
+    id: str
+    course_id: str
+    coursework_id: str
+    google_user_id: str
+    matched_user_id: str | None
+    state: str | None
+    late: bool
+    turned_in_at: datetime | None
+    assigned_grade: float | None
+    draft_grade: float | None
+    attachments: str | None
+    updated_time: datetime | None
+
+    @classmethod
+    def from_model(cls, submission: CourseSubmission) -> "SubmissionSnapshot":
+        return cls(id=submission.id, **{name: getattr(submission, name) for name in SUBMISSION_FIELDS})
+
 
 async def get(session: AsyncSession, submission_id: str) -> Optional[CourseSubmission]:
     result = await session.execute(
@@ -68,6 +107,107 @@ async def upsert(
     return submission
 
 
+async def bulk_upsert(
+    session: AsyncSession,
+    rows: Iterable[dict[str, Any]],
+) -> list[tuple[SubmissionSnapshot | None, SubmissionSnapshot]]:
+    """Insert or update a batch of submissions with set-based statements.
+
+    Each row carries the same keyword arguments as :func:`upsert`. The stored
+    versions of the batch are loaded in a single query and diffed in memory; only
+    new or changed rows are written, using ``INSERT ... ON CONFLICT``. Returns one
+    ``(previous, current)`` pair per input row, ``previous`` being ``None`` for
+    submissions that did not exist yet.
+    """
+
+    incoming: dict[str, SubmissionSnapshot] = {}
+    for row in rows:
+        attachments = row.get("attachments")
+        snapshot = SubmissionSnapshot(
+            id=row["submission_id"],
+            course_id=row["course_id"],
+            coursework_id=row["coursework_id"],
+            google_user_id=row["google_user_id"],
+            matched_user_id=row.get("matched_user_id"),
+            state=row.get("state"),
+            late=bool(row.get("late")),
+            turned_in_at=row.get("turned_in_at"),
+            assigned_grade=row.get("assigned_grade"),
+            draft_grade=row.get("draft_grade"),
+            attachments=json.dumps(attachments) if attachments is not None else None,
+            updated_time=row.get("updated_time"),
+        )
+        incoming[snapshot.id] = snapshot
+    if not incoming:
+        return []
+
+    if not supports_upsert(session):  # pragma: no cover - only sqlite/postgresql are deployed
+        return await _upsert_one_by_one(session, incoming.values())
+
+    result = await session.execute(
+        select(CourseSubmission).where(CourseSubmission.id.in_(list(incoming)))
+    )
+    existing = {submission.id: submission for submission in result.scalars().all()}
+    previous = {submission_id: SubmissionSnapshot.from_model(model) for submission_id, model in existing.items()}
+
+    now = datetime.utcnow()
+    pending: list[dict[str, Any]] = []
+    for snapshot in incoming.values():
+        prev = previous.get(snapshot.id)
+        if prev is not None and not snapshots_differ(prev, snapshot):
+            continue
+        values = {"id": snapshot.id, "updated_at": now}
+        values.update({name: getattr(snapshot, name) for name in SUBMISSION_FIELDS})
+        pending.append(values)
+
+    if pending:
+        stmt = upsert_statement(
+            session,
+            CourseSubmission,
+            index_elements=["id"],
+            update_columns=(*SUBMISSION_FIELDS, "updated_at"),
+        )
+        await session.execute(stmt, pending)
+        for values in pending:
+            # The core statement bypasses the identity map; drop stale ORM state.
+            model = existing.get(values["id"])
+            if model is not None:
+                session.expire(model)
+
+    return [(previous.get(submission_id), snapshot) for submission_id, snapshot in incoming.items()]
+
+
+async def _upsert_one_by_one(
+    session: AsyncSession, snapshots: Iterable[SubmissionSnapshot]
+) -> list[tuple[SubmissionSnapshot | None, SubmissionSnapshot]]:
+    pairs: list[tuple[SubmissionSnapshot | None, SubmissionSnapshot]] = []
+    for snapshot in snapshots:
+        prev_model = await get(session, snapshot.id)
+        prev = SubmissionSnapshot.from_model(prev_model) if prev_model else None
+        values = {name: getattr(snapshot, name) for name in SUBMISSION_FIELDS}
+        values["attachments"] = json.loads(snapshot.attachments) if snapshot.attachments else None
+        await upsert(session, submission_id=snapshot.id, **values)
+        pairs.append((prev, snapshot))
+    return pairs
+
+
+def snapshots_differ(prev: SubmissionSnapshot, current: SubmissionSnapshot) -> bool:
+    for name in SUBMISSION_FIELDS:
+        old = getattr(prev, name)
+        new = getattr(current, name)
+        if isinstance(old, datetime) or isinstance(new, datetime):
+            old, new = _naive_utc(old), _naive_utc(new)
+        if old != new:
+            return True
+    return False
+
+
+def _naive_utc(value: datetime | None) -> datetime | None:
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
 async def list_for_course(session: AsyncSession, course_id: str) -> Sequence[CourseSubmission]:
     result = await session.execute(
         select(CourseSubmission).where(CourseSubmission.course_id == course_id)
@@ -82,6 +222,57 @@ async def list_for_coursework(session: AsyncSession, coursework_id: str) -> Sequ
     return result.scalars().all()
 
 
+async def stream_roster_submissions(
+    session: AsyncSession, course_id: str, coursework_id: str, *, batch_size: int
+) -> AsyncIterator[tuple[CourseParticipant, CourseSubmission | None]]:
+    """Every student of the course with their submission for ``coursework_id``, if any.
+
+    Read through a server-side cursor, ``batch_size`` rows at a time.
+    """
+
+    result = await session.stream(
+        select(CourseParticipant, CourseSubmission)
+        .outerjoin(
+            CourseSubmission,
+            and_(
+                CourseSubmission.coursework_id == coursework_id,
+                CourseSubmission.google_user_id == CourseParticipant.google_user_id,
+            ),
+        )
+        .where(
+            CourseParticipant.course_id == course_id,
+            CourseParticipant.role == ParticipantRole.STUDENT,
+        )
+        .execution_options(yield_per=batch_size)
+    )
+    async for participant, submission in result:
+        yield participant, submission
+
+
+async def delete_for_courseworks(
+    session: AsyncSession, course_id: str, coursework_ids: Iterable[str]
+) -> list[SubmissionSnapshot]:
+    """Delete the submissions of ``coursework_ids`` and return what was removed.
+
+    Done explicitly rather than relying on the foreign key cascade, which SQLite
+    does not enforce, so the caller can fold the removals into the rollups.
+    """
+
+    ids = list(coursework_ids)
+    if not ids:
+        return []
+    condition = and_(
+        CourseSubmission.course_id == course_id, CourseSubmission.coursework_id.in_(ids)
+    )
+    result = await session.execute(select(CourseSubmission).where(condition))
+    removed = [SubmissionSnapshot.from_model(submission) for submission in result.scalars().all()]
+    if removed:
+        await session.execute(
+            sql_delete(CourseSubmission).where(condition).execution_options(synchronize_session="fetch")
+        )
+    return removed
+
+
 async def delete(session: AsyncSession, submission: CourseSubmission) -> None:
     await session.delete(submission)
     await session.flush()
@@ -0,0 +1,49 @@
+from collections.abc import Iterable
+from datetime import datetime
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.course_sync_schedule import CourseSyncSchedule
+
+
+async def get(session: AsyncSession, course_id: str) -> CourseSyncSchedule | None:
+    return await session.get(CourseSyncSchedule, course_id)
+
+
+async def list_not_due(session: AsyncSession, course_ids: Iterable[str], now: datetime) -> set[str]:
+    """Return the ids among ``course_ids`` whose next poll is still in the future."""
+
+    ids = list(course_ids)
+    if not ids:
+        return set()
+    result = await session.execute(
+        select(CourseSyncSchedule.course_id).where(
+            CourseSyncSchedule.course_id.in_(ids),
+            CourseSyncSchedule.next_sync_at > now,
+        )
+    )
+    return set(result.scalars().all())
+
+
+async def save(
+    session: AsyncSession,
+    course_id: str,
+    *,
+    change_rate: float,
+    interval_seconds: int,
+    last_updates: int,
+    synced_at: datetime,
+    next_sync_at: datetime,
+) -> CourseSyncSchedule:
+    schedule = await get(session, course_id)
+    if schedule is None:
+        schedule = CourseSyncSchedule(course_id=course_id)
+        session.add(schedule)
+    schedule.change_rate = change_rate
+    schedule.interval_seconds = interval_seconds
+    schedule.last_updates = last_updates
+    schedule.last_synced_at = synced_at
+    schedule.next_sync_at = next_sync_at
+    await session.flush()
+    return schedule
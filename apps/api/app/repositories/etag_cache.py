@@ -1,24 +1,81 @@
-from sqlalchemy import select
+from collections.abc import Iterable
+
+from sqlalchemy import delete as sa_delete, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.etag_cache import EtagCache
 
+FIRST_PAGE = ""
+
 
-async def get(session: AsyncSession, course_id: str, cache_key: str) -> str | None:
+async def get(
+    session: AsyncSession, course_id: str, cache_key: str, page_token: str = FIRST_PAGE
+) -> str | None:
     result = await session.execute(
         select(EtagCache.etag).where(
             EtagCache.course_id == course_id,
             EtagCache.cache_key == cache_key,
+            EtagCache.page_token == page_token,
         )
     )
     return result.scalar_one_or_none()
 
 
-async def set(session: AsyncSession, course_id: str, cache_key: str, etag: str | None) -> None:
-    instance = await session.get(EtagCache, {"course_id": course_id, "cache_key": cache_key})
+async def list_pages(session: AsyncSession, course_id: str, cache_key: str) -> dict[str, EtagCache]:
+    """Return every cached page of a collection keyed by its page cursor."""
+    result = await session.execute(
+        select(EtagCache).where(
+            EtagCache.course_id == course_id,
+            EtagCache.cache_key == cache_key,
+        )
+    )
+    return {entry.page_token: entry for entry in result.scalars().all()}
+
+
+async def set(
+    session: AsyncSession,
+    course_id: str,
+    cache_key: str,
+    etag: str | None,
+    *,
+    page_token: str = FIRST_PAGE,
+    next_page_token: str | None = None,
+) -> None:
+    instance = await session.get(
+        EtagCache, {"course_id": course_id, "cache_key": cache_key, "page_token": page_token}
+    )
     if instance is None:
-        instance = EtagCache(course_id=course_id, cache_key=cache_key, etag=etag)
+        instance = EtagCache(
+            course_id=course_id,
+            cache_key=cache_key,
+            page_token=page_token,
+            etag=etag,
+            next_page_token=next_page_token,
+        )
         session.add(instance)
     else:
         instance.etag = etag
+        instance.next_page_token = next_page_token
     await session.flush()
+
+
+async def clear(session: AsyncSession, course_id: str, cache_key: str) -> None:
+    await session.execute(
+        sa_delete(EtagCache).where(
+            EtagCache.course_id == course_id,
+            EtagCache.cache_key == cache_key,
+        )
+    )
+
+
+async def prune(
+    session: AsyncSession, course_id: str, cache_key: str, keep_page_tokens: Iterable[str]
+) -> None:
+    """Drop cached pages whose cursor is no longer part of the collection."""
+    await session.execute(
+        sa_delete(EtagCache).where(
+            EtagCache.course_id == course_id,
+            EtagCache.cache_key == cache_key,
+            EtagCache.page_token.not_in(list(keep_page_tokens)),
+        )
+    )
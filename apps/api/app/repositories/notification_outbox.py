@@ -0,0 +1,132 @@
+from collections.abc import Iterable, Sequence
+from datetime import datetime, timedelta
+from typing import Any
+
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.upsert import upsert_statement
+from app.models.notification_outbox import NotificationOutbox, OutboxStatus
+
+
+async def enqueue(session: AsyncSession, intents: Iterable[dict[str, Any]]) -> None:
+    """Insert notification intents in the caller's transaction, ignoring known ids."""
+
+    now = datetime.utcnow()
+    rows = [
+        {
+            "id": intent["id"],
+            "kind": intent["kind"],
+            "user_id": intent.get("user_id"),
+            "phone": intent.get("phone"),
+            "email": intent.get("email"),
+            "message": intent["message"],
+            "status": OutboxStatus.PENDING,
+            "attempts": 0,
+            "next_attempt_at": now,
+            "created_at": now,
+        }
+        for intent in intents
+    ]
+    if not rows:
+        return
+    stmt = upsert_statement(session, NotificationOutbox, index_elements=["id"], update_columns=())
+    await session.execute(stmt, rows)
+
+
+async def claim_batch(
+    session: AsyncSession, owner: str, *, limit: int, lease: timedelta
+) -> Sequence[NotificationOutbox]:
+    """Lock up to ``limit`` due intents for ``owner`` and return them.
+
+    The claim is committed right away. Rows locked by a dispatcher that died are
+    picked up again once their lease expires, so nothing is lost across restarts.
+    """
+
+    now = datetime.utcnow()
+    claimable = (
+        NotificationOutbox.status == OutboxStatus.PENDING,
+        NotificationOutbox.next_attempt_at <= now,
+        or_(NotificationOutbox.locked_until.is_(None), NotificationOutbox.locked_until < now),
+    )
+    result = await session.execute(
+        select(NotificationOutbox.id)
+        .where(*claimable)
+        .order_by(NotificationOutbox.next_attempt_at)
+        .limit(limit)
+    )
+    ids = list(result.scalars().all())
+    if not ids:
+        return []
+
+    locked_until = now + lease
+    await session.execute(
+        update(NotificationOutbox)
+        .where(NotificationOutbox.id.in_(ids), *claimable)
+        .values(locked_by=owner, locked_until=locked_until)
+        .execution_options(synchronize_session=False)
+    )
+    await session.commit()
+    claimed = await session.execute(
+        select(NotificationOutbox).where(
+            NotificationOutbox.id.in_(ids),
+            NotificationOutbox.locked_by == owner,
+            NotificationOutbox.locked_until == locked_until,
+        )
+    )
+    return claimed.scalars().all()
+
+
+async def mark_sent(session: AsyncSession, intent_id: str, owner: str) -> bool:
+    """Record a delivery; ignored if ``owner`` lost the claim in the meantime."""
+
+    result = await session.execute(
+        update(NotificationOutbox)
+        .where(NotificationOutbox.id == intent_id, NotificationOutbox.locked_by == owner)
+        .values(
+            status=OutboxStatus.SENT,
+            attempts=NotificationOutbox.attempts + 1,
+            sent_at=datetime.utcnow(),
+            locked_by=None,
+            locked_until=None,
+            last_error=None,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    return bool(result.rowcount)
+
+
+async def mark_attempt_failed(
+    session: AsyncSession,
+    intent_id: str,
+    owner: str,
+    error: str,
+    *,
+    retry_at: datetime | None,
+) -> bool:
+    """Record a failed attempt; without ``retry_at`` the intent is given up."""
+
+    values: dict[str, Any] = {
+        "attempts": NotificationOutbox.attempts + 1,
+        "last_error": error,
+        "locked_by": None,
+        "locked_until": None,
+    }
+    if retry_at is None:
+        values["status"] = OutboxStatus.FAILED
+    else:
+        values["next_attempt_at"] = retry_at
+    result = await session.execute(
+        update(NotificationOutbox)
+        .where(NotificationOutbox.id == intent_id, NotificationOutbox.locked_by == owner)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    return bool(result.rowcount)
+
+
+async def count_by_status(session: AsyncSession) -> dict[str, int]:
+    result = await session.execute(
+        select(NotificationOutbox.status, func.count()).group_by(NotificationOutbox.status)
+    )
+    return {status.value: count for status, count in result.all()}
@@ -0,0 +1,111 @@
+import json
+from datetime import datetime, timedelta
+from typing import Any
+
+from sqlalchemy import or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.sync_job import SyncJob, SyncJobStatus
+from app.utils.ids import generate_id
+
+ACTIVE_STATUSES = (SyncJobStatus.QUEUED, SyncJobStatus.RUNNING)
+
+
+async def get(session: AsyncSession, job_id: str) -> SyncJob | None:
+    return await session.get(SyncJob, job_id)
+
+
+async def get_active_for_user(session: AsyncSession, user_id: str) -> SyncJob | None:
+    result = await session.execute(
+        select(SyncJob)
+        .where(SyncJob.user_id == user_id, SyncJob.status.in_(ACTIVE_STATUSES))
+        .order_by(SyncJob.created_at.desc())
+        .limit(1)
+    )
+    return result.scalar_one_or_none()
+
+
+async def create(session: AsyncSession, user_id: str, owner: str, lease: timedelta) -> SyncJob | None:
+    """Queue a job for ``user_id``; ``None`` if the user already has an active one."""
+
+    job = SyncJob(
+        id=generate_id(),
+        user_id=user_id,
+        status=SyncJobStatus.QUEUED,
+        owner=owner,
+        lease_expires_at=datetime.utcnow() + lease,
+    )
+    session.add(job)
+    try:
+        await session.commit()
+    except IntegrityError:
+        # uq_sync_jobs_active_user: a concurrent request queued one first
+        await session.rollback()
+        return None
+    await session.refresh(job)
+    return job
+
+
+async def mark_running(
+    session: AsyncSession, job: SyncJob, progress: dict[str, dict[str, Any]]
+) -> None:
+    job.status = SyncJobStatus.RUNNING
+    job.started_at = datetime.utcnow()
+    job.total_courses = len(progress)
+    job.completed_courses = 0
+    job.progress = json.dumps(progress)
+    await session.flush()
+
+
+async def set_progress(
+    session: AsyncSession, job: SyncJob, progress: dict[str, dict[str, Any]]
+) -> None:
+    job.progress = json.dumps(progress)
+    job.completed_courses = sum(1 for entry in progress.values() if entry.get("status") == "done")
+    await session.flush()
+
+
+async def finish(session: AsyncSession, job: SyncJob, result: dict[str, Any]) -> None:
+    job.status = SyncJobStatus.SUCCEEDED
+    job.result = json.dumps(result)
+    job.finished_at = datetime.utcnow()
+    await session.flush()
+
+
+async def fail(session: AsyncSession, job: SyncJob, error: str) -> None:
+    job.status = SyncJobStatus.FAILED
+    job.error = error
+    job.finished_at = datetime.utcnow()
+    await session.flush()
+
+
+async def renew_lease(session: AsyncSession, job_id: str, owner: str, lease: timedelta) -> bool:
+    """Extend the lease of an active job still owned by ``owner``."""
+
+    result = await session.execute(
+        update(SyncJob)
+        .where(SyncJob.id == job_id, SyncJob.owner == owner, SyncJob.status.in_(ACTIVE_STATUSES))
+        .values(lease_expires_at=datetime.utcnow() + lease)
+        .execution_options(synchronize_session=False)
+    )
+    return bool(result.rowcount)
+
+
+async def fail_expired(session: AsyncSession, *, user_id: str | None = None) -> int:
+    """Mark active jobs whose owner stopped renewing their lease as failed.
+
+    Jobs of live processes, on this replica or another one, keep their lease
+    and are left alone.
+    """
+
+    query = select(SyncJob).where(
+        SyncJob.status.in_(ACTIVE_STATUSES),
+        or_(SyncJob.lease_expires_at.is_(None), SyncJob.lease_expires_at < datetime.utcnow()),
+    )
+    if user_id is not None:
+        query = query.where(SyncJob.user_id == user_id)
+    jobs = (await session.execute(query)).scalars().all()
+    for job in jobs:
+        await fail(session, job, "Interrumpido: el proceso que lo ejecutaba dejó de responder")
+    return len(jobs)
@@ -0,0 +1,30 @@
+from datetime import datetime
+
+from sqlalchemy import delete, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.upsert import upsert_statement
+from app.models.sync_lease import SyncLease
+
+
+async def try_acquire(
+    session: AsyncSession, name: str, owner: str, expires_at: datetime, now: datetime
+) -> bool:
+    """Take or renew the lease ``name``; fails while another owner holds it unexpired."""
+
+    stmt = upsert_statement(
+        session,
+        SyncLease,
+        index_elements=["name"],
+        update_columns=["owner", "expires_at", "acquired_at"],
+        where=or_(SyncLease.expires_at <= now, SyncLease.owner == owner),
+    ).returning(SyncLease.name)
+    result = await session.execute(
+        stmt, {"name": name, "owner": owner, "expires_at": expires_at, "acquired_at": now}
+    )
+    # The conflict update is filtered out (no row returned) while someone else owns it.
+    return result.scalar_one_or_none() is not None
+
+
+async def release(session: AsyncSession, name: str, owner: str) -> None:
+    await session.execute(delete(SyncLease).where(SyncLease.name == name, SyncLease.owner == owner))
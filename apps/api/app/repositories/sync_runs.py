@@ -0,0 +1,44 @@
+from collections.abc import Sequence
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.sync_run import SyncRun
+from app.utils.ids import generate_id
+
+
+async def get(session: AsyncSession, run_id: str) -> SyncRun | None:
+    return await session.get(SyncRun, run_id)
+
+
+async def list_runs(
+    session: AsyncSession,
+    kind: str | None = None,
+    user_id: str | None = None,
+    skip: int = 0,
+    limit: int = 50,
+) -> Sequence[SyncRun]:
+    query = select(SyncRun)
+    if kind:
+        query = query.where(SyncRun.kind == kind)
+    if user_id:
+        query = query.where(SyncRun.user_id == user_id)
+    result = await session.execute(query.order_by(SyncRun.started_at.desc()).offset(skip).limit(limit))
+    return result.scalars().all()
+
+
+async def create(session: AsyncSession, values: dict[str, Any]) -> SyncRun:
+    run = SyncRun(id=generate_id(), **values)
+    session.add(run)
+    await session.commit()
+    return run
+
+
+async def prune(session: AsyncSession, older_than: datetime) -> int:
+    """Delete the runs started before ``older_than``; returns how many were removed."""
+
+    result = await session.execute(delete(SyncRun).where(SyncRun.started_at < older_than))
+    await session.commit()
+    return result.rowcount or 0
@@ -0,0 +1,30 @@
+from datetime import datetime
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.sync_watermark import SyncWatermark
+
+
+async def get(session: AsyncSession, course_id: str, cache_key: str) -> datetime | None:
+    result = await session.execute(
+        select(SyncWatermark.high_water_mark).where(
+            SyncWatermark.course_id == course_id,
+            SyncWatermark.cache_key == cache_key,
+        )
+    )
+    return result.scalar_one_or_none()
+
+
+async def set(
+    session: AsyncSession, course_id: str, cache_key: str, high_water_mark: datetime | None
+) -> None:
+    instance = await session.get(SyncWatermark, {"course_id": course_id, "cache_key": cache_key})
+    if instance is None:
+        instance = SyncWatermark(
+            course_id=course_id, cache_key=cache_key, high_water_mark=high_water_mark
+        )
+        session.add(instance)
+    else:
+        instance.high_water_mark = high_water_mark
+    await session.flush()
@@ -1,9 +1,11 @@
-from collections.abc import Iterable
+from collections.abc import Iterable, Mapping
+from datetime import datetime
 from typing import Any
 
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.db.upsert import supports_upsert, upsert_statement
 from app.models.user_contact import UserContact
 
 
@@ -45,6 +47,91 @@ async def upsert(
     return contact
 
 
+async def bulk_upsert(
+    session: AsyncSession, emails_by_user: Mapping[str, str | None]
+) -> int:
+    """Ensure a contact row exists for every user, refreshing emails like :func:`upsert`.
+
+    Existing contacts are loaded in one query; only missing rows or changed emails
+    are written. Returns the number of rows written.
+    """
+
+    user_ids = [uid for uid in emails_by_user if uid]
+    if not user_ids:
+        return 0
+
+    result = await session.execute(select(UserContact).where(UserContact.user_id.in_(user_ids)))
+    existing = {contact.user_id: contact for contact in result.scalars().all()}
+
+    now = datetime.utcnow()
+    pending: list[dict[str, Any]] = []
+    for user_id in user_ids:
+        email = emails_by_user[user_id]
+        email_normalized = email.lower() if isinstance(email, str) else None
+        contact = existing.get(user_id)
+        if contact is not None and (not email_normalized or contact.email == email_normalized):
+            continue
+        pending.append({"user_id": user_id, "email": email_normalized, "updated_at": now})
+    if not pending:
+        return 0
+
+    if not supports_upsert(session):  # pragma: no cover - only sqlite/postgresql are deployed
+        for values in pending:
+            await upsert(session, user_id=values["user_id"], email=values["email"])
+        return len(pending)
+
+    stmt = upsert_statement(
+        session, UserContact, index_elements=["user_id"], update_columns=("email", "updated_at")
+    )
+    await session.execute(stmt, pending)
+    for values in pending:
+        if values["user_id"] in existing:
+            session.expire(existing[values["user_id"]])
+    return len(pending)
+
+
+async def ensure_contacts(
+    session: AsyncSession, emails_by_user: Mapping[str, str | None]
+) -> dict[str, str]:
+    """Create the missing contact rows in one statement and return the users' phone map.
+
+    Existing contacts are left untouched (the roster sync refreshes their
+    emails); new rows start without a phone, so the returned map is complete.
+    """
+
+    user_ids = [uid for uid in emails_by_user if uid]
+    if not user_ids:
+        return {}
+
+    result = await session.execute(select(UserContact).where(UserContact.user_id.in_(user_ids)))
+    existing = {contact.user_id: contact for contact in result.scalars().all()}
+
+    now = datetime.utcnow()
+    missing = [
+        {
+            "user_id": user_id,
+            "email": emails_by_user[user_id].lower() if isinstance(emails_by_user[user_id], str) else None,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for user_id in user_ids
+        if user_id not in existing
+    ]
+    if missing:
+        if supports_upsert(session):
+            stmt = upsert_statement(session, UserContact, index_elements=["user_id"], update_columns=())
+            await session.execute(stmt, missing)
+        else:  # pragma: no cover - only sqlite/postgresql are deployed
+            for values in missing:
+                await upsert(session, user_id=values["user_id"], email=values["email"])
+
+    return {
+        contact.user_id: contact.phone_e164
+        for contact in existing.values()
+        if contact.phone_e164
+    }
+
+
 async def get_phone_map(
     session: AsyncSession, user_ids: Iterable[str]
 ) -> dict[str, str]:
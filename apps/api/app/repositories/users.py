@@ -28,6 +28,12 @@ async def get_by_name(session: AsyncSession, name: str) -> Optional[User]:
     return result.scalar_one_or_none()
 
 
+async def list_match_candidates(session: AsyncSession) -> Sequence[tuple[str, str, str]]:
+    """Return ``(id, email, name)`` for every user, for in-memory roster matching."""
+    result = await session.execute(select(User.id, User.email, User.name))
+    return [tuple(row) for row in result.all()]
+
+
 async def list_users(
     session: AsyncSession, role: UserRole | None = None, skip: int = 0, limit: int = 100
 ) -> Sequence[User]:
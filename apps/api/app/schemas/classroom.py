@@ -3,7 +3,9 @@ from datetime import datetime
 from enum import Enum
 from typing import Any
 
-from pydantic import BaseModel, field_validator
+from pydantic import BaseModel, computed_field, field_validator
+
+from app.models.sync_job import SyncJobStatus
 
 
 class ClassroomParticipantRole(str, Enum):
@@ -73,3 +75,71 @@ class CourseSubmissionRead(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+def _json_object(value: Any) -> dict[str, Any] | None:
+    if value is None or isinstance(value, dict):
+        return value
+    try:
+        parsed = json.loads(value)
+    except (TypeError, json.JSONDecodeError):
+        return None
+    return parsed if isinstance(parsed, dict) else None
+
+
+class SyncJobRead(BaseModel):
+    id: str
+    status: SyncJobStatus
+    total_courses: int
+    completed_courses: int
+    progress: dict[str, dict[str, Any]] | None = None
+    result: dict[str, Any] | None = None
+    error: str | None = None
+    created_at: datetime
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+
+    class Config:
+        from_attributes = True
+
+    @field_validator("progress", "result", mode="before")
+    @classmethod
+    def _parse_json(cls, value: Any) -> dict[str, Any] | None:
+        return _json_object(value)
+
+
+class SyncRunRead(BaseModel):
+    id: str
+    kind: str
+    trigger: str
+    user_id: str | None = None
+    status: str
+    started_at: datetime
+    finished_at: datetime | None = None
+    duration_seconds: float
+    courses: int
+    requests: int
+    not_modified: int
+    bytes: int
+    rows_inserted: int
+    rows_updated: int
+    rows_deleted: int
+    fetch_seconds: float
+    parse_seconds: float
+    db_seconds: float
+    notify_seconds: float
+    course_breakdown: dict[str, dict[str, Any]] | None = None
+    error: str | None = None
+
+    class Config:
+        from_attributes = True
+
+    @computed_field  # type: ignore[misc]
+    @property
+    def not_modified_ratio(self) -> float:
+        return round(self.not_modified / self.requests, 3) if self.requests else 0.0
+
+    @field_validator("course_breakdown", mode="before")
+    @classmethod
+    def _parse_breakdown(cls, value: Any) -> dict[str, Any] | None:
+        return _json_object(value)
@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.repositories import assignment_announcements as announcements_repo
+from app.repositories import course_participants as participants_repo
+from app.repositories import notification_outbox as outbox_repo
+from app.repositories import user_contacts as user_contacts_repo
+
+logger = logging.getLogger("nerdeala.notifications.digest")
+
+DIGEST_FOOTER = "👀 Revisá los detalles en tu panel de Scholaris o directamente en Google Classroom."
+
+
+@dataclass(slots=True, frozen=True)
+class NewAssignment:
+    id: str
+    course_id: str
+    title: str
+    due_at: datetime | None = None
+    max_points: float | None = None
+
+    @classmethod
+    def from_record(cls, record: Any) -> NewAssignment:
+        return cls(record.id, record.course_id, record.title, record.due_at, record.max_points)
+
+
+@dataclass(slots=True)
+class AssignmentDigest:
+    """New assignments announced together, one outbox message per student.
+
+    ``enqueue`` loads the rosters and phone numbers of every affected course in
+    two queries and queues a single message per student listing all of their
+    new assignments. The sync feeds it from the pending rows of
+    :func:`announce_pending_assignments`.
+    """
+
+    assignments: dict[str, list[NewAssignment]] = field(default_factory=lambda: defaultdict(list))
+
+    def add(self, record: Any) -> None:
+        self.assignments[record.course_id].append(NewAssignment.from_record(record))
+
+    def __len__(self) -> int:
+        return sum(len(items) for items in self.assignments.values())
+
+    async def enqueue(self, session: AsyncSession) -> int:
+        """Queue the digests in the outbox; returns how many messages were queued."""
+
+        if not self.assignments:
+            return 0
+        students = await participants_repo.list_students_for_courses(session, list(self.assignments))
+        # Courses without any matched student are not announced (same rule as before
+        # the digest existed: nobody there has linked an account yet).
+        announced = {student.course_id for student in students if student.matched_user_id}
+        phone_map = await user_contacts_repo.get_phone_map(
+            session, {student.matched_user_id for student in students if student.matched_user_id}
+        )
+
+        recipients: dict[str, dict[str, Any]] = {}
+        for student in students:
+            if student.course_id not in announced:
+                continue
+            phone = phone_map.get(student.matched_user_id) if student.matched_user_id else None
+            if not phone and not student.email:
+                continue
+            key = student.matched_user_id or f"google:{student.google_user_id}"
+            recipient = recipients.setdefault(
+                key,
+                {"student": student, "phone": phone, "email": student.email, "assignments": []},
+            )
+            recipient["assignments"].extend(self.assignments[student.course_id])
+
+        intents = [_intent(recipient) for recipient in recipients.values()]
+        await outbox_repo.enqueue(session, intents)
+        logger.info(
+            "Avisos de tareas nuevas encolados: %d alumnos, %d tareas en %d cursos",
+            len(intents),
+            len(self),
+            len(self.assignments),
+        )
+        return len(intents)
+
+
+async def announce_pending_assignments(session: AsyncSession) -> int:
+    """Turn every pending new-assignment row into digests; returns the messages queued.
+
+    Course syncs write the pending rows in their own transaction, so only
+    committed courses are announced. Claiming the rows and queueing the outbox
+    messages happen in the caller's transaction: if it rolls back, the rows
+    stay pending for the next cycle.
+    """
+
+    digest = AssignmentDigest()
+    for assignment in await announcements_repo.take_pending(session):
+        digest.add(assignment)
+    return await digest.enqueue(session)
+
+
+def _intent(recipient: dict[str, Any]) -> dict[str, Any]:
+    student = recipient["student"]
+    assignments: list[NewAssignment] = sorted(recipient["assignments"], key=lambda item: item.id)
+    if len(assignments) == 1:
+        # Keep the id of the single-assignment announcement so reruns stay deduplicated.
+        intent_id = f"new_assignment:{assignments[0].id}:{student.google_user_id}"
+        kind = "new_assignment"
+        message = assignment_message(assignments[0])
+    else:
+        # Derived only from the student and the sorted assignment ids, so claiming
+        # the same pending rows again yields the same id
+        fingerprint = hashlib.sha1("|".join(item.id for item in assignments).encode()).hexdigest()[:16]
+        intent_id = f"assignment_digest:{student.google_user_id}:{fingerprint}"
+        kind = "assignment_digest"
+        message = digest_message(assignments)
+    return {
+        "id": intent_id,
+        "kind": kind,
+        "user_id": student.matched_user_id,
+        "phone": recipient["phone"],
+        "email": recipient["email"],
+        "message": message,
+    }
+
+
+def _assignment_details(assignment: NewAssignment) -> str:
+    details = ""
+    if assignment.due_at:
+        details += f"\n📅 Vencimiento: {assignment.due_at.strftime('%d/%m/%Y a las %H:%M')}"
+    if assignment.max_points:
+        details += f"\n🏆 Puntos: {assignment.max_points}"
+    return details
+
+
+def assignment_message(assignment: NewAssignment) -> str:
+    return (
+        f"📚 *Nueva tarea en Classroom*\n\n"
+        f"📝 {assignment.title}"
+        f"{_assignment_details(assignment)}\n\n"
+        f"{DIGEST_FOOTER}\n\n"
+        f"¡No te olvides de entregar a tiempo! 🚀"
+    )
+
+
+def digest_message(assignments: list[NewAssignment]) -> str:
+    ordered = sorted(assignments, key=lambda item: (item.due_at is None, item.due_at or datetime.max, item.title))
+    lines = "\n\n".join(f"📝 {assignment.title}{_assignment_details(assignment)}" for assignment in ordered)
+    return (
+        f"📚 *Tenés {len(assignments)} tareas nuevas en Classroom*\n\n"
+        f"{lines}\n\n"
+        f"{DIGEST_FOOTER}\n\n"
+        f"¡No te olvides de entregar a tiempo! 🚀"
+    )
+
+
+__all__ = [
+    "AssignmentDigest",
+    "NewAssignment",
+    "announce_pending_assignments",
+    "assignment_message",
+    "digest_message",
+]
@@ -0,0 +1,333 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import timedelta
+from typing import Any
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models.course_membership import ClassroomMemberRole
+from app.models.course_participant import ParticipantRole
+from app.models.sync_job import SyncJob
+from app.models.user import User, UserRole
+from app.repositories import (
+    course_assignments as assignments_repo,
+    course_data_versions as data_versions_repo,
+    course_memberships as memberships_repo,
+    course_metrics as course_metrics_repo,
+    course_submissions as submissions_repo,
+    courses as courses_repo,
+    sync_jobs as jobs_repo,
+    users as users_repo,
+)
+from app.schemas.course import CourseCreate, CourseRead, CourseUpdate
+from app.schemas.user import UserUpdate
+from app.services.google_classroom import (
+    ClassroomCourse,
+    ClassroomCourseBundle,
+    ClassroomIntegrationError,
+    google_classroom_service,
+)
+from app.services.leases import PROCESS_OWNER
+from app.services.rate_limit import quota_scope
+from app.services.roster import RosterEntry, UserMatchIndex, reconcile_roster
+
+logger = logging.getLogger("nerdeala.classroom.jobs")
+
+_tasks: dict[str, asyncio.Task[None]] = {}
+
+
+async def enqueue_classroom_sync(session: AsyncSession, user: User, token: str) -> SyncJob:
+    """Create a Classroom import job for ``user`` and start it in the background.
+
+    A user only ever has one import in flight: if a job is already queued or
+    running for them, that job is returned instead of starting a new one. The
+    database enforces it with a partial unique index, so a concurrent request
+    that loses the insert returns the winner's job. A job whose process died is
+    failed first, so it does not block the user.
+    """
+
+    if await jobs_repo.fail_expired(session, user_id=user.id):
+        await session.commit()
+    while True:
+        active = await jobs_repo.get_active_for_user(session, user.id)
+        if active is not None:
+            return active
+        job = await jobs_repo.create(session, user.id, PROCESS_OWNER, _job_lease())
+        if job is not None:
+            break
+
+    task = asyncio.create_task(run_classroom_sync(job.id, user.id, token))
+    _tasks[job.id] = task
+    task.add_done_callback(lambda _: _tasks.pop(job.id, None))
+    return job
+
+
+async def shutdown_jobs() -> None:
+    """Cancel in-flight imports; they are marked failed once their lease expires."""
+
+    tasks = list(_tasks.values())
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def fail_interrupted_jobs() -> None:
+    """Fail the jobs whose lease lapsed; those of live replicas keep running."""
+
+    async with AsyncSessionLocal() as session:
+        interrupted = await jobs_repo.fail_expired(session)
+        await session.commit()
+    if interrupted:
+        logger.warning("Se marcaron %s importaciones de Classroom interrumpidas como fallidas", interrupted)
+
+
+def _job_lease() -> timedelta:
+    return timedelta(seconds=settings.classroom_job_lease_seconds)
+
+
+async def _keep_lease(job_id: str) -> None:
+    """Renew the job's lease every third of its length while the import runs."""
+
+    lease = _job_lease()
+    while True:
+        await asyncio.sleep(lease.total_seconds() / 3)
+        try:
+            async with AsyncSessionLocal() as session:
+                renewed = await jobs_repo.renew_lease(session, job_id, PROCESS_OWNER, lease)
+                await session.commit()
+        except Exception as exc:  # pragma: no cover - retried on the next beat
+            logger.warning("No se pudo renovar la importación de Classroom job=%s: %s", job_id, exc)
+            continue
+        if not renewed:
+            return
+
+
+async def run_classroom_sync(job_id: str, user_id: str, token: str) -> None:
+    """Worker body: import every Classroom course of the user, one commit per course."""
+
+    heartbeat = asyncio.create_task(_keep_lease(job_id))
+    try:
+        await _run_job(job_id, user_id, token)
+    finally:
+        heartbeat.cancel()
+        await asyncio.gather(heartbeat, return_exceptions=True)
+
+
+async def _run_job(job_id: str, user_id: str, token: str) -> None:
+    async with AsyncSessionLocal() as session:
+        job = await jobs_repo.get(session, job_id)
+        user = await users_repo.get(session, user_id)
+        if job is None or user is None:
+            return
+
+        try:
+            with quota_scope(user_id):
+                result = await _import_courses(session, job, user, token)
+        except ClassroomIntegrationError as exc:
+            await session.rollback()
+            await jobs_repo.fail(session, job, str(exc))
+            await session.commit()
+            return
+        except Exception as exc:  # pragma: no cover - defensive logging
+            logger.exception("Falló la importación de Classroom job=%s user=%s", job_id, user_id)
+            await session.rollback()
+            await jobs_repo.fail(session, job, f"Error inesperado: {exc.__class__.__name__}")
+            await session.commit()
+            return
+
+        await jobs_repo.finish(session, job, result)
+        await session.commit()
+
+
+async def _import_courses(
+    session: AsyncSession, job: SyncJob, user: User, token: str
+) -> dict[str, Any]:
+    classroom_courses = await google_classroom_service.fetch_courses(token)
+    progress: dict[str, dict[str, Any]] = {
+        classroom_course.id: {"status": "pending"} for classroom_course in classroom_courses
+    }
+    await jobs_repo.mark_running(session, job, progress)
+    await session.commit()
+
+    existing_memberships = await memberships_repo.list_for_user(session, user.id)
+    match_index = await UserMatchIndex.load(session)
+
+    classroom_by_id = {classroom_course.id: classroom_course for classroom_course in classroom_courses}
+    synced: dict[str, CourseRead] = {}
+    desired_membership_course_ids: set[str] = set()
+    totals = {"participants": 0, "assignments": 0, "submissions": 0}
+    teaches_any = False
+
+    # Each course is stored and reported as soon as its bundle arrives
+    async for bundle in google_classroom_service.iter_course_bundles(token, list(classroom_by_id)):
+        classroom_course = classroom_by_id[bundle.course_id]
+        course, counters = await sync_course(session, user, classroom_course, bundle, match_index)
+        synced[classroom_course.id] = course
+        if classroom_course.is_teacher:
+            teaches_any = True
+        if classroom_course.is_teacher or classroom_course.is_student:
+            desired_membership_course_ids.add(classroom_course.id)
+        for key, value in counters.items():
+            totals[key] += value
+
+        progress[classroom_course.id] = {"status": "done", **counters}
+        await jobs_repo.set_progress(session, job, progress)
+        await session.commit()
+
+    for membership in existing_memberships:
+        if membership.course_id not in desired_membership_course_ids:
+            await memberships_repo.delete(session, membership)
+    await session.commit()
+
+    if user.role not in {UserRole.ADMIN, UserRole.COORDINATOR}:
+        desired_role = UserRole.TEACHER if teaches_any else UserRole.STUDENT
+        if user.role != desired_role:
+            await users_repo.update(session, user, UserUpdate(role=desired_role))
+
+    return {
+        "items": [
+            synced[classroom_course.id].model_dump(mode="json") for classroom_course in classroom_courses
+        ],
+        "count": len(synced),
+        **totals,
+    }
+
+
+async def sync_course(
+    session: AsyncSession,
+    user: User,
+    classroom_course: ClassroomCourse,
+    bundle: ClassroomCourseBundle,
+    match_index: UserMatchIndex,
+) -> tuple[CourseRead, dict[str, int]]:
+    """Persist one Classroom course (course row, membership, roster, coursework, submissions)."""
+
+    existing = await courses_repo.get(session, classroom_course.id)
+    teacher_id = existing.teacher_id if existing else None
+
+    if classroom_course.is_teacher:
+        teacher_id = user.id
+    elif existing and existing.teacher_id == user.id:
+        teacher_id = None
+
+    description = f"Curso sincronizado desde Classroom por {user.name}"
+    if existing:
+        course = await courses_repo.update(
+            session,
+            existing,
+            CourseUpdate(name=classroom_course.name, description=description, teacher_id=teacher_id),
+        )
+    else:
+        course = await courses_repo.create(
+            session,
+            CourseCreate(
+                id=classroom_course.id,
+                name=classroom_course.name,
+                description=description,
+                teacher_id=teacher_id,
+            ),
+        )
+
+    membership_role: ClassroomMemberRole | None = None
+    if classroom_course.is_teacher:
+        membership_role = ClassroomMemberRole.TEACHER
+    elif classroom_course.is_student:
+        membership_role = ClassroomMemberRole.STUDENT
+
+    if membership_role:
+        await memberships_repo.upsert(
+            session,
+            course_id=classroom_course.id,
+            user_id=user.id,
+            role=membership_role,
+        )
+
+    written_participants = await reconcile_roster(
+        session,
+        classroom_course.id,
+        [
+            RosterEntry(
+                google_user_id=participant.google_user_id,
+                email=participant.email,
+                full_name=participant.full_name,
+                photo_url=participant.photo_url,
+                role=ParticipantRole.TEACHER if participant.role == "teacher" else ParticipantRole.STUDENT,
+            )
+            for participant in bundle.participants
+        ],
+        match_index,
+    )
+    participant_match_index = {
+        record["google_user_id"]: record["matched_user_id"] for record in written_participants
+    }
+
+    existing_assignments = await assignments_repo.list_for_course(session, classroom_course.id)
+    seen_assignment_ids: set[str] = set()
+    for assignment in bundle.assignments:
+        record = await assignments_repo.upsert(
+            session,
+            assignment_id=assignment.coursework_id,
+            course_id=assignment.course_id,
+            title=assignment.title,
+            description=assignment.description,
+            work_type=assignment.work_type,
+            state=assignment.state,
+            due_at=assignment.due_at,
+            alternate_link=assignment.alternate_link,
+            max_points=assignment.max_points,
+            created_time=assignment.created_time,
+            updated_time=assignment.updated_time,
+            assignee_mode=assignment.assignee_mode,
+            assignee_user_ids=assignment.assignee_user_ids,
+        )
+        seen_assignment_ids.add(record.id)
+
+    for assignment in existing_assignments:
+        if assignment.id not in seen_assignment_ids:
+            await assignments_repo.delete(session, assignment)
+
+    existing_submissions = await submissions_repo.list_for_course(session, classroom_course.id)
+    seen_submission_ids: set[str] = set()
+    for submission in bundle.submissions:
+        record = await submissions_repo.upsert(
+            session,
+            submission_id=submission.submission_id,
+            course_id=submission.course_id,
+            coursework_id=submission.coursework_id,
+            google_user_id=submission.google_user_id,
+            matched_user_id=participant_match_index.get(submission.google_user_id),
+            state=submission.state,
+            late=submission.late,
+            turned_in_at=submission.turned_in_at,
+            assigned_grade=submission.assigned_grade,
+            draft_grade=submission.draft_grade,
+            attachments=submission.attachments,
+            updated_time=submission.updated_time,
+        )
+        seen_submission_ids.add(record.id)
+
+    for submission in existing_submissions:
+        if submission.id not in seen_submission_ids:
+            await submissions_repo.delete(session, submission)
+    # Full reconciliation (with deletes): recount the rollups instead of diffing.
+    await course_metrics_repo.rebuild(session, classroom_course.id)
+    await data_versions_repo.bump(session, [classroom_course.id])
+
+    return CourseRead.model_validate(course), {
+        "participants": len(written_participants),
+        "assignments": len(seen_assignment_ids),
+        "submissions": len(seen_submission_ids),
+    }
+
+
+__all__ = [
+    "enqueue_classroom_sync",
+    "fail_interrupted_jobs",
+    "run_classroom_sync",
+    "shutdown_jobs",
+    "sync_course",
+]
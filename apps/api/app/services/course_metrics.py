@@ -0,0 +1,42 @@
+"""Backfill of the ``course_metrics`` rollups.
+
+The sync keeps the rollups up to date incrementally; this rebuilds them from
+``course_submissions`` after a deploy, a manual data fix or a suspected drift::
+
+    python -m app.services.course_metrics            # every course
+    python -m app.services.course_metrics --course ID
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+
+from app.core.logging import configure_logging
+from app.db.session import AsyncSessionLocal
+from app.repositories import course_metrics as course_metrics_repo
+
+logger = logging.getLogger("nerdeala.course_metrics")
+
+
+async def rebuild_course_metrics(course_id: str | None = None) -> None:
+    async with AsyncSessionLocal() as session:
+        await course_metrics_repo.rebuild(session, course_id)
+        await session.commit()
+    logger.info("Métricas de curso reconstruidas (%s)", course_id or "todos los cursos")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Reconstruye las métricas agregadas por curso.")
+    parser.add_argument("--course", dest="course_id", default=None, help="Solo este curso")
+    args = parser.parse_args(argv)
+    configure_logging()
+    asyncio.run(rebuild_course_metrics(args.course_id))
+
+
+if __name__ == "__main__":
+    main()
+
+
+__all__ = ["main", "rebuild_course_metrics"]
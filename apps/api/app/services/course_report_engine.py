@@ -0,0 +1,488 @@
+from __future__ import annotations
+
+from collections import Counter
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Any
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.course_assignment import CourseAssignment
+from app.models.course_participant import CourseParticipant, ParticipantRole
+from app.repositories import course_metrics as course_metrics_repo
+from app.repositories import course_report_aggregates as aggregates_repo
+
+RECENT_ACTIVITY_WINDOW = timedelta(days=7)
+UPCOMING_WINDOW = timedelta(days=14)
+
+
+@dataclass(slots=True)
+class SubmissionTally:
+    total: int = 0
+    submitted: int = 0
+    drafts: int = 0
+    late: int = 0
+    graded: int = 0
+    grade_sum: float = 0.0
+
+    @classmethod
+    def from_row(cls, row: Any) -> SubmissionTally:
+        return cls(
+            total=row.total,
+            submitted=row.submitted,
+            drafts=row.drafts,
+            late=row.late,
+            graded=row.graded,
+            grade_sum=row.grade_sum,
+        )
+
+    def merge(self, other: SubmissionTally) -> None:
+        self.total += other.total
+        self.submitted += other.submitted
+        self.drafts += other.drafts
+        self.late += other.late
+        self.graded += other.graded
+        self.grade_sum += other.grade_sum
+
+    @property
+    def average_grade(self) -> float | None:
+        return self.grade_sum / self.graded if self.graded else None
+
+
+@dataclass(slots=True)
+class AttendanceTally:
+    present: int = 0
+    total: int = 0
+
+    @property
+    def absent(self) -> int:
+        return self.total - self.present
+
+    @property
+    def rate(self) -> float:
+        return self.present / self.total if self.total else 0
+
+
+_EMPTY_SUBMISSIONS = SubmissionTally()
+_EMPTY_ATTENDANCE = AttendanceTally()
+
+
+@dataclass(slots=True)
+class CourseReportIndex:
+    """Everything the course report needs, aggregated by the database.
+
+    Submissions are tallied per student (``google_user_id``) and per coursework,
+    attendance per ``student_id``; every report section then reads these
+    indexes. The tallies come from the ``course_metrics`` rollups when the
+    course has them, from ``GROUP BY`` queries otherwise. Only participants and
+    assignments are loaded as rows.
+    """
+
+    students: Sequence[CourseParticipant]
+    teachers: Sequence[CourseParticipant]
+    assignments: Sequence[CourseAssignment]
+    now: datetime
+    submissions: SubmissionTally = field(default_factory=SubmissionTally)
+    by_student: dict[str, SubmissionTally] = field(default_factory=dict)
+    by_assignment: dict[str, SubmissionTally] = field(default_factory=dict)
+    grades: dict[str, Any] | None = None
+    turned_in_weekdays: Counter[int] = field(default_factory=Counter)
+    turned_in_hours: Counter[int] = field(default_factory=Counter)
+    turned_in_weeks: Counter[str] = field(default_factory=Counter)
+    completed: int = 0
+    last_minute: int = 0
+    recent: int = 0
+    attendance: AttendanceTally = field(default_factory=AttendanceTally)
+    attendance_by_student: dict[str, AttendanceTally] = field(default_factory=dict)
+    attendance_sessions: int = 0
+
+    @classmethod
+    async def load(
+        cls,
+        session: AsyncSession,
+        course_id: str,
+        participants: Sequence[CourseParticipant],
+        assignments: Sequence[CourseAssignment],
+        *,
+        include_attendance: bool = True,
+        now: datetime | None = None,
+    ) -> CourseReportIndex:
+        index = cls(
+            students=[p for p in participants if p.role == ParticipantRole.STUDENT],
+            teachers=[p for p in participants if p.role == ParticipantRole.TEACHER],
+            assignments=assignments,
+            now=now or datetime.now(),
+        )
+
+        rollup = await course_metrics_repo.get_course(session, course_id)
+        if rollup is not None:
+            # Counters maintained by the sync: no scan of the course's submissions
+            index.submissions = SubmissionTally.from_row(rollup)
+            student_rows = await course_metrics_repo.list_students(session, course_id)
+            assignment_rows = await course_metrics_repo.list_assignments(session, course_id)
+            index.by_student = {row.google_user_id: SubmissionTally.from_row(row) for row in student_rows}
+            index.by_assignment = {row.coursework_id: SubmissionTally.from_row(row) for row in assignment_rows}
+        else:
+            for row in await aggregates_repo.submission_tallies_by_student(session, course_id):
+                index.by_student[row.key] = SubmissionTally.from_row(row)
+            for row in await aggregates_repo.submission_tallies_by_assignment(session, course_id):
+                tally = index.by_assignment[row.key] = SubmissionTally.from_row(row)
+                index.submissions.merge(tally)
+        timing = await aggregates_repo.turn_in_timing(
+            session, course_id, recent_since=index.now - RECENT_ACTIVITY_WINDOW
+        )
+        index.recent, index.last_minute = timing.recent, timing.last_minute
+        index.grades = await aggregates_repo.grade_stats(session, course_id)
+
+        # SQL weekdays start on Sunday; Python's (and the report's) on Monday
+        histogram = sorted(
+            ((row.weekday + 6) % 7, row.hour, row.count)
+            for row in await aggregates_repo.completed_turn_in_histogram(session, course_id)
+        )
+        for weekday, hour, count in histogram:
+            index.turned_in_weekdays[weekday] += count
+            index.turned_in_hours[hour] += count
+            index.completed += count
+        for row in await aggregates_repo.turn_ins_per_week(session, course_id):
+            index.turned_in_weeks[row.week] = row.count
+
+        if include_attendance:
+            for row in await aggregates_repo.attendance_by_student(session, course_id):
+                attendance = index.attendance_by_student[row.student_id] = AttendanceTally(
+                    present=row.present, total=row.total
+                )
+                index.attendance.present += attendance.present
+                index.attendance.total += attendance.total
+            if index.attendance.total:
+                index.attendance_sessions = await aggregates_repo.attendance_session_count(
+                    session, course_id
+                )
+        return index
+
+    def for_student(self, student: CourseParticipant) -> SubmissionTally:
+        return self.by_student.get(student.google_user_id, _EMPTY_SUBMISSIONS)
+
+    def for_assignment(self, assignment: CourseAssignment) -> SubmissionTally:
+        return self.by_assignment.get(assignment.id, _EMPTY_SUBMISSIONS)
+
+    def attendance_for(self, student: CourseParticipant) -> AttendanceTally:
+        return self.attendance_by_student.get(student.id, _EMPTY_ATTENDANCE)
+
+
+def _percent(part: float, whole: float) -> float:
+    return part / whole * 100 if whole else 0
+
+
+def summary_metrics(index: CourseReportIndex) -> dict[str, Any]:
+    """Key summary metrics for the course."""
+
+    total_students = len(index.students)
+    total_assignments = len(index.assignments)
+    totals = index.submissions
+
+    if total_students > 0 and total_assignments > 0:
+        expected_submissions = total_students * total_assignments
+        participation_rate = totals.total / expected_submissions * 100
+        completion_rate = totals.submitted / expected_submissions * 100
+    else:
+        participation_rate = 0
+        completion_rate = 0
+    attendance_rate = _percent(index.attendance.present, index.attendance.total)
+
+    return {
+        "total_students": total_students,
+        "total_assignments": total_assignments,
+        "total_submissions": totals.total,
+        "submitted_count": totals.submitted,
+        "draft_count": totals.drafts,
+        "late_submissions": totals.late,
+        "participation_rate": round(participation_rate, 1),
+        "completion_rate": round(completion_rate, 1),
+        "attendance_rate": round(attendance_rate, 1),
+        "course_activity_score": round(((participation_rate + completion_rate + attendance_rate) / 3), 1),
+        "students_with_no_submissions": sum(
+            1 for student in index.students if student.google_user_id not in index.by_student
+        ),
+        "average_submissions_per_student": round(totals.total / total_students, 1) if total_students > 0 else 0,
+        "most_active_period": most_active_period(index),
+    }
+
+
+def most_active_period(index: CourseReportIndex) -> str:
+    if not index.submissions.total:
+        return "No activity"
+    if not index.turned_in_weeks:
+        return "No completed submissions"
+    week, count = max(index.turned_in_weeks.items(), key=lambda item: item[1])
+    return f"Week of {week} ({count} submissions)"
+
+
+def engagement_metrics(index: CourseReportIndex) -> dict[str, Any]:
+    """Student engagement: turn-in rate averaged with attendance."""
+
+    total_students = len(index.students)
+    highly_engaged = moderately_engaged = low_engaged = 0
+    student_engagement: dict[str, dict[str, Any]] = {}
+
+    for student in index.students:
+        submissions = index.for_student(student)
+        sub_rate = submissions.total / len(index.assignments) if index.assignments else 0
+        attend_rate = index.attendance_for(student).rate
+        engagement_score = (sub_rate + attend_rate) / 2
+
+        student_engagement[student.id] = {
+            "name": student.full_name,
+            "engagement_score": round(engagement_score * 100, 1),
+            "submissions": submissions.total,
+            "attendance_rate": round(attend_rate * 100, 1),
+        }
+        if engagement_score > 0.8:
+            highly_engaged += 1
+        elif engagement_score > 0.5:
+            moderately_engaged += 1
+        else:
+            low_engaged += 1
+
+    return {
+        "highly_engaged_students": highly_engaged,
+        "moderately_engaged_students": moderately_engaged,
+        "low_engaged_students": low_engaged,
+        "engagement_distribution": {
+            "high": round(_percent(highly_engaged, total_students), 1),
+            "medium": round(_percent(moderately_engaged, total_students), 1),
+            "low": round(_percent(low_engaged, total_students), 1),
+        },
+        "top_engaged_students": sorted(
+            student_engagement.values(), key=lambda item: item["engagement_score"], reverse=True
+        )[:5],
+    }
+
+
+def grade_analysis(index: CourseReportIndex) -> dict[str, Any]:
+    stats = index.grades
+    if not stats:
+        return {"available": False, "message": "No graded submissions available"}
+
+    count, buckets = stats["count"], stats["buckets"]
+    return {
+        "available": True,
+        "total_graded": count,
+        "average_grade": round(stats["sum"] / count, 1),
+        "max_grade": stats["max"],
+        "min_grade": stats["min"],
+        "median_grade": round(stats["median"], 1),
+        "grade_distribution": buckets,
+        "passing_rate": round(_percent(count - buckets["F (<60)"], count), 1),
+        "excellence_rate": round(_percent(buckets["A (90-100)"], count), 1),
+    }
+
+
+def time_patterns(index: CourseReportIndex) -> dict[str, Any]:
+    """Turn-in day/hour peaks and how many arrive within a day of the deadline."""
+
+    if not index.submissions.total:
+        return {"available": False, "message": "No submission data available"}
+    if not index.completed:
+        return {"available": False, "message": "No completed submissions available"}
+
+    # strftime per weekday rather than per submission; 2024-01-01 was a Monday
+    day_distribution = {
+        date(2024, 1, 1 + weekday).strftime("%A"): count
+        for weekday, count in index.turned_in_weekdays.items()
+    }
+    peak_day = max(day_distribution.items(), key=lambda item: item[1])[0]
+    peak_hour = max(index.turned_in_hours.items(), key=lambda item: item[1])[0]
+    return {
+        "available": True,
+        "total_analyzed": index.completed,
+        "peak_submission_day": peak_day,
+        "peak_submission_hour": f"{peak_hour}:00",
+        "day_distribution": day_distribution,
+        "last_minute_submissions": index.last_minute,
+        "last_minute_rate": round(_percent(index.last_minute, index.completed), 1),
+    }
+
+
+def assignment_row(index: CourseReportIndex, assignment: CourseAssignment) -> dict[str, Any]:
+    tally = index.for_assignment(assignment)
+    average_grade = tally.average_grade
+    return {
+        "id": assignment.id,
+        "title": assignment.title,
+        "due_at": assignment.due_at.isoformat() if assignment.due_at else None,
+        "max_points": assignment.max_points,
+        "submission_rate": round(_percent(tally.submitted, len(index.students)), 1),
+        "total_submissions": tally.total,
+        "submitted_count": tally.submitted,
+        "draft_count": tally.drafts,
+        "late_count": tally.late,
+        "average_grade": round(average_grade, 1) if average_grade else None,
+        "graded_count": tally.graded,
+    }
+
+
+def assignments_analysis(index: CourseReportIndex) -> dict[str, Any]:
+    rows = [assignment_row(index, assignment) for assignment in index.assignments]
+    # Worst submission rate first, so it gets attention
+    rows.sort(key=lambda row: row["submission_rate"])
+    return {
+        "assignments": rows,
+        "best_performing": rows[-3:],
+        "worst_performing": rows[:3],
+    }
+
+
+def students_overview(index: CourseReportIndex) -> dict[str, Any]:
+    summaries: list[dict[str, Any]] = []
+    for student in index.students:
+        submissions = index.for_student(student)
+        attendance = index.attendance_for(student)
+        attendance_rate = attendance.rate * 100
+        submission_score = _percent(submissions.submitted, index.submissions.total)
+        summaries.append(
+            {
+                "id": student.id,
+                "google_user_id": student.google_user_id,
+                "name": student.full_name,
+                "email": student.email,
+                "total_submissions": submissions.total,
+                "completed_submissions": submissions.submitted,
+                "attendance_rate": round(attendance_rate, 1),
+                "performance_score": round((submission_score + attendance_rate) / 2, 1),
+            }
+        )
+
+    summaries.sort(key=lambda item: item["performance_score"], reverse=True)
+    return {
+        "students": summaries,
+        "top_performers": summaries[:5],
+        "at_risk_students": [item for item in summaries if item["performance_score"] < 60],
+    }
+
+
+def students_detailed(index: CourseReportIndex) -> dict[str, Any]:
+    # Same data as the overview; the per-student breakdown is served on request
+    return {
+        "available": True,
+        "student_count": len(index.students),
+        "details": "Detailed individual student analysis available on request",
+    }
+
+
+def attendance_analysis(index: CourseReportIndex) -> dict[str, Any]:
+    attendance = index.attendance
+    if not attendance.total:
+        return {"available": False, "message": "No attendance data available"}
+
+    per_student = index.attendance_by_student.values()
+    return {
+        "available": True,
+        "overall_rate": round(attendance.rate * 100, 1),
+        "total_sessions": index.attendance_sessions,
+        "average_attendance": round(attendance.present / len(index.students), 1) if index.students else 0,
+        "students_with_perfect_attendance": sum(1 for tally in per_student if tally.absent == 0),
+        "students_with_attendance_issues": sum(
+            1 for tally in per_student if tally.total > 0 and tally.rate < 0.8
+        ),
+    }
+
+
+def temporal_trends(index: CourseReportIndex) -> dict[str, Any]:
+    horizon = index.now + UPCOMING_WINDOW
+    upcoming = [
+        assignment.due_at
+        for assignment in index.assignments
+        if assignment.due_at and index.now < assignment.due_at <= horizon
+    ]
+    return {
+        "upcoming_deadlines": len(upcoming),
+        "next_deadline": min(upcoming, default=None),
+        "recent_activity": index.recent,
+        "trend_analysis": "Available - submission patterns over time",
+    }
+
+
+def alerts_and_recommendations(index: CourseReportIndex) -> dict[str, Any]:
+    alerts: list[dict[str, Any]] = []
+    recommendations: list[dict[str, Any]] = []
+
+    at_risk_count = 0
+    if index.assignments:
+        for student in index.students:
+            completion_rate = index.for_student(student).submitted / len(index.assignments)
+            if completion_rate < 0.6:
+                at_risk_count += 1
+                alerts.append(
+                    {
+                        "type": "student_at_risk",
+                        "message": f"{student.full_name} has low completion rate ({completion_rate*100:.1f}%)",
+                        "severity": "high" if completion_rate < 0.4 else "medium",
+                        "student_id": student.id,
+                    }
+                )
+
+    deadline_alerts = 0
+    for assignment in index.assignments:
+        if not assignment.due_at:
+            continue
+        days_until_due = (assignment.due_at - index.now).days
+        if not 0 <= days_until_due <= 3:
+            continue
+        submission_rate = (
+            index.for_assignment(assignment).submitted / len(index.students) if index.students else 0
+        )
+        if submission_rate < 0.5:
+            deadline_alerts += 1
+            alerts.append(
+                {
+                    "type": "assignment_deadline",
+                    "message": f"'{assignment.title}' due soon with low submission rate ({submission_rate*100:.1f}%)",
+                    "severity": "high",
+                    "assignment_id": assignment.id,
+                }
+            )
+
+    if at_risk_count > 0:
+        recommendations.append(
+            {
+                "type": "intervention",
+                "message": f"Consider reaching out to {at_risk_count} students with low completion rates",
+                "action": "individual_support",
+            }
+        )
+    if deadline_alerts > 0:
+        recommendations.append(
+            {
+                "type": "deadline_management",
+                "message": "Send reminders for upcoming assignments with low submission rates",
+                "action": "send_notifications",
+            }
+        )
+
+    return {
+        "alerts": alerts,
+        "recommendations": recommendations,
+        "summary": {
+            "total_alerts": len(alerts),
+            "high_priority": sum(1 for alert in alerts if alert.get("severity") == "high"),
+            "students_at_risk": at_risk_count,
+        },
+    }
+
+
+__all__ = [
+    "CourseReportIndex",
+    "alerts_and_recommendations",
+    "assignment_row",
+    "assignments_analysis",
+    "attendance_analysis",
+    "engagement_metrics",
+    "grade_analysis",
+    "most_active_period",
+    "students_detailed",
+    "students_overview",
+    "summary_metrics",
+    "temporal_trends",
+    "time_patterns",
+]
@@ -1,13 +1,17 @@
 from __future__ import annotations
 
+import asyncio
+from collections.abc import AsyncIterator, Awaitable, Iterable
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from typing import Any
 
 import httpx
-from tenacity import RetryError, retry, stop_after_attempt, wait_exponential
+from tenacity import RetryError, retry, retry_if_exception_type, stop_after_attempt, wait_exponential
 
 from app.core.config import settings
+from app.services.http_client import get_http_client
+from app.services.rate_limit import send_with_backoff
 
 
 @dataclass(slots=True)
@@ -63,15 +67,34 @@ class ClassroomSubmission:
     updated_time: datetime | None = None
 
 
+@dataclass(slots=True)
+class ClassroomCourseBundle:
+    course_id: str
+    participants: list[ClassroomParticipant] = field(default_factory=list)
+    assignments: list[ClassroomAssignment] = field(default_factory=list)
+    submissions: list[ClassroomSubmission] = field(default_factory=list)
+
+
 class ClassroomIntegrationError(RuntimeError):
     pass
 
 
+# What a failed Classroom call raises once ``_request`` gives up
+_REQUEST_ERRORS = (RetryError, httpx.HTTPError)
+
+
 class GoogleClassroomService:
-    def __init__(self, base_url: str | None = None) -> None:
+    def __init__(self, base_url: str | None = None, concurrency: int | None = None) -> None:
         self._base_url = base_url or settings.classroom_api_base_url
-
-    @retry(wait=wait_exponential(multiplier=1, min=1, max=10), stop=stop_after_attempt(3))
+        self._concurrency = concurrency or settings.classroom_sync_workers
+
+    # 429/503 are retried by send_with_backoff and other statuses won't change on a
+    # retry, so only transport failures (timeouts, dropped connections) are retried here.
+    @retry(
+        retry=retry_if_exception_type(httpx.TransportError),
+        wait=wait_exponential(multiplier=1, min=1, max=10),
+        stop=stop_after_attempt(3),
+    )
     async def _request(
         self, method: str, endpoint: str, token: str, **kwargs: Any
     ) -> Any:
@@ -79,23 +102,27 @@ class GoogleClassroomService:
             # Demo mode: return fixture data without making network calls.
             return self._demo_response(endpoint, **kwargs)
 
-        async with httpx.AsyncClient() as client:
-            response = await client.request(
+        response = await send_with_backoff(
+            token,
+            lambda: get_http_client().request(
                 method,
                 f"{self._base_url}{endpoint}",
                 headers={"Authorization": f"Bearer {token}"},
                 timeout=10,
                 **kwargs,
-            )
+            ),
+        )
         response.raise_for_status()
         return response.json()
 
     async def fetch_courses(self, token: str) -> list[ClassroomCourse]:
         try:
-            all_courses = await self._list_courses(token)
-            teacher_courses = await self._list_courses(token, params={"teacherId": "me"})
-            student_courses = await self._list_courses(token, params={"studentId": "me"})
-        except RetryError as exc:  # pragma: no cover - network path
+            all_courses, teacher_courses, student_courses = await _gather(
+                self._list_courses(token),
+                self._list_courses(token, params={"teacherId": "me"}),
+                self._list_courses(token, params={"studentId": "me"}),
+            )
+        except _REQUEST_ERRORS as exc:  # pragma: no cover - network path
             raise ClassroomIntegrationError(
                 "No se pudo sincronizar cursos de Classroom"
             ) from exc
@@ -143,9 +170,11 @@ class GoogleClassroomService:
 
     async def fetch_participants(self, token: str, course_id: str) -> list[ClassroomParticipant]:
         try:
-            teachers = await self._list_course_people(token, course_id, role="teachers")
-            students = await self._list_course_people(token, course_id, role="students")
-        except RetryError as exc:  # pragma: no cover - network path
+            teachers, students = await _gather(
+                self._list_course_people(token, course_id, role="teachers"),
+                self._list_course_people(token, course_id, role="students"),
+            )
+        except _REQUEST_ERRORS as exc:  # pragma: no cover - network path
             raise ClassroomIntegrationError(
                 "No se pudo obtener la lista de participantes de Classroom"
             ) from exc
@@ -181,7 +210,7 @@ class GoogleClassroomService:
     async def fetch_assignments(self, token: str, course_id: str) -> list[ClassroomAssignment]:
         try:
             courseworks = await self._list_coursework(token, course_id)
-        except RetryError as exc:  # pragma: no cover - network path
+        except _REQUEST_ERRORS as exc:  # pragma: no cover - network path
             raise ClassroomIntegrationError(
                 "No se pudo obtener las tareas de Classroom"
             ) from exc
@@ -235,7 +264,7 @@ class GoogleClassroomService:
     async def fetch_submissions(self, token: str, course_id: str) -> list[ClassroomSubmission]:
         try:
             submissions = await self._list_course_submissions(token, course_id)
-        except RetryError as exc:  # pragma: no cover - network path
+        except _REQUEST_ERRORS as exc:  # pragma: no cover - network path
             raise ClassroomIntegrationError(
                 "No se pudo obtener las entregas de Classroom"
             ) from exc
@@ -278,6 +307,51 @@ class GoogleClassroomService:
 
         return parsed
 
+    async def fetch_course_bundle(self, token: str, course_id: str) -> ClassroomCourseBundle:
+        """Fetch participants, assignments and submissions of a course concurrently."""
+        participants, assignments, submissions = await _gather(
+            self.fetch_participants(token, course_id),
+            self.fetch_assignments(token, course_id),
+            self.fetch_submissions(token, course_id),
+        )
+        return ClassroomCourseBundle(
+            course_id=course_id,
+            participants=participants,
+            assignments=assignments,
+            submissions=submissions,
+        )
+
+    async def iter_course_bundles(
+        self, token: str, course_ids: Iterable[str]
+    ) -> AsyncIterator[ClassroomCourseBundle]:
+        """Yield course bundles as they arrive, with at most ``concurrency`` fetched ahead.
+
+        Only the bundles in flight are held in memory, and the caller can store and
+        report each course while the next ones download.
+        """
+        remaining = iter(course_ids)
+        in_flight: set[asyncio.Task[ClassroomCourseBundle]] = set()
+
+        def _start_next() -> None:
+            course_id = next(remaining, None)
+            if course_id is not None:
+                in_flight.add(asyncio.create_task(self.fetch_course_bundle(token, course_id)))
+
+        for _ in range(self._concurrency):
+            _start_next()
+        try:
+            while in_flight:
+                done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                task = done.pop()
+                in_flight.discard(task)
+                bundle = task.result()
+                _start_next()
+                yield bundle
+        finally:
+            for task in in_flight:
+                task.cancel()
+            await asyncio.gather(*in_flight, return_exceptions=True)
+
     async def _list_courses(self, token: str, params: dict[str, Any] | None = None) -> list[dict[str, Any]]:
         params = params.copy() if params else {}
         params.setdefault("courseStates", "ACTIVE")
@@ -343,18 +417,16 @@ class GoogleClassroomService:
                 query_params["pageToken"] = page_token
             try:
                 payload = await self._request("GET", endpoint, token, params=query_params or None)
-            except RetryError as exc:
-                last = exc.last_attempt.exception()
-                if isinstance(last, httpx.HTTPStatusError):
-                    status = last.response.status_code
-                    if status == 403:
-                        return []
-                    if status == 400 and params is not None:
-                        # Retry without the custom fields projection.
-                        params = None
-                        page_token = None
-                        items = []
-                        continue
+            except httpx.HTTPStatusError as exc:
+                status = exc.response.status_code
+                if status == 403:
+                    return []
+                if status == 400 and params is not None:
+                    # Retry without the custom fields projection.
+                    params = None
+                    page_token = None
+                    items = []
+                    continue
                 raise
             courseworks = payload.get("courseWork") if isinstance(payload, dict) else None
             if isinstance(courseworks, list):
@@ -381,17 +453,15 @@ class GoogleClassroomService:
                 query_params["pageToken"] = page_token
             try:
                 payload = await self._request("GET", endpoint, token, params=query_params or None)
-            except RetryError as exc:
-                last = exc.last_attempt.exception()
-                if isinstance(last, httpx.HTTPStatusError):
-                    status = last.response.status_code
-                    if status == 403:
-                        return []
-                    if status == 400 and params is not None:
-                        params = None
-                        page_token = None
-                        items = []
-                        continue
+            except httpx.HTTPStatusError as exc:
+                status = exc.response.status_code
+                if status == 403:
+                    return []
+                if status == 400 and params is not None:
+                    params = None
+                    page_token = None
+                    items = []
+                    continue
                 raise
             submissions = payload.get("studentSubmissions") if isinstance(payload, dict) else None
             if isinstance(submissions, list):
@@ -515,6 +585,17 @@ class GoogleClassroomService:
 google_classroom_service = GoogleClassroomService()
 
 
+async def _gather(*awaitables: Awaitable[Any]) -> list[Any]:
+    """``asyncio.gather`` that cancels the remaining fetches when one of them fails."""
+    tasks = [asyncio.ensure_future(awaitable) for awaitable in awaitables]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+
+
 def _extract_email(person: dict[str, Any]) -> str | None:
     profile = person.get("profile") if isinstance(person, dict) else None
     if isinstance(profile, dict):
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import asyncio
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 
 import httpx
@@ -7,6 +9,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
 from app.repositories import oauth_credentials
+from app.services.http_client import get_http_client
 
 
 GOOGLE_AUTH_URL = "https://accounts.google.com/o/oauth2/v2/auth"
@@ -21,27 +24,90 @@ class GoogleOAuthError(RuntimeError):
     """Raised when interacting with Google OAuth fails."""
 
 
-async def ensure_google_access_token(
-    session: AsyncSession, user_id: str, *, force_refresh: bool = False
-) -> str:
-    """Return a valid Google access token, refreshing it if it is close to expiring."""
+@dataclass(slots=True)
+class _CachedToken:
+    access_token: str
+    valid_until: datetime
+    cached_at: datetime
 
-    credential = await oauth_credentials.get_google_credentials(session, user_id)
-    if not credential:
-        raise GoogleOAuthError("No hay credenciales de Google almacenadas")
 
-    expires_at = credential.token_expires_at
-    refresh_needed = force_refresh
-    if not refresh_needed and expires_at is not None:
-        refresh_needed = expires_at <= datetime.utcnow() + timedelta(seconds=TOKEN_REFRESH_MARGIN_SECONDS)
+class GoogleTokenManager:
+    """Process-wide cache of Google access tokens with single-flight refreshes.
+
+    Tokens are served from memory until ``TOKEN_REFRESH_MARGIN_SECONDS`` before
+    they expire. Concurrent callers for the same user (scheduler ticks and
+    interactive requests alike) queue on a per-user lock, so only the first one
+    reads the credential or calls Google's token endpoint and the rest reuse it.
+    """
+
+    def __init__(self, margin_seconds: int = TOKEN_REFRESH_MARGIN_SECONDS) -> None:
+        self._margin = timedelta(seconds=margin_seconds)
+        self._tokens: dict[str, _CachedToken] = {}
+        self._locks: dict[str, asyncio.Lock] = {}
+
+    async def get_token(
+        self, session: AsyncSession, user_id: str, *, force_refresh: bool = False
+    ) -> str:
+        requested_at = datetime.utcnow()
+        cached = self._fresh(user_id, requested_at)
+        if cached is not None and not force_refresh:
+            return cached.access_token
+
+        lock = self._locks.setdefault(user_id, asyncio.Lock())
+        async with lock:
+            cached = self._fresh(user_id, datetime.utcnow())
+            # Whoever held the lock before us already refreshed on our behalf.
+            if cached is not None and (not force_refresh or cached.cached_at >= requested_at):
+                return cached.access_token
+            return await self._load(session, user_id, force_refresh=force_refresh)
+
+    def store(self, user_id: str, access_token: str, expires_at: datetime | None) -> None:
+        now = datetime.utcnow()
+        # Without an expiry we cannot tell when Google stops accepting the token,
+        # so only trust it for one refresh margin before re-reading the credential.
+        valid_until = (expires_at - self._margin) if expires_at is not None else now + self._margin
+        self._tokens[user_id] = _CachedToken(access_token, valid_until, now)
+
+    def invalidate(self, user_id: str) -> None:
+        self._tokens.pop(user_id, None)
 
-    if refresh_needed:
-        credential = await _refresh_google_access_token(session, credential.user_id)
+    def _fresh(self, user_id: str, now: datetime) -> _CachedToken | None:
+        cached = self._tokens.get(user_id)
+        if cached is None or cached.valid_until <= now:
+            return None
+        return cached
 
-    if not credential.access_token:
-        raise GoogleOAuthError("No se dispone de un access token válido")
+    async def _load(self, session: AsyncSession, user_id: str, *, force_refresh: bool) -> str:
+        credential = await oauth_credentials.get_google_credentials(session, user_id)
+        if not credential:
+            self.invalidate(user_id)
+            raise GoogleOAuthError("No hay credenciales de Google almacenadas")
+
+        expires_at = credential.token_expires_at
+        refresh_needed = force_refresh
+        if not refresh_needed and expires_at is not None:
+            refresh_needed = expires_at <= datetime.utcnow() + self._margin
+
+        if refresh_needed:
+            credential = await _refresh_google_access_token(session, credential.user_id)
+
+        if not credential.access_token:
+            self.invalidate(user_id)
+            raise GoogleOAuthError("No se dispone de un access token válido")
+
+        self.store(user_id, credential.access_token, credential.token_expires_at)
+        return credential.access_token
+
+
+google_token_manager = GoogleTokenManager()
+
+
+async def ensure_google_access_token(
+    session: AsyncSession, user_id: str, *, force_refresh: bool = False
+) -> str:
+    """Return a valid Google access token, refreshing it if it is close to expiring."""
 
-    return credential.access_token
+    return await google_token_manager.get_token(session, user_id, force_refresh=force_refresh)
 
 
 async def _refresh_google_access_token(session: AsyncSession, user_id: str):
@@ -63,13 +129,13 @@ async def _refresh_google_access_token(session: AsyncSession, user_id: str):
     }
 
     try:
-        async with httpx.AsyncClient(timeout=HTTP_TIMEOUT_SECONDS) as client:
-            response = await client.post(
-                GOOGLE_TOKEN_URL,
-                data=data,
-                headers={"Content-Type": "application/x-www-form-urlencoded"},
-            )
-            response.raise_for_status()
+        response = await get_http_client().post(
+            GOOGLE_TOKEN_URL,
+            data=data,
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+            timeout=HTTP_TIMEOUT_SECONDS,
+        )
+        response.raise_for_status()
     except httpx.HTTPError as exc:  # pragma: no cover - network interaction
         raise GoogleOAuthError("No se pudo refrescar el token de Google") from exc
 
@@ -1,9 +1,12 @@
 from __future__ import annotations
 
 import asyncio
+import hashlib
 import logging
-from collections.abc import Iterable
-from datetime import datetime
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterable
+from contextlib import ExitStack, asynccontextmanager
+from datetime import datetime, timedelta, timezone
 from typing import Any
 
 import httpx
@@ -13,13 +16,19 @@ from app.core.config import settings
 from app.db.session import AsyncSessionLocal
 from app.models.course import Course
 from app.models.course_participant import ParticipantRole
+from app.repositories import assignment_announcements as announcements_repo
 from app.repositories import course_assignments as assignments_repo
+from app.repositories import course_data_versions as data_versions_repo
+from app.repositories import course_metrics as course_metrics_repo
 from app.repositories import course_participants as participants_repo
 from app.repositories import course_submissions as submissions_repo
 from app.repositories import courses as courses_repo
 from app.repositories import etag_cache as etag_repo
+from app.repositories import notification_outbox as outbox_repo
+from app.repositories import sync_runs as sync_runs_repo
+from app.repositories import sync_watermarks as watermarks_repo
 from app.repositories import user_contacts as user_contacts_repo
-from app.repositories import users as users_repo
+from app.services.assignment_digest import announce_pending_assignments
 from app.services.google_classroom import (
     _extract_email,
     _extract_full_name,
@@ -29,14 +38,28 @@ from app.services.google_classroom import (
     _parse_datetime,
     _parse_due_datetime,
 )
-from app.services.notifications.base import Notifier
-from app.services.notifications.http_wa import get_notifier
+from app.services.http_client import get_http_client
+from app.services.leases import CycleClaims
+from app.services.notifications.dispatcher import notification_dispatcher
+from app.services.rate_limit import current_quota_user, send_with_backoff
+from app.services.roster import RosterEntry, UserMatchIndex, reconcile_roster
+from app.services.sync_metrics import (
+    SyncRunRecorder,
+    record_request,
+    record_rows,
+    stage,
+    track_course,
+)
+from app.services.sync_priority import courses_not_due, record_course_poll
 
 logger = logging.getLogger("nerdeala.classroom.sync")
 
-SEM = asyncio.Semaphore(12)
 GOOGLE_TIMEOUT_SECONDS = 20.0
 CLASSROOM_BASE_URL = "https://classroom.googleapis.com/v1"
+SUBMISSIONS_CACHE_KEY = "subs"
+COURSE_LIST_TTL_SECONDS = 300.0
+
+_course_list_cache: dict[str, tuple[float, list[dict[str, Any]]]] = {}
 
 
 class ClassroomSyncResult(dict):
@@ -62,21 +85,27 @@ async def _get(
     params: dict[str, Any] | None = None,
     etag: str | None = None,
 ) -> dict[str, Any | None]:
-    async with SEM:
-        response = await client.get(
-            url,
-            params=params,
-            headers=_headers(token, etag),
-            timeout=GOOGLE_TIMEOUT_SECONDS,
+    with stage("fetch"):
+        response = await send_with_backoff(
+            token,
+            lambda: client.get(
+                url,
+                params=params,
+                headers=_headers(token, etag),
+                timeout=GOOGLE_TIMEOUT_SECONDS,
+            ),
         )
-    if response.status_code == httpx.codes.NOT_MODIFIED:
+    not_modified = response.status_code == httpx.codes.NOT_MODIFIED
+    record_request(len(response.content), not_modified=not_modified)
+    if not_modified:
         return {"not_modified": True, "etag": etag, "data": None}
     if response.status_code >= 400:
         _log_http_error(url, response)
     response.raise_for_status()
     data: Any | None
     try:
-        data = response.json()
+        with stage("parse"):
+            data = response.json()
     except ValueError:
         data = None
     return {
@@ -111,6 +140,19 @@ async def list_active_courses(client: httpx.AsyncClient, token: str) -> list[dic
     return list(courses.values())
 
 
+async def _cached_active_courses(client: httpx.AsyncClient, token: str) -> list[dict[str, Any]]:
+    key = hashlib.sha256(token.encode()).hexdigest()[:16]
+    cached = _course_list_cache.get(key)
+    now = time.monotonic()
+    if cached is not None and cached[0] > now:
+        return cached[1]
+    courses = await list_active_courses(client, token)
+    for stale_key in [k for k, (expires, _) in _course_list_cache.items() if expires <= now]:
+        del _course_list_cache[stale_key]
+    _course_list_cache[key] = (now + COURSE_LIST_TTL_SECONDS, courses)
+    return courses
+
+
 async def _list_courses_by_role(
     client: httpx.AsyncClient, token: str, extra: dict[str, Any]
 ) -> list[dict[str, Any]]:
@@ -136,58 +178,220 @@ async def _list_courses_by_role(
     return items
 
 
-async def sync_delta_courses(token: str) -> ClassroomSyncResult:
-    notifier = get_notifier()
-    summary: ClassroomSyncResult = ClassroomSyncResult(processed=0, courses=[])
+async def sync_delta_courses(
+    token: str,
+    *,
+    workers: int | None = None,
+    claims: CycleClaims | None = None,
+    adaptive: bool = False,
+    trigger: str = "api",
+) -> ClassroomSyncResult:
+    """Sync new submission activity for every active course of ``token``.
+
+    Each poll feeds the course's adaptive schedule. With ``adaptive`` (scheduler
+    ticks) only courses whose next poll is due are synced, and the course list is
+    reused for ``COURSE_LIST_TTL_SECONDS`` between ticks. Every call is recorded
+    in the ``sync_runs`` ledger, except scheduler ticks that synced no course.
+    """
+
+    summary: ClassroomSyncResult = ClassroomSyncResult(processed=0, courses=[], timings={})
+    recorder = SyncRunRecorder("delta", trigger, user_id=current_quota_user())
+
+    async def _sync_one(session: AsyncSession, client: httpx.AsyncClient, course_id: str) -> None:
+        updates = await _sync_course_submissions(session, client, token, course_id)
+        await record_course_poll(session, course_id, updates)
+        if updates > 0:
+            summary["courses"].append({"course_id": course_id, "updates": updates})
+            summary["processed"] += updates
+
+    async with _recorded_run(recorder, summary, keep_empty=trigger != "scheduler"):
+        client = get_http_client()
+        if adaptive:
+            courses = await _cached_active_courses(client, token)
+            async with AsyncSessionLocal() as session:
+                not_due = await courses_not_due(session, [str(course.get("id")) for course in courses])
+            courses = [course for course in courses if course.get("id") not in not_due]
+            summary["deferred"] = len(not_due)
+        else:
+            courses = await list_active_courses(client, token)
+        await _fan_out_courses(
+            client,
+            courses,
+            _sync_one,
+            summary,
+            workers=workers,
+            label="delta",
+            claims=claims,
+            recorder=recorder,
+        )
+    notification_dispatcher.wake()
+    return summary
 
-    async with httpx.AsyncClient(http2=True) as client:
-        courses = await list_active_courses(client, token)
+
+async def sync_full_metadata(
+    token: str,
+    *,
+    workers: int | None = None,
+    claims: CycleClaims | None = None,
+    trigger: str = "api",
+) -> ClassroomSyncResult:
+    summary: ClassroomSyncResult = ClassroomSyncResult(
+        courses=0, participants=0, assignments=0, timings={}
+    )
+    recorder = SyncRunRecorder("full", trigger, user_id=current_quota_user())
+
+    async def _sync_one(session: AsyncSession, client: httpx.AsyncClient, course_id: str) -> None:
+        participants_processed, roster_changed = await _sync_course_participants(
+            session, client, token, course_id, match_index
+        )
+        assignments_processed, coursework_changed = await _sync_course_assignments(
+            session, client, token, course_id
+        )
+        if roster_changed or coursework_changed:
+            # Committed with the course; all 304s leave its cached reports valid.
+            await data_versions_repo.bump(session, [course_id])
+        summary["courses"] += 1
+        summary["participants"] += participants_processed
+        summary["assignments"] += assignments_processed
+
+    async with _recorded_run(recorder, summary):
         async with AsyncSessionLocal() as session:
-            for course in courses:
-                course_id = course.get("id")
-                if not isinstance(course_id, str):
-                    continue
-                await _ensure_course_record(session, course)
-                try:
-                    updates = await _sync_course_submissions(
-                        session, client, token, course_id, notifier
-                    )
-                    if updates > 0:
-                        summary["courses"].append({"course_id": course_id, "updates": updates})
-                        summary["processed"] += updates
-                    await session.commit()
-                except Exception:  # pragma: no cover - defensive logging
-                    logger.exception("Error processing delta sync for course %s", course_id)
-                    await session.rollback()
+            match_index = await UserMatchIndex.load(session)
+
+        client = get_http_client()
+        courses = await list_active_courses(client, token)
+        await _fan_out_courses(
+            client,
+            courses,
+            _sync_one,
+            summary,
+            workers=workers,
+            label="full",
+            claims=claims,
+            recorder=recorder,
+        )
+        summary["notified_students"] = await _announce_new_assignments()
+    notification_dispatcher.wake()
     return summary
 
 
-async def sync_full_metadata(token: str) -> ClassroomSyncResult:
-    summary: ClassroomSyncResult = ClassroomSyncResult(courses=0, participants=0, assignments=0)
+async def _announce_new_assignments() -> int:
+    """Digest stage: queue the announcements the committed courses left pending."""
 
-    async with httpx.AsyncClient(http2=True) as client:
-        courses = await list_active_courses(client, token)
+    try:
         async with AsyncSessionLocal() as session:
-            for course in courses:
-                course_id = course.get("id")
-                if not isinstance(course_id, str):
-                    continue
-                await _ensure_course_record(session, course)
-                try:
-                    participants_processed = await _sync_course_participants(
-                        session, client, token, course_id
-                    )
-                    assignments_processed = await _sync_course_assignments(
-                        session, client, token, course_id
-                    )
-                    summary["courses"] += 1
-                    summary["participants"] += participants_processed
-                    summary["assignments"] += assignments_processed
-                    await session.commit()
-                except Exception:  # pragma: no cover - defensive logging
-                    logger.exception("Error processing full sync for course %s", course_id)
-                    await session.rollback()
-    return summary
+            queued = await announce_pending_assignments(session)
+            await session.commit()
+    except Exception:  # pragma: no cover - the pending rows are kept for the next cycle
+        logger.exception(
+            "No se pudieron encolar los avisos de tareas nuevas; se reintentan en el próximo ciclo"
+        )
+        return 0
+    return queued
+
+
+@asynccontextmanager
+async def _recorded_run(
+    recorder: SyncRunRecorder, summary: ClassroomSyncResult, *, keep_empty: bool = True
+) -> AsyncIterator[None]:
+    """Store the run in the ``sync_runs`` ledger once the block ends, even on failure.
+
+    Without ``keep_empty`` a successful run that synced no course is not stored;
+    the scheduler ticks every minute and most ticks find nothing due.
+    """
+
+    status, error = "ok", None
+    try:
+        yield
+    except Exception as exc:
+        status, error = "failed", f"{exc.__class__.__name__}: {exc}"
+        raise
+    finally:
+        if keep_empty or status != "ok" or recorder.courses:
+            await _store_run(recorder, summary, status, error)
+
+
+async def _store_run(
+    recorder: SyncRunRecorder, summary: ClassroomSyncResult, status: str, error: str | None
+) -> None:
+    try:
+        async with AsyncSessionLocal() as session:
+            run = await sync_runs_repo.create(session, recorder.to_row(status=status, error=error))
+        summary["run_id"] = run.id
+    except Exception:  # pragma: no cover - the ledger must never break a sync
+        logger.exception("No se pudo registrar la corrida de %s sync", recorder.kind)
+
+
+async def prune_sync_runs() -> int:
+    """Drop the ledger rows older than ``settings.sync_run_retention_days``."""
+
+    cutoff = datetime.utcnow() - timedelta(days=settings.sync_run_retention_days)
+    try:
+        async with AsyncSessionLocal() as session:
+            removed = await sync_runs_repo.prune(session, cutoff)
+    except Exception:  # pragma: no cover - retried on the next full cycle
+        logger.exception("No se pudieron depurar las corridas de sync antiguas")
+        return 0
+    if removed:
+        logger.info("Se depuraron %s corridas de sync anteriores a %s", removed, cutoff.date())
+    return removed
+
+
+CourseSyncHandler = Callable[[AsyncSession, httpx.AsyncClient, str], Awaitable[None]]
+
+
+async def _fan_out_courses(
+    client: httpx.AsyncClient,
+    courses: Iterable[dict[str, Any]],
+    handler: CourseSyncHandler,
+    summary: ClassroomSyncResult,
+    *,
+    workers: int | None,
+    label: str,
+    claims: CycleClaims | None = None,
+    recorder: SyncRunRecorder | None = None,
+) -> None:
+    """Run ``handler`` for every course with at most ``workers`` courses in flight.
+
+    Each course gets its own session so a failure only rolls back that course's
+    transaction; the wall time per course is recorded in ``summary["timings"]``.
+    With ``claims`` (scheduler cycles) a course is only synced if this process
+    wins its claim; courses owned by another user or replica are counted in
+    ``summary["deduplicated"]``. With ``recorder`` the ledger hooks called while
+    a course syncs are attributed to that course.
+    """
+
+    worker_count = max(1, workers or settings.classroom_sync_workers)
+    slots = asyncio.Semaphore(worker_count)
+    started = time.perf_counter()
+
+    async def _run(course: dict[str, Any]) -> None:
+        course_id = course.get("id")
+        if not isinstance(course_id, str):
+            return
+        async with slots:
+            if claims is not None and not await claims.claim(course_id):
+                summary["deduplicated"] = summary.get("deduplicated", 0) + 1
+                return
+            course_started = time.perf_counter()
+            with ExitStack() as tracking:
+                if recorder is not None:
+                    tracking.enter_context(track_course(recorder.course(course_id)))
+                async with AsyncSessionLocal() as session:
+                    try:
+                        with stage("db"):
+                            await _ensure_course_record(session, course)
+                        await handler(session, client, course_id)
+                        with stage("db"):
+                            await session.commit()
+                    except Exception:  # pragma: no cover - defensive logging
+                        logger.exception("Error processing %s sync for course %s", label, course_id)
+                        await session.rollback()
+            summary["timings"][course_id] = round(time.perf_counter() - course_started, 3)
+
+    await asyncio.gather(*(_run(course) for course in courses))
+    summary["workers"] = worker_count
+    summary["elapsed_seconds"] = round(time.perf_counter() - started, 3)
 
 
 async def _ensure_course_record(session: AsyncSession, payload: dict[str, Any]) -> None:
@@ -198,6 +402,9 @@ async def _ensure_course_record(session: AsyncSession, payload: dict[str, Any])
     name_value = name if isinstance(name, str) else "Curso Classroom"
     existing = await courses_repo.get(session, course_id)
     if existing:
+        if existing.name != name_value or not existing.description:
+            # The report header shows both
+            await data_versions_repo.bump(session, [course_id])
         existing.name = name_value
         existing.description = existing.description or "Curso sincronizado desde Google Classroom"
     else:
@@ -215,104 +422,71 @@ async def _sync_course_participants(
     client: httpx.AsyncClient,
     token: str,
     course_id: str,
-) -> int:
-    total_updated = 0
+    match_index: UserMatchIndex,
+) -> tuple[int, bool]:
+    """Reconcile the course roster; returns the rows written and whether any role changed."""
+
     seen_ids: set[str] = set()
+    fetched_roles: list[ParticipantRole] = []
+    total_updated = 0
 
-    students = await _fetch_collection(
-        session,
-        client,
-        token,
-        course_id,
-        "students",
-        f"{CLASSROOM_BASE_URL}/courses/{course_id}/students",
-        root_key="students",
-        params={
-            "pageSize": 200,
-            "fields": "students(userId,profile(emailAddress,photoUrl,name(fullName,givenName,familyName))),nextPageToken",
-        },
-    )
-    if students is not None:
-        total_updated += await _process_participant_entries(
-            session, students, course_id, ParticipantRole.STUDENT, seen_ids
+    for role, collection in ((ParticipantRole.STUDENT, "students"), (ParticipantRole.TEACHER, "teachers")):
+        pages = CollectionStream(
+            session,
+            client,
+            token,
+            course_id,
+            collection,
+            f"{CLASSROOM_BASE_URL}/courses/{course_id}/{collection}",
+            root_key=collection,
+            params={
+                "pageSize": 200,
+                "fields": f"{collection}(userId,profile(emailAddress,photoUrl,name(fullName,givenName,familyName))),nextPageToken",
+            },
+            complete=True,
         )
-
-    teachers = await _fetch_collection(
-        session,
-        client,
-        token,
-        course_id,
-        "teachers",
-        f"{CLASSROOM_BASE_URL}/courses/{course_id}/teachers",
-        root_key="teachers",
-        params={
-            "pageSize": 200,
-            "fields": "teachers(userId,profile(emailAddress,photoUrl,name(fullName,givenName,familyName))),nextPageToken",
-        },
-    )
-    if teachers is not None:
-        total_updated += await _process_participant_entries(
-            session, teachers, course_id, ParticipantRole.TEACHER, seen_ids
+        async for page in pages:
+            with stage("parse"):
+                entries = _roster_entries(page, role)
+            with stage("db"):
+                written = await reconcile_roster(session, course_id, entries, match_index, prune=False)
+            seen_ids.update(values["google_user_id"] for values in written)
+            total_updated += len(written)
+            record_rows(updated=len(written))
+        if pages.modified:
+            fetched_roles.append(role)
+
+    if not fetched_roles:
+        return 0, False
+    # Only prune roles that were actually re-fetched; a 304 keeps its people.
+    with stage("db"):
+        removed = await participants_repo.delete_missing(
+            session, course_id, seen_ids, roles=fetched_roles
         )
+        # The roster changed, so user matches may have too: make the next delta run
+        # re-read every submission instead of only those past the high-water mark.
+        await etag_repo.clear(session, course_id, SUBMISSIONS_CACHE_KEY)
+        await watermarks_repo.set(session, course_id, SUBMISSIONS_CACHE_KEY, None)
+    record_rows(deleted=removed)
+    return total_updated, True
 
-    if students is not None or teachers is not None:
-        existing_participants = await participants_repo.list_for_course(session, course_id)
-        for participant in existing_participants:
-            if participant.google_user_id not in seen_ids:
-                await participants_repo.delete(session, participant)
-    return total_updated
 
-
-async def _process_participant_entries(
-    session: AsyncSession,
-    entries: Iterable[dict[str, Any]],
-    course_id: str,
-    role: ParticipantRole,
-    seen_ids: set[str],
-) -> int:
-    processed = 0
+def _roster_entries(entries: Iterable[dict[str, Any]], role: ParticipantRole) -> list[RosterEntry]:
+    roster: list[RosterEntry] = []
     for entry in entries:
         google_user_id = entry.get("userId")
         if not isinstance(google_user_id, str):
             continue
-        email = _extract_email(entry)
-        full_name = _extract_full_name(entry)
-        photo_url = _extract_photo_url(entry)
-
-        matched_user_id = await _resolve_matched_user(session, email, full_name)
-        record = await participants_repo.upsert(
-            session,
-            course_id=course_id,
-            google_user_id=google_user_id,
-            email=email,
-            full_name=full_name,
-            photo_url=photo_url,
-            role=role,
-            matched_user_id=matched_user_id,
-        )
-        if matched_user_id:
-            await user_contacts_repo.upsert(
-                session,
-                user_id=matched_user_id,
-                email=email,
+        roster.append(
+            RosterEntry(
+                google_user_id=google_user_id,
+                email=_extract_email(entry),
+                full_name=_extract_full_name(entry),
+                photo_url=_extract_photo_url(entry),
+                role=role,
             )
-        seen_ids.add(record.google_user_id)
-        processed += 1
-    return processed
-
-
-async def _resolve_matched_user(
-    session: AsyncSession, email: str | None, full_name: str | None
-) -> str | None:
-    if email:
-        user = await users_repo.get_by_email(session, email.lower())
-        if user:
-            return user.id
-    if full_name:
-        user = await users_repo.get_by_name(session, full_name)
-        if user:
-            return user.id
-    return None
+        )
+    return roster
 
 
 async def _sync_course_assignments(
@@ -320,8 +494,10 @@ async def _sync_course_assignments(
     client: httpx.AsyncClient,
     token: str,
     course_id: str,
-) -> int:
-    courseworks = await _fetch_collection(
+) -> tuple[int, bool]:
+    """Upsert the course's coursework; returns the rows written and whether the list changed."""
+
+    pages = CollectionStream(
         session,
         client,
         token,
@@ -333,42 +509,56 @@ async def _sync_course_assignments(
             "pageSize": 200,
             "fields": "courseWork(id,title,description,workType,state,dueDate,dueTime,alternateLink,maxPoints,creationTime,updateTime,assigneeMode,individualStudentsOptions/studentIds),nextPageToken",
         },
+        complete=True,
     )
-    if courseworks is None:
-        return 0
 
     existing_assignments = await assignments_repo.list_for_course(session, course_id)
+    existing_ids = {assignment.id for assignment in existing_assignments}
     seen_ids: set[str] = set()
     processed = 0
 
-    for coursework in courseworks:
-        parsed = _parse_coursework(coursework, course_id)
-        if parsed is None:
-            continue
-        
-        # Check if this is a new assignment
-        existing_assignment = await assignments_repo.get(session, parsed["assignment_id"])
-        is_new_assignment = existing_assignment is None
-        
-        record = await assignments_repo.upsert(session, **parsed)
-        seen_ids.add(record.id)
-        processed += 1
-        
-        # Send notification for new assignment
-        if is_new_assignment:
-            await _notify_new_assignment(session, record)
-            logger.info(
-                "new_assignment.detected course=%s assignment=%s title=%s",
-                course_id,
-                record.id,
-                record.title,
-            )
-
-    for assignment in existing_assignments:
-        if assignment.id not in seen_ids:
+    async for page in pages:
+        with stage("parse"):
+            parsed_page = [_parse_coursework(coursework, course_id) for coursework in page]
+        for parsed in parsed_page:
+            if parsed is None:
+                continue
+
+            is_new_assignment = parsed["assignment_id"] not in existing_ids
+            with stage("db"):
+                record = await assignments_repo.upsert(session, **parsed)
+                if is_new_assignment:
+                    # Announced once per student by the digest stage, only if this course commits
+                    await announcements_repo.add(session, course_id, record.id)
+            seen_ids.add(record.id)
+            processed += 1
+            record_rows(inserted=int(is_new_assignment), updated=int(not is_new_assignment))
+
+            if is_new_assignment:
+                logger.info(
+                    "new_assignment.detected course=%s assignment=%s title=%s",
+                    course_id,
+                    record.id,
+                    record.title,
+                )
+
+    if not pages.modified:
+        return 0, False
+
+    stale = [assignment for assignment in existing_assignments if assignment.id not in seen_ids]
+    with stage("db"):
+        # Their submissions go too; take them out of the rollups in this transaction
+        removed = await submissions_repo.delete_for_courseworks(
+            session, course_id, [assignment.id for assignment in stale]
+        )
+        await course_metrics_repo.apply_submission_changes(
+            session, [(submission, None) for submission in removed]
+        )
+        for assignment in stale:
             await assignments_repo.delete(session, assignment)
+    record_rows(deleted=len(stale))
 
-    return processed
+    return processed, True
 
 
 def _parse_coursework(payload: dict[str, Any], course_id: str) -> dict[str, Any] | None:
@@ -418,71 +608,117 @@ async def _sync_course_submissions(
     client: httpx.AsyncClient,
     token: str,
     course_id: str,
-    notifier: Notifier,
 ) -> int:
-    submissions_payload = await _fetch_collection(
+    high_water_mark = await watermarks_repo.get(session, course_id, SUBMISSIONS_CACHE_KEY)
+    pages = CollectionStream(
         session,
         client,
         token,
         course_id,
-        "subs",
+        SUBMISSIONS_CACHE_KEY,
         f"{CLASSROOM_BASE_URL}/courses/{course_id}/courseWork/-/studentSubmissions",
         root_key="studentSubmissions",
         params={
             "pageSize": 200,
             "fields": "studentSubmissions(id,courseWorkId,userId,state,late,updateTime,assignedGrade,draftGrade,submissionHistory,assignmentSubmission(attachments)),nextPageToken",
         },
+        stop_paging=_older_page_check(high_water_mark),
     )
-    if submissions_payload is None:
-        return 0
 
     participants = await participants_repo.list_for_course(session, course_id)
     match_map = {p.google_user_id: p.matched_user_id for p in participants}
     email_map = {p.google_user_id: p.email for p in participants}
-    matched_user_ids = [mid for mid in match_map.values() if mid]
-    phone_map = await user_contacts_repo.get_phone_map(session, matched_user_ids)
+    # Contact pre-pass: every matched student gets a contact row up front, so the
+    # loop below only reads this map.
+    with stage("db"):
+        phone_map = await user_contacts_repo.ensure_contacts(
+            session, {p.matched_user_id: p.email for p in participants if p.matched_user_id}
+        )
 
+    newest = high_water_mark
     updates = 0
-    for entry in submissions_payload:
-        parsed = _parse_submission(entry, course_id)
-        if parsed is None:
-            continue
-        submission_id = parsed.pop("submission_id")
-        google_user_id = parsed.get("google_user_id")
-        matched_user_id = match_map.get(google_user_id)
-        prev = await submissions_repo.get(session, submission_id)
-        record = await submissions_repo.upsert(
-            session,
-            submission_id=submission_id,
-            matched_user_id=matched_user_id,
-            **parsed,
+    written = False
+    async for page in pages:
+        rows: list[dict[str, Any]] = []
+        with stage("parse"):
+            for entry in page:
+                update_time = _naive_utc(_parse_datetime(entry.get("updateTime")))
+                if update_time is not None and high_water_mark is not None and update_time < high_water_mark:
+                    continue
+                if update_time is not None and (newest is None or update_time > newest):
+                    newest = update_time
+                parsed = _parse_submission(entry, course_id)
+                if parsed is None:
+                    continue
+                parsed["matched_user_id"] = match_map.get(parsed["google_user_id"])
+                rows.append(parsed)
+        with stage("db"):
+            changes = await submissions_repo.bulk_upsert(session, rows)
+            await course_metrics_repo.apply_submission_changes(session, changes)
+        inserted = sum(1 for prev, _ in changes if prev is None)
+        updated = sum(
+            1
+            for prev, current in changes
+            if prev is not None and submissions_repo.snapshots_differ(prev, current)
         )
-        if matched_user_id and matched_user_id not in phone_map:
-            await user_contacts_repo.upsert(
-                session,
-                user_id=matched_user_id,
-                email=email_map.get(google_user_id),
-            )
-            phone_map = await user_contacts_repo.get_phone_map(session, matched_user_ids)
-        if prev and _submission_changed(prev, record):
-            updates += 1
-            await _handle_submission_notification(
-                notifier,
-                record,
-                prev,
-                phone_map,
-                email_map,
-            )
-            logger.info(
-                "submission.status_changed course=%s submission=%s state=%s late=%s",
-                course_id,
-                record.id,
-                record.state,
-                record.late,
-            )
+        record_rows(inserted=inserted, updated=updated)
+        written = written or bool(inserted or updated)
+
+        for prev, record in changes:
+            if prev and _submission_changed(prev, record):
+                updates += 1
+                with stage("notify"):
+                    await _handle_submission_notification(
+                        session,
+                        record,
+                        prev,
+                        phone_map,
+                        email_map,
+                    )
+                logger.info(
+                    "submission.status_changed course=%s submission=%s state=%s late=%s",
+                    course_id,
+                    record.id,
+                    record.state,
+                    record.late,
+                )
+
+    if newest != high_water_mark:
+        await watermarks_repo.set(session, course_id, SUBMISSIONS_CACHE_KEY, newest)
+    if written:
+        # Committed with the submissions; cached reports of the course go stale.
+        await data_versions_repo.bump(session, [course_id])
     return updates
 
 
+def _older_page_check(
+    high_water_mark: datetime | None,
+) -> Callable[[list[dict[str, Any]]], bool] | None:
+    """Build a ``stop_paging`` predicate for pages ordered by ``updateTime`` desc.
+
+    Paging stops once a page is sorted newest-first and already reaches entries
+    older than the high-water mark; unordered pages never stop the walk early.
+    """
+
+    if high_water_mark is None:
+        return None
+
+    def _check(page: list[dict[str, Any]]) -> bool:
+        times = [_naive_utc(_parse_datetime(item.get("updateTime"))) for item in page]
+        if not times or any(value is None for value in times):
+            return False
+        descending = all(earlier >= later for earlier, later in zip(times, times[1:]))
+        return descending and times[-1] < high_water_mark
+
+    return _check
+
+
+def _naive_utc(value: datetime | None) -> datetime | None:
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
 def _parse_submission(payload: dict[str, Any], course_id: str) -> dict[str, Any] | None:
     submission_id = payload.get("id")
     coursework_id = payload.get("courseWorkId")
@@ -518,142 +754,163 @@ def _submission_changed(prev, current) -> bool:
 
 
 async def _handle_submission_notification(
-    notifier: Notifier,
+    session: AsyncSession,
     record,
     previous,
     phone_map: dict[str, str],
     email_map: dict[str, str | None],
 ) -> None:
+    """Queue a late/returned alert in the outbox, inside the sync transaction."""
+
     matched_user_id = record.matched_user_id
     phone = phone_map.get(matched_user_id) if matched_user_id else None
     email = email_map.get(record.google_user_id)
+    version = record.updated_time.isoformat() if record.updated_time else "na"
 
     if record.late and not previous.late:
+        kind = "submission_late"
         message = (
             "Tenés una entrega atrasada en Classroom. Revisá la tarea "
             f"{record.coursework_id} y regularizala desde el panel."
         )
-        await _deliver_notification(notifier, phone, email, message)
     elif (previous.state or "").upper() != "RETURNED" and (record.state or "").upper() == "RETURNED":
+        kind = "submission_returned"
         message = (
             f"Tu tarea fue devuelta con feedback en Classroom ({record.coursework_id})."
         )
-        await _deliver_notification(notifier, phone, email, message)
-
-
-async def _notify_new_assignment(session: AsyncSession, assignment) -> None:
-    """Send WhatsApp notification to all students when a new assignment is created"""
-    notifier = get_notifier()
-    
-    # Get all participants in the course
-    all_participants = await participants_repo.list_for_course(session, assignment.course_id)
-    # Filter only students
-    participants = [p for p in all_participants if p.role == ParticipantRole.STUDENT]
-    
-    # Get phone numbers for matched users
-    matched_user_ids = [p.matched_user_id for p in participants if p.matched_user_id]
-    if not matched_user_ids:
-        logger.info("No matched students found for assignment notification")
+    else:
         return
-        
-    phone_map = await user_contacts_repo.get_phone_map(session, matched_user_ids)
-    
-    # Create message
-    due_text = ""
-    if assignment.due_at:
-        due_date = assignment.due_at.strftime('%d/%m/%Y a las %H:%M')
-        due_text = f"\n📅 Vencimiento: {due_date}"
-    
-    points_text = ""
-    if assignment.max_points:
-        points_text = f"\n🏆 Puntos: {assignment.max_points}"
-    
-    message = (
-        f"📚 *Nueva tarea en Classroom*\n\n"
-        f"📝 {assignment.title}"
-        f"{due_text}"
-        f"{points_text}\n\n"
-        f"👀 Revisá los detalles en tu panel de Scholaris o directamente en Google Classroom.\n\n"
-        f"¡No te olvides de entregar a tiempo! 🚀"
+
+    await outbox_repo.enqueue(
+        session,
+        [
+            {
+                "id": f"{kind}:{record.id}:{version}",
+                "kind": kind,
+                "user_id": matched_user_id,
+                "phone": phone,
+                "email": email,
+                "message": message,
+            }
+        ],
     )
-    
-    # Send to all students with phone numbers
-    notifications_sent = 0
-    for participant in participants:
-        if participant.matched_user_id and participant.matched_user_id in phone_map:
-            phone = phone_map[participant.matched_user_id]
+
+
+class CollectionStream:
+    """Revalidate a paged Classroom collection page by page and stream its pages.
+
+    Every page is requested with the ETag cached for its cursor. Unchanged pages
+    (304) are skipped, following the cursor cached with them, while changed pages
+    are yielded and their ETag stored. Page N+1 is requested before page N is
+    handed to the caller, so processing overlaps with the network round trip.
+
+    ``modified`` tells, after iterating, whether any page changed. With
+    ``complete=True`` the skipped pages are fetched again once a later page
+    changed, so callers that prune missing rows see the whole collection.
+    """
+
+    def __init__(
+        self,
+        session: AsyncSession,
+        client: httpx.AsyncClient,
+        token: str,
+        course_id: str,
+        cache_key: str,
+        url: str,
+        *,
+        root_key: str,
+        params: dict[str, Any],
+        stop_paging: Callable[[list[dict[str, Any]]], bool] | None = None,
+        complete: bool = False,
+    ) -> None:
+        self._session = session
+        self._client = client
+        self._token = token
+        self._course_id = course_id
+        self._cache_key = cache_key
+        self._url = url
+        self._root_key = root_key
+        self._params = params.copy()
+        self._stop_paging = stop_paging
+        self._complete = complete
+        self.modified = False
+
+    def __aiter__(self) -> AsyncIterator[list[dict[str, Any]]]:
+        return self._iterate()
+
+    def _fetch(self, page_token: str, etag: str | None) -> asyncio.Task:
+        params = {**self._params, "pageToken": page_token} if page_token else self._params
+        return asyncio.create_task(
+            _get(self._client, self._url, self._token, params=params, etag=etag)
+        )
+
+    async def _iterate(self) -> AsyncIterator[list[dict[str, Any]]]:
+        cached = await etag_repo.list_pages(self._session, self._course_id, self._cache_key)
+        visited: list[str] = []
+        skipped: list[str] = []
+        cursor: str | None = etag_repo.FIRST_PAGE
+        pending: asyncio.Task | None = self._fetch(cursor, _cached_etag(cached, cursor))
+        stopped_early = False
+
+        while pending is not None:
+            payload = await pending
+            pending = None
+            visited.append(cursor)
+
+            if payload["not_modified"]:
+                skipped.append(cursor)
+                entry = cached.get(cursor)
+                cursor = entry.next_page_token if entry else None
+                if cursor:
+                    pending = self._fetch(cursor, _cached_etag(cached, cursor))
+                continue
+
+            self.modified = True
+            items, next_page = _page_items(payload, self._root_key)
+            await etag_repo.set(
+                self._session,
+                self._course_id,
+                self._cache_key,
+                payload.get("etag"),
+                page_token=cursor,
+                next_page_token=next_page,
+            )
+            if next_page:
+                if self._stop_paging is not None and self._stop_paging(items):
+                    stopped_early = True
+                else:
+                    pending = self._fetch(next_page, _cached_etag(cached, next_page))
             try:
-                await notifier.send_message(phone, message)
-                notifications_sent += 1
-                logger.info("New assignment notification sent to %s", participant.email or "unknown")
-            except Exception:
-                logger.exception("Error sending new assignment notification to %s", phone)
-        elif participant.email:
-            logger.info("[email-fallback] new assignment notification -> %s", participant.email)
-    
-    logger.info("New assignment notifications sent: %d/%d students", notifications_sent, len(participants))
-
-
-async def _deliver_notification(
-    notifier: Notifier,
-    phone: str | None,
-    email: str | None,
-    message: str,
-) -> None:
-    if phone:
-        try:
-            await notifier.send_message(phone, message)
-            return
-        except Exception:  # pragma: no cover - network path
-            logger.exception("Error enviando notificación por WhatsApp a %s", phone)
-    if email:
-        logger.info("[email-fallback] %s -> %s", email, message)
-    else:
-        logger.info("[email-fallback] sin correo -> %s", message)
+                yield items
+            except BaseException:
+                if pending is not None:
+                    pending.cancel()
+                raise
+            cursor = next_page
 
+        if self._complete and self.modified:
+            for page_token in skipped:
+                payload = await self._fetch(page_token, None)
+                items, _ = _page_items(payload, self._root_key)
+                yield items
 
-async def _fetch_collection(
-    session: AsyncSession,
-    client: httpx.AsyncClient,
-    token: str,
-    course_id: str,
-    cache_key: str,
-    url: str,
-    *,
-    root_key: str,
-    params: dict[str, Any],
-) -> list[dict[str, Any]] | None:
-    params = params.copy()
-    etag = await etag_repo.get(session, course_id, cache_key)
-    payload = await _get(client, url, token, params=params, etag=etag)
-    if payload["not_modified"]:
-        return None
+        if not stopped_early:
+            await etag_repo.prune(self._session, self._course_id, self._cache_key, visited)
 
-    data = payload.get("data")
-    items: list[dict[str, Any]] = []
-    if isinstance(data, dict):
-        chunk = data.get(root_key)
-        if isinstance(chunk, list):
-            items.extend(item for item in chunk if isinstance(item, dict))
-        next_page = data.get("nextPageToken") if isinstance(data.get("nextPageToken"), str) else None
-    else:
-        next_page = None
-
-    while next_page:
-        params["pageToken"] = next_page
-        page_payload = await _get(client, url, token, params=params)
-        page_data = page_payload.get("data")
-        if isinstance(page_data, dict):
-            chunk = page_data.get(root_key)
-            if isinstance(chunk, list):
-                items.extend(item for item in chunk if isinstance(item, dict))
-            next_page = page_data.get("nextPageToken") if isinstance(page_data.get("nextPageToken"), str) else None
-        else:
-            next_page = None
-        params.pop("pageToken", None)
 
-    await etag_repo.set(session, course_id, cache_key, payload.get("etag"))
-    return items
+def _cached_etag(cached: dict[str, Any], page_token: str) -> str | None:
+    entry = cached.get(page_token)
+    return entry.etag if entry is not None else None
+
+
+def _page_items(payload: dict[str, Any], root_key: str) -> tuple[list[dict[str, Any]], str | None]:
+    data = payload.get("data")
+    if not isinstance(data, dict):
+        return [], None
+    chunk = data.get(root_key)
+    items = [item for item in chunk if isinstance(item, dict)] if isinstance(chunk, list) else []
+    next_page = data.get("nextPageToken") if isinstance(data.get("nextPageToken"), str) else None
+    return items, next_page
 
 
 def _safe_float(value: Any) -> float | None:
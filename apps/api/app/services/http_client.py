@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import logging
+
+import httpx
+
+from app.core.config import settings
+
+try:  # pragma: no cover - optional dependency guard
+    import h2  # noqa: F401
+
+    HTTP2_AVAILABLE = True
+except ImportError:  # pragma: no cover - fallback when h2 is absent
+    HTTP2_AVAILABLE = False
+
+logger = logging.getLogger("nerdeala.http")
+
+_client: httpx.AsyncClient | None = None
+
+
+def _build_client() -> httpx.AsyncClient:
+    if not HTTP2_AVAILABLE:
+        logger.warning("El paquete h2 no está instalado; el cliente HTTP usa HTTP/1.1")
+    return httpx.AsyncClient(
+        http2=HTTP2_AVAILABLE,
+        limits=httpx.Limits(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_keepalive_connections,
+            keepalive_expiry=settings.http_keepalive_expiry,
+        ),
+        timeout=httpx.Timeout(settings.http_timeout_seconds),
+        headers={"accept-encoding": "gzip"},
+    )
+
+
+async def open_http_client() -> httpx.AsyncClient:
+    """Create the app-wide pooled client; called from the FastAPI startup hook."""
+    return get_http_client()
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the shared pooled client, creating it lazily outside the app lifecycle."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+    return _client
+
+
+async def close_http_client() -> None:
+    global _client
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
+
+
+__all__ = ["close_http_client", "get_http_client", "open_http_client"]
@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Protocol
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.repositories import sync_leases as leases_repo
+from app.services.redis_client import get_redis
+
+logger = logging.getLogger("nerdeala.sync.leases")
+
+# Identifies this process as lease owner across replicas and uvicorn workers.
+PROCESS_OWNER = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class LeaseBackend(Protocol):
+    async def acquire(self, name: str, owner: str, ttl: float) -> bool: ...
+
+    async def release(self, name: str, owner: str) -> None: ...
+
+
+class MemoryLeaseBackend:
+    """Process-local leases; only coordinates tasks inside a single worker."""
+
+    def __init__(self) -> None:
+        self._leases: dict[str, tuple[str, float]] = {}
+
+    async def acquire(self, name: str, owner: str, ttl: float) -> bool:
+        now = time.monotonic()
+        current = self._leases.get(name)
+        if current is not None and current[0] != owner and current[1] > now:
+            return False
+        self._leases[name] = (owner, now + ttl)
+        return True
+
+    async def release(self, name: str, owner: str) -> None:
+        current = self._leases.get(name)
+        if current is not None and current[0] == owner:
+            del self._leases[name]
+
+
+class DatabaseLeaseBackend:
+    """Leases stored as rows of ``sync_leases`` in the shared database."""
+
+    async def acquire(self, name: str, owner: str, ttl: float) -> bool:
+        now = datetime.utcnow()
+        async with AsyncSessionLocal() as session:
+            acquired = await leases_repo.try_acquire(
+                session, name, owner, now + timedelta(seconds=ttl), now
+            )
+            await session.commit()
+        return acquired
+
+    async def release(self, name: str, owner: str) -> None:
+        async with AsyncSessionLocal() as session:
+            await leases_repo.release(session, name, owner)
+            await session.commit()
+
+
+class RedisLeaseBackend:
+    """Leases as ``SET NX PX`` keys; release only deletes keys we still own."""
+
+    def __init__(self, client, prefix: str = "lease:") -> None:
+        self._client = client
+        self._prefix = prefix
+
+    async def acquire(self, name: str, owner: str, ttl: float) -> bool:
+        key = self._prefix + name
+        ttl_ms = max(1, int(ttl * 1000))
+        if await self._client.set(key, owner, nx=True, px=ttl_ms):
+            return True
+        if await self._client.get(key) == owner:
+            await self._client.pexpire(key, ttl_ms)
+            return True
+        return False
+
+    async def release(self, name: str, owner: str) -> None:
+        await self._client.eval(_RELEASE_SCRIPT, 1, self._prefix + name, owner)
+
+
+class FallbackLeaseBackend:
+    """Use ``primary`` and fall back to in-memory leases while it is unreachable.
+
+    Falling back may let two replicas sync the same course, which is preferable
+    to stopping the scheduler when Redis or the database hiccups.
+    """
+
+    def __init__(self, primary: LeaseBackend, fallback: LeaseBackend | None = None) -> None:
+        self.primary = primary
+        self.fallback = fallback or MemoryLeaseBackend()
+
+    async def acquire(self, name: str, owner: str, ttl: float) -> bool:
+        try:
+            return await self.primary.acquire(name, owner, ttl)
+        except Exception as exc:  # pragma: no cover - depends on infra failures
+            logger.warning("Backend de leases no disponible (%s); usando leases locales", exc)
+            return await self.fallback.acquire(name, owner, ttl)
+
+    async def release(self, name: str, owner: str) -> None:
+        try:
+            await self.primary.release(name, owner)
+        except Exception as exc:  # pragma: no cover - depends on infra failures
+            logger.warning("No se pudo liberar el lease %s: %s", name, exc)
+        await self.fallback.release(name, owner)
+
+
+_backend: LeaseBackend | None = None
+
+
+def get_lease_backend() -> LeaseBackend:
+    """Build the backend selected by ``SYNC_LEASE_BACKEND`` (auto, redis, database, memory)."""
+
+    global _backend
+    if _backend is not None:
+        return _backend
+
+    choice = settings.sync_lease_backend
+    primary: LeaseBackend | None = None
+    if choice in {"auto", "redis"}:
+        client = get_redis()
+        if client is not None:
+            primary = RedisLeaseBackend(client)
+        elif choice == "redis":
+            logger.warning("SYNC_LEASE_BACKEND=redis pero Redis no está disponible; usando la base de datos")
+    if primary is None and choice != "memory":
+        primary = DatabaseLeaseBackend()
+
+    _backend = FallbackLeaseBackend(primary) if primary is not None else MemoryLeaseBackend()
+    return _backend
+
+
+class CycleClaims:
+    """Course claims for one scheduler cycle.
+
+    A course is claimed at most once per cycle inside this process, and across
+    processes through a lease named after the cycle label that lives for
+    ``ttl`` seconds, so only one replica syncs each course per interval.
+    """
+
+    def __init__(
+        self,
+        label: str,
+        *,
+        ttl: float,
+        backend: LeaseBackend | None = None,
+        owner: str = PROCESS_OWNER,
+    ) -> None:
+        self.label = label
+        self.ttl = ttl
+        self.owner = owner
+        self._backend = backend or get_lease_backend()
+        self._local: set[str] = set()
+
+    async def claim_user(self, user_id: str) -> bool:
+        return await self._backend.acquire(f"classroom:{self.label}:user:{user_id}", self.owner, self.ttl)
+
+    async def claim(self, course_id: str) -> bool:
+        if course_id in self._local:
+            return False
+        self._local.add(course_id)
+        return await self._backend.acquire(f"classroom:{self.label}:course:{course_id}", self.owner, self.ttl)
+
+
+__all__ = [
+    "CycleClaims",
+    "DatabaseLeaseBackend",
+    "LeaseBackend",
+    "MemoryLeaseBackend",
+    "RedisLeaseBackend",
+    "get_lease_backend",
+]
@@ -1,11 +1,90 @@
 from __future__ import annotations
 
 import abc
+import asyncio
+import uuid
+from collections.abc import Awaitable, Sequence
+from dataclasses import dataclass
+from typing import Any
+
+
+def whatsapp_text_job(phone_e164: str, text: str, message_id: str | None = None) -> dict[str, Any]:
+    """Job payload understood by the WhatsApp service (``/send`` and its Redis queue)."""
+
+    return {
+        "id": message_id or f"api-{uuid.uuid4().hex}",
+        "recipient": {
+            "phone": phone_e164,
+            "name": "API User"
+        },
+        "message": {
+            "type": "text",
+            "text": text
+        },
+        "metadata": {
+            "retries": 0,
+            "initiatedBy": "nerdeala-api",
+            "priority": "normal"
+        }
+    }
+
+
+@dataclass(slots=True, frozen=True)
+class OutboundMessage:
+    phone_e164: str
+    text: str
+    message_id: str | None = None
+
+
+async def _collect(calls: Sequence[Awaitable[None]], concurrency: int) -> list[Exception | None]:
+    slots = asyncio.Semaphore(max(1, concurrency))
+
+    async def _run(call: Awaitable[None]) -> Exception | None:
+        async with slots:
+            try:
+                await call
+            except Exception as exc:
+                return exc
+            return None
+
+    return list(await asyncio.gather(*(_run(call) for call in calls)))
 
 
 class Notifier(abc.ABC):
+    async def send_bulk(
+        self, messages: Sequence[OutboundMessage], *, concurrency: int = 8
+    ) -> list[Exception | None]:
+        """Send ``messages``; returns, in order, the error of each one (``None`` if sent).
+
+        The default sends them concurrently through ``send_message``; backends
+        with a cheaper batch path override it.
+        """
+
+        return await _collect(
+            [
+                self.send_message(message.phone_e164, message.text, message_id=message.message_id)
+                for message in messages
+            ],
+            concurrency,
+        )
+
+    async def send_template_bulk(
+        self,
+        phones_e164: Sequence[str],
+        template_id: str,
+        variables: dict[str, object] | None,
+        *,
+        concurrency: int = 8,
+    ) -> list[Exception | None]:
+        """Send the same template to every phone; same result shape as ``send_bulk``."""
+
+        return await _collect(
+            [self.send_template(phone, template_id, variables) for phone in phones_e164],
+            concurrency,
+        )
+
     @abc.abstractmethod
-    async def send_message(self, phone_e164: str, text: str) -> None:
+    async def send_message(self, phone_e164: str, text: str, *, message_id: str | None = None) -> None:
         raise NotImplementedError
 
     @abc.abstractmethod
@@ -16,7 +95,7 @@ class Notifier(abc.ABC):
 
 
 class ConsoleNotifier(Notifier):
-    async def send_message(self, phone_e164: str, text: str) -> None:
+    async def send_message(self, phone_e164: str, text: str, *, message_id: str | None = None) -> None:
         print("[wa:sim]", phone_e164, text)
 
     async def send_template(
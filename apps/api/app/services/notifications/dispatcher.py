@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections.abc import Sequence
+from datetime import datetime, timedelta
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models.notification_outbox import NotificationOutbox
+from app.repositories import notification_outbox as outbox_repo
+from app.services.leases import PROCESS_OWNER
+from app.services.notifications.base import Notifier, OutboundMessage
+from app.services.notifications.http_wa import get_notifier
+
+logger = logging.getLogger("nerdeala.notifications.dispatcher")
+
+# A claimed batch must be delivered within this time or another dispatcher retakes it.
+CLAIM_LEASE = timedelta(minutes=5)
+RETRY_BASE_SECONDS = 30
+
+
+class OutboxDispatcher:
+    """Drain ``notification_outbox`` outside of any sync transaction.
+
+    Intents are claimed in batches, delivered with at most
+    ``NOTIFICATION_DISPATCH_CONCURRENCY`` sends in flight and retried with an
+    exponential backoff until ``NOTIFICATION_MAX_ATTEMPTS`` is reached.
+
+    Delivery is at-least-once on this side: the claim is committed before
+    sending and the outcome recorded in a new transaction afterwards, so a crash
+    in between (or a claim whose lease ran out) sends the intent again. The
+    outbox id travels as the WhatsApp job id, which the WhatsApp service uses as
+    idempotency key to drop those repeats.
+    """
+
+    def __init__(self, notifier: Notifier | None = None) -> None:
+        self._notifier = notifier
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+
+    def wake(self) -> None:
+        """Ask the running loop to drain now instead of at the next poll."""
+
+        self._wakeup.set()
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def drain(self) -> int:
+        """Deliver every due intent; returns how many were handled."""
+
+        handled = 0
+        while True:
+            async with AsyncSessionLocal() as session:
+                batch = await outbox_repo.claim_batch(
+                    session,
+                    PROCESS_OWNER,
+                    limit=settings.notification_dispatch_batch,
+                    lease=CLAIM_LEASE,
+                )
+                await session.commit()
+            if not batch:
+                return handled
+            # No session is open while the messages are on the wire
+            outcomes = await self._send_batch(batch)
+            async with AsyncSessionLocal() as session:
+                await self._record_outcomes(session, batch, outcomes)
+                await session.commit()
+            handled += len(batch)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.drain()
+            except asyncio.CancelledError:
+                raise
+            except Exception:  # pragma: no cover - defensive logging
+                logger.exception("Error despachando notificaciones pendientes")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=settings.notification_poll_seconds)
+            except TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def _send_batch(self, batch: Sequence[NotificationOutbox]) -> dict[str, Exception | None]:
+        notifier = self._notifier or get_notifier()
+        whatsapp = [intent for intent in batch if intent.phone]
+        # The outbox id doubles as the WhatsApp job id: the idempotency key of redeliveries.
+        errors = await notifier.send_bulk(
+            [OutboundMessage(intent.phone, intent.message, intent.id) for intent in whatsapp],
+            concurrency=settings.notification_dispatch_concurrency,
+        )
+        return dict(zip((intent.id for intent in whatsapp), errors))
+
+    async def _record_outcomes(
+        self,
+        session: AsyncSession,
+        batch: Sequence[NotificationOutbox],
+        outcomes: dict[str, Exception | None],
+    ) -> None:
+        for intent in batch:
+            error = outcomes.get(intent.id)
+            if not intent.phone:
+                logger.info("[email-fallback] %s -> %s", intent.email or "sin correo", intent.message)
+            if error is None:
+                await outbox_repo.mark_sent(session, intent.id, PROCESS_OWNER)
+                continue
+            retry_at = None
+            if intent.attempts + 1 < settings.notification_max_attempts:
+                retry_at = datetime.utcnow() + timedelta(seconds=RETRY_BASE_SECONDS * 2**intent.attempts)
+            logger.warning(
+                "No se pudo enviar la notificación %s (intento %s): %s",
+                intent.id,
+                intent.attempts + 1,
+                error,
+            )
+            await outbox_repo.mark_attempt_failed(
+                session, intent.id, PROCESS_OWNER, str(error), retry_at=retry_at
+            )
+            if retry_at is None and intent.email:
+                logger.info("[email-fallback] %s -> %s", intent.email, intent.message)
+
+
+notification_dispatcher = OutboxDispatcher()
+
+__all__ = ["OutboxDispatcher", "notification_dispatcher"]
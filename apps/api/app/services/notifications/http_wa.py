@@ -1,12 +1,14 @@
 from __future__ import annotations
 
 import logging
-import time
 
 import httpx
 
 from app.core.config import settings
-from app.services.notifications.base import ConsoleNotifier, Notifier
+from app.services.http_client import get_http_client
+from app.services.notifications.base import ConsoleNotifier, Notifier, whatsapp_text_job
+from app.services.notifications.redis_wa import RedisWhatsAppNotifier
+from app.services.redis_client import get_redis
 
 logger = logging.getLogger("nerdeala.notifications.whatsapp")
 
@@ -25,27 +27,13 @@ class HttpWhatsAppNotifier(Notifier):
             headers["authorization"] = f"Bearer {self._api_key}"
         return headers
 
-    async def send_message(self, phone_e164: str, text: str) -> None:
+    async def send_message(self, phone_e164: str, text: str, *, message_id: str | None = None) -> None:
         # Format message for WhatsApp service /send endpoint
-        payload = {
-            "id": f"api-{int(time.time())}-{phone_e164.replace('+', '')}",
-            "recipient": {
-                "phone": phone_e164,
-                "name": "API User"
-            },
-            "message": {
-                "type": "text",
-                "text": text
-            },
-            "metadata": {
-                "retries": 0,
-                "initiatedBy": "nerdeala-api",
-                "priority": "normal"
-            }
-        }
+        payload = whatsapp_text_job(phone_e164, text, message_id)
         url = f"{self._base}/send"
-        async with httpx.AsyncClient(timeout=self._timeout) as client:
-            response = await client.post(url, json=payload, headers=self._headers())
+        response = await get_http_client().post(
+            url, json=payload, headers=self._headers(), timeout=self._timeout
+        )
         if response.status_code >= 400:
             _log_http_error(response)
         response.raise_for_status()
@@ -59,8 +47,9 @@ class HttpWhatsAppNotifier(Notifier):
             "variables": variables or {},
         }
         url = f"{self._base}/api/whatsapp/send-template"
-        async with httpx.AsyncClient(timeout=self._timeout) as client:
-            response = await client.post(url, json=payload, headers=self._headers())
+        response = await get_http_client().post(
+            url, json=payload, headers=self._headers(), timeout=self._timeout
+        )
         if response.status_code >= 400:
             _log_http_error(response)
         response.raise_for_status()
@@ -79,11 +68,25 @@ def _log_http_error(response: httpx.Response) -> None:
 
 
 def get_notifier() -> Notifier:
-    base_url = settings.wa_http_base_url
-    if not base_url:
-        return ConsoleNotifier()
-    try:
-        return HttpWhatsAppNotifier()
-    except ValueError:
+    """Pick the delivery path from ``WA_DELIVERY_MODE`` (``auto``, ``redis`` or ``http``).
+
+    ``auto`` queues on Redis when ``REDIS_URL`` is set and keeps the HTTP
+    service as fallback; without either, messages are only printed.
+    """
+
+    http: Notifier | None = None
+    if settings.wa_http_base_url:
+        http = HttpWhatsAppNotifier()
+
+    mode = settings.wa_delivery_mode.lower()
+    if mode in {"auto", "redis"}:
+        redis = get_redis()
+        if redis is not None:
+            return RedisWhatsAppNotifier(redis, settings.wa_redis_queue, fallback=http)
+        if mode == "redis":
+            logger.warning("WA_DELIVERY_MODE=redis pero Redis no está disponible")
+
+    if http is None:
         logger.warning("WA_HTTP_BASE_URL no configurado, usando ConsoleNotifier")
         return ConsoleNotifier()
+    return http
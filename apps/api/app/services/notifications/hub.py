@@ -1,37 +1,256 @@
 from __future__ import annotations
 
 import asyncio
+import json
+import logging
 from collections import defaultdict
-from typing import Any, DefaultDict
+from collections.abc import Callable
+from typing import Any, DefaultDict, Protocol
 
 from fastapi import WebSocket
+from fastapi.encoders import jsonable_encoder
 
+from app.core.config import settings
 from app.schemas.notification import NotificationRead
+from app.services.redis_client import get_redis
 
+logger = logging.getLogger("nerdeala.notifications.hub")
+
+REDIS_CHANNEL_PREFIX = "nerdeala:notifications:"
+# Close code sent to clients that cannot keep up (RFC 6455 "try again later").
+SLOW_CONSUMER_CLOSE_CODE = 1013
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+DISCONNECT = "disconnect"
+
+# Hands a serialized message to the local connections of a channel.
+Deliver = Callable[[str, str], None]
+
+
+class _Connection:
+    """One websocket with its own bounded outbox and writer task.
+
+    ``offer`` never waits: when the queue is full the drop policy decides
+    whether the oldest or the newest message is discarded, or whether the
+    client is disconnected.
+    """
+
+    def __init__(self, websocket: WebSocket, hub: NotificationHub, channel: str) -> None:
+        self.websocket = websocket
+        self._hub = hub
+        self._channel = channel
+        self._queue: asyncio.Queue[str] = asyncio.Queue(maxsize=max(1, settings.notification_ws_queue_size))
+        self._writer: asyncio.Task[None] | None = None
+        self._evicting = False
+        self.dropped = 0
+
+    def start(self) -> None:
+        self._writer = asyncio.create_task(self._write())
+
+    async def stop(self) -> None:
+        if self._writer is not None and self._writer is not asyncio.current_task():
+            self._writer.cancel()
+            await asyncio.gather(self._writer, return_exceptions=True)
+        self._writer = None
+
+    def offer(self, text: str) -> None:
+        if not self._queue.full():
+            self._queue.put_nowait(text)
+            return
+        self.dropped += 1
+        policy = settings.notification_ws_drop_policy
+        if policy == DISCONNECT:
+            if not self._evicting:
+                self._evicting = True
+                logger.warning("Cliente lento en canal %s; se cierra la conexión", self._channel)
+                self._hub._spawn(self._hub._evict(self, self._channel))
+        elif policy == DROP_NEWEST:
+            return
+        else:
+            self._queue.get_nowait()
+            self._queue.put_nowait(text)
+
+    async def _write(self) -> None:
+        while True:
+            text = await self._queue.get()
+            try:
+                await asyncio.wait_for(
+                    self.websocket.send_text(text), timeout=settings.notification_ws_send_timeout
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.info("Se descarta websocket del canal %s: %s", self._channel, exc)
+                await self._hub._evict(self, self._channel)
+                return
+
+
+class Backplane(Protocol):
+    async def start(self, deliver: Deliver) -> None: ...
+
+    async def stop(self) -> None: ...
+
+    async def publish(self, channel: str, text: str) -> None: ...
+
+
+class InProcessBackplane:
+    """Default backplane: only the clients connected to this process are reached."""
 
-class NotificationHub:
     def __init__(self) -> None:
-        self._connections: DefaultDict[str, set[WebSocket]] = defaultdict(set)
+        self._deliver: Deliver | None = None
+
+    async def start(self, deliver: Deliver) -> None:
+        self._deliver = deliver
+
+    async def stop(self) -> None:
+        self._deliver = None
+
+    async def publish(self, channel: str, text: str) -> None:
+        if self._deliver is not None:
+            self._deliver(channel, text)
+
+
+class RedisBackplane:
+    """Fan broadcasts out to every API process through Redis pub/sub."""
+
+    def __init__(self, redis: Any, prefix: str = REDIS_CHANNEL_PREFIX) -> None:
+        self._redis = redis
+        self._prefix = prefix
+        self._deliver: Deliver | None = None
+        self._pubsub: Any | None = None
+        self._listener: asyncio.Task[None] | None = None
+
+    async def start(self, deliver: Deliver) -> None:
+        self._deliver = deliver
+        self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        await self._pubsub.psubscribe(f"{self._prefix}*")
+        self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+        self._listener = None
+        self._pubsub = None
+
+    async def publish(self, channel: str, text: str) -> None:
+        try:
+            await self._redis.publish(f"{self._prefix}{channel}", text)
+        except Exception as exc:
+            # Better to reach the local clients than nobody.
+            logger.warning("No se pudo publicar en Redis (%s); entrega solo local", exc)
+            if self._deliver is not None:
+                self._deliver(channel, text)
+
+    async def _listen(self) -> None:
+        assert self._pubsub is not None
+        while True:
+            try:
+                message = await self._pubsub.get_message(timeout=1.0)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Error leyendo notificaciones desde Redis; reintentando")
+                await asyncio.sleep(1.0)
+                continue
+            if not message or message.get("type") != "pmessage" or self._deliver is None:
+                continue
+            channel = message["channel"]
+            if isinstance(channel, bytes):
+                channel = channel.decode()
+            data = message["data"]
+            if isinstance(data, bytes):
+                data = data.decode()
+            self._deliver(channel[len(self._prefix) :], data)
+
+
+def build_backplane() -> Backplane:
+    """``NOTIFICATION_BACKPLANE``: ``auto`` (Redis when configured), ``redis`` or ``memory``."""
+
+    mode = settings.notification_backplane.lower()
+    if mode in {"auto", "redis"}:
+        redis = get_redis()
+        if redis is not None:
+            return RedisBackplane(redis)
+        if mode == "redis":
+            logger.warning("NOTIFICATION_BACKPLANE=redis pero Redis no está disponible; se usa memoria")
+    return InProcessBackplane()
+
+
+class NotificationHub:
+    def __init__(self, backplane: Backplane | None = None) -> None:
+        self._connections: DefaultDict[str, dict[WebSocket, _Connection]] = defaultdict(dict)
         self._lock = asyncio.Lock()
+        self._backplane = backplane
+        self._started = False
+        self._start_lock = asyncio.Lock()
+        self._background: set[asyncio.Task[None]] = set()
+
+    async def start(self) -> None:
+        """Attach to the backplane; called from the startup hook (or lazily)."""
+
+        if self._started:
+            return
+        async with self._start_lock:
+            if self._started:
+                return
+            if self._backplane is None:
+                self._backplane = build_backplane()
+            await self._backplane.start(self._deliver_local)
+            self._started = True
+
+    async def stop(self) -> None:
+        if self._started and self._backplane is not None:
+            await self._backplane.stop()
+        self._started = False
+        async with self._lock:
+            connections = [
+                connection for channel in self._connections.values() for connection in channel.values()
+            ]
+            self._connections.clear()
+        await asyncio.gather(*(connection.stop() for connection in connections))
 
     async def connect(self, websocket: WebSocket, channel: str) -> None:
+        await self.start()
         await websocket.accept()
+        connection = _Connection(websocket, self, channel)
         async with self._lock:
-            self._connections[channel].add(websocket)
+            self._connections[channel][websocket] = connection
+        connection.start()
 
     async def disconnect(self, websocket: WebSocket, channel: str) -> None:
         async with self._lock:
-            if websocket in self._connections[channel]:
-                self._connections[channel].remove(websocket)
-            if not self._connections[channel]:
+            connection = self._connections.get(channel, {}).pop(websocket, None)
+            if not self._connections.get(channel):
                 self._connections.pop(channel, None)
+        if connection is not None:
+            await connection.stop()
 
     async def broadcast(self, channel: str, payload: NotificationRead | dict[str, Any]) -> None:
         message = payload.model_dump() if hasattr(payload, "model_dump") else payload
-        async with self._lock:
-            targets = list(self._connections.get(channel, []))
-        for connection in targets:
-            await connection.send_json(message)
+        await self.start()
+        assert self._backplane is not None
+        await self._backplane.publish(channel, json.dumps(jsonable_encoder(message)))
+
+    def _deliver_local(self, channel: str, text: str) -> None:
+        # Only enqueues: every connection writes from its own task, so a slow
+        # client never delays the others (nor the publisher).
+        for connection in list(self._connections.get(channel, {}).values()):
+            connection.offer(text)
+
+    def _spawn(self, coro: Any) -> None:
+        task = asyncio.create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _evict(self, connection: _Connection, channel: str) -> None:
+        await self.disconnect(connection.websocket, channel)
+        try:
+            await connection.websocket.close(code=SLOW_CONSUMER_CLOSE_CODE)
+        except Exception:  # pragma: no cover - the socket is usually gone already
+            pass
 
 
 notification_hub = NotificationHub()
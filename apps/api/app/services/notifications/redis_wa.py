@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import json
+import logging
+from collections.abc import Sequence
+from typing import Any
+
+from app.services.notifications.base import Notifier, OutboundMessage, whatsapp_text_job
+
+try:  # pragma: no cover - optional dependency guard
+    from redis.exceptions import RedisError
+except ImportError:  # pragma: no cover - fallback when redis is absent
+    RedisError = OSError  # type: ignore[assignment,misc]
+
+logger = logging.getLogger("nerdeala.notifications.whatsapp")
+
+# Values per LPUSH command inside one pipeline round trip.
+LPUSH_CHUNK = 500
+
+
+class RedisWhatsAppNotifier(Notifier):
+    """Push jobs straight onto the queue consumed by ``services/whatsapp``.
+
+    The Node worker pops with ``BRPOP``, so ``LPUSH`` keeps jobs in FIFO order.
+    When Redis is unreachable the messages go through ``fallback`` (the HTTP
+    notifier) if one is configured.
+    """
+
+    def __init__(self, redis: Any, queue: str, fallback: Notifier | None = None) -> None:
+        self._redis = redis
+        self._queue = queue
+        self._fallback = fallback
+
+    async def send_message(self, phone_e164: str, text: str, *, message_id: str | None = None) -> None:
+        (error,) = await self.send_bulk([OutboundMessage(phone_e164, text, message_id)])
+        if error is not None:
+            raise error
+
+    async def send_bulk(
+        self, messages: Sequence[OutboundMessage], *, concurrency: int = 8
+    ) -> list[Exception | None]:
+        """Queue every message in a single pipelined round trip."""
+
+        if not messages:
+            return []
+        payloads = [
+            json.dumps(
+                whatsapp_text_job(message.phone_e164, message.text, message.message_id),
+                ensure_ascii=False,
+            )
+            for message in messages
+        ]
+        try:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                for start in range(0, len(payloads), LPUSH_CHUNK):
+                    pipe.lpush(self._queue, *payloads[start : start + LPUSH_CHUNK])
+                await pipe.execute()
+        except RedisError as exc:
+            if self._fallback is None:
+                return [exc] * len(messages)
+            logger.warning(
+                "No se pudo encolar en Redis (%s); enviando %s mensajes por HTTP", exc, len(messages)
+            )
+            return await self._fallback.send_bulk(messages, concurrency=concurrency)
+        return [None] * len(messages)
+
+    async def send_template(
+        self, phone_e164: str, template_id: str, variables: dict[str, object] | None
+    ) -> None:
+        # The queue worker only understands text jobs; templates need the HTTP endpoint.
+        if self._fallback is None:
+            raise RuntimeError("Las plantillas de WhatsApp requieren WA_HTTP_BASE_URL")
+        await self._fallback.send_template(phone_e164, template_id, variables)
+
+
+__all__ = ["RedisWhatsAppNotifier"]
@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Iterator
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator
+
+import httpx
+
+from app.core.config import settings
+
+logger = logging.getLogger("nerdeala.google.rate_limit")
+
+THROTTLE_STATUS_CODES = {httpx.codes.TOO_MANY_REQUESTS, httpx.codes.SERVICE_UNAVAILABLE}
+DEFAULT_BACKOFF_SECONDS = 1.0
+MAX_BACKOFF_SECONDS = 60.0
+MAX_LIMITERS = 1024
+
+_quota_key: ContextVar[str | None] = ContextVar("google_quota_key", default=None)
+
+
+class AdaptiveLimiter:
+    """Token bucket with an AIMD concurrency window for one Google OAuth user.
+
+    Requests draw from a bucket refilled at ``rate`` tokens per second (up to
+    ``burst``) and only ``window`` of them may be in flight. Each success grows the
+    window additively; a 429/503 halves it and pauses the user until the
+    ``Retry-After`` delay (or an exponential backoff) has passed.
+    """
+
+    def __init__(self, rate: float, burst: int, max_concurrency: int, min_concurrency: int = 1) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.window = float(max_concurrency)
+        self._tokens = float(burst)
+        self._refilled_at = time.monotonic()
+        self._in_flight = 0
+        self._blocked_until = 0.0
+        self._consecutive_throttles = 0
+        self._condition = asyncio.Condition()
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        await self._acquire()
+        try:
+            yield
+        finally:
+            async with self._condition:
+                self._in_flight -= 1
+                self._condition.notify_all()
+
+    async def _acquire(self) -> None:
+        async with self._condition:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                wait: float | None = 0.0
+                if now < self._blocked_until:
+                    wait = self._blocked_until - now
+                elif self._in_flight >= max(self.min_concurrency, int(self.window)):
+                    wait = None  # woken up when a request finishes
+                elif self._tokens < 1:
+                    wait = (1 - self._tokens) / self.rate
+                else:
+                    self._tokens -= 1
+                    self._in_flight += 1
+                    return
+                try:
+                    await asyncio.wait_for(self._condition.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+
+    def on_success(self) -> None:
+        self._consecutive_throttles = 0
+        self.window = min(self.max_concurrency, self.window + 1 / max(self.window, 1.0))
+
+    def on_throttle(self, retry_after: float | None) -> float:
+        """Shrink the window and pause the user; returns the pause in seconds."""
+        self._consecutive_throttles += 1
+        self.window = max(float(self.min_concurrency), self.window / 2)
+        delay = retry_after
+        if delay is None:
+            delay = DEFAULT_BACKOFF_SECONDS * 2 ** (self._consecutive_throttles - 1)
+        delay = min(max(delay, 0.0), MAX_BACKOFF_SECONDS)
+        self._blocked_until = max(self._blocked_until, time.monotonic() + delay)
+        self._tokens = min(self._tokens, 0.0)
+        return delay
+
+
+_limiters: OrderedDict[str, AdaptiveLimiter] = OrderedDict()
+
+
+def get_limiter(key: str) -> AdaptiveLimiter:
+    limiter = _limiters.get(key)
+    if limiter is None:
+        limiter = AdaptiveLimiter(
+            rate=settings.google_rate_limit_per_second,
+            burst=settings.google_rate_limit_burst,
+            max_concurrency=settings.google_max_concurrency,
+        )
+        _limiters[key] = limiter
+        while len(_limiters) > MAX_LIMITERS:
+            _limiters.popitem(last=False)
+    else:
+        _limiters.move_to_end(key)
+    return limiter
+
+
+@contextmanager
+def quota_scope(user_id: str | None) -> Iterator[None]:
+    """Charge the Google requests made inside this block (and its tasks) to ``user_id``."""
+    reset = _quota_key.set(user_id)
+    try:
+        yield
+    finally:
+        _quota_key.reset(reset)
+
+
+def current_quota_user() -> str | None:
+    return _quota_key.get()
+
+
+def _limiter_key(token: str) -> str:
+    user_id = _quota_key.get()
+    if user_id:
+        return f"user:{user_id}"
+    # An access token belongs to a single OAuth user; never keep it in clear.
+    return "token:" + hashlib.sha256(token.encode()).hexdigest()[:16]
+
+
+async def send_with_backoff(
+    token: str,
+    send: Callable[[], Awaitable[httpx.Response]],
+    *,
+    attempts: int | None = None,
+) -> httpx.Response:
+    """Send a Google request through the caller's limiter, retrying 429/503 answers.
+
+    The last throttled response is returned once ``attempts`` are exhausted so the
+    caller keeps its own error handling.
+    """
+
+    limiter = get_limiter(_limiter_key(token))
+    max_attempts = attempts or settings.google_throttle_retries
+    response: httpx.Response | None = None
+    for attempt in range(1, max_attempts + 1):
+        async with limiter.slot():
+            response = await send()
+        if response.status_code not in THROTTLE_STATUS_CODES:
+            limiter.on_success()
+            return response
+        delay = limiter.on_throttle(_retry_after_seconds(response))
+        logger.warning(
+            "Google respondió %s; reintento %s/%s en %.1fs (ventana=%.1f)",
+            response.status_code,
+            attempt,
+            max_attempts,
+            delay,
+            limiter.window,
+        )
+    assert response is not None
+    return response
+
+
+def _retry_after_seconds(response: httpx.Response) -> float | None:
+    raw = response.headers.get("retry-after")
+    if not raw:
+        return None
+    try:
+        return float(raw)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(raw)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+__all__ = ["AdaptiveLimiter", "current_quota_user", "get_limiter", "quota_scope", "send_with_backoff"]
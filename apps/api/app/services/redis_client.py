@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import logging
+from typing import Any
+
+from app.core.config import settings
+
+try:  # pragma: no cover - optional dependency guard
+    from redis import asyncio as redis_asyncio
+except ImportError:  # pragma: no cover - fallback when redis is absent
+    redis_asyncio = None  # type: ignore[assignment]
+
+logger = logging.getLogger("nerdeala.redis")
+
+_client: Any | None = None
+
+
+def get_redis() -> Any | None:
+    """Return the shared Redis client, or ``None`` when Redis is not configured."""
+
+    global _client
+    if not settings.redis_url:
+        return None
+    if redis_asyncio is None:
+        logger.warning("REDIS_URL está configurado pero el paquete redis no está instalado")
+        return None
+    if _client is None:
+        _client = redis_asyncio.from_url(settings.redis_url, decode_responses=True)
+    return _client
+
+
+async def close_redis() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+    _client = None
+
+
+__all__ = ["close_redis", "get_redis"]
@@ -0,0 +1,146 @@
+"""Cache of computed course reports.
+
+Entries are keyed by course, the course's data version and the query flags.
+Every write a report depends on bumps the version (see
+``repositories.course_data_versions``): the Classroom sync, attendance and the
+course, student and notification routes. A new write simply makes the old keys
+unreachable. The TTL bounds the age of the clock-dependent sections (recent
+activity, upcoming deadlines) and of anything written around the API, such as
+manual database edits.
+
+The in-process LRU is always on; with Redis the entries are also shared between
+API processes.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from typing import Any
+
+from app.core.config import settings
+from app.services.redis_client import get_redis
+
+logger = logging.getLogger("nerdeala.report_cache")
+
+REDIS_KEY_PREFIX = "nerdeala:report:"
+
+
+@dataclass(slots=True, frozen=True)
+class CachedReport:
+    """A JSON-ready report and when it was computed."""
+
+    generated_at: str
+    report: dict[str, Any]
+
+
+def report_cache_key(course_id: str, version: int, **flags: bool) -> str:
+    encoded = ",".join(f"{name}={int(value)}" for name, value in sorted(flags.items()))
+    return f"{course_id}:v{version}:{encoded}"
+
+
+def report_etag(key: str, entry: CachedReport, viewer_id: str) -> str:
+    """Weak ETag of the response body, which also names the viewer (``generated_by``)."""
+
+    digest = hashlib.sha1(f"{key}|{entry.generated_at}|{viewer_id}".encode()).hexdigest()[:24]
+    return f'W/"{digest}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = {candidate.strip() for candidate in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+class ReportCache:
+    def __init__(
+        self,
+        *,
+        max_entries: int,
+        ttl_seconds: float,
+        redis: Any | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._entries: OrderedDict[str, tuple[float, CachedReport]] = OrderedDict()
+        self._max_entries = max(1, max_entries)
+        self._ttl = ttl_seconds
+        self._redis = redis
+        self._clock = clock
+
+    async def get(self, key: str) -> CachedReport | None:
+        item = self._entries.get(key)
+        if item is not None:
+            expires_at, entry = item
+            if expires_at > self._clock():
+                self._entries.move_to_end(key)
+                return entry
+            del self._entries[key]
+
+        if self._redis is None:
+            return None
+        try:
+            raw = await self._redis.get(f"{REDIS_KEY_PREFIX}{key}")
+        except Exception as exc:
+            logger.warning("No se pudo leer el reporte cacheado en Redis: %s", exc)
+            return None
+        if raw is None:
+            return None
+        entry = CachedReport(**json.loads(raw))
+        self._remember(key, entry)
+        return entry
+
+    async def set(self, key: str, entry: CachedReport) -> None:
+        self._remember(key, entry)
+        if self._redis is None:
+            return
+        try:
+            await self._redis.set(
+                f"{REDIS_KEY_PREFIX}{key}", json.dumps(asdict(entry)), ex=max(1, int(self._ttl))
+            )
+        except Exception as exc:
+            logger.warning("No se pudo guardar el reporte en Redis: %s", exc)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def _remember(self, key: str, entry: CachedReport) -> None:
+        self._entries[key] = (self._clock() + self._ttl, entry)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+
+_cache: ReportCache | None = None
+
+
+def get_report_cache() -> ReportCache:
+    """``REPORT_CACHE_BACKEND``: ``auto`` (Redis tier when configured), ``redis`` or ``memory``."""
+
+    global _cache
+    if _cache is None:
+        mode = settings.report_cache_backend.lower()
+        redis = get_redis() if mode in {"auto", "redis"} else None
+        if mode == "redis" and redis is None:
+            logger.warning("REPORT_CACHE_BACKEND=redis pero Redis no está disponible; solo memoria")
+        _cache = ReportCache(
+            max_entries=settings.report_cache_max_entries,
+            ttl_seconds=settings.report_cache_ttl_seconds,
+            redis=redis,
+        )
+    return _cache
+
+
+__all__ = [
+    "CachedReport",
+    "ReportCache",
+    "etag_matches",
+    "get_report_cache",
+    "report_cache_key",
+    "report_etag",
+]
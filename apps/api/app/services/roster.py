@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass
+from typing import Any
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.course_participant import ParticipantRole
+from app.repositories import course_participants as participants_repo
+from app.repositories import user_contacts as user_contacts_repo
+from app.repositories import users as users_repo
+
+
+@dataclass(slots=True)
+class RosterEntry:
+    google_user_id: str
+    email: str | None
+    full_name: str | None
+    photo_url: str | None
+    role: ParticipantRole
+
+
+class UserMatchIndex:
+    """In-memory email/name lookup used to match Classroom people to local users.
+
+    Loaded with a single query per sync run and then shared, read-only, by every
+    course processed in that run.
+    """
+
+    def __init__(self, users: Iterable[tuple[str, str | None, str | None]] = ()) -> None:
+        self._by_email: dict[str, str] = {}
+        self._by_name: dict[str, str | None] = {}
+        for user_id, email, name in users:
+            if email:
+                self._by_email[email.lower()] = user_id
+            if name:
+                key = name.strip().lower()
+                # Homonyms are ambiguous: never match them by name.
+                self._by_name[key] = None if key in self._by_name else user_id
+
+    @classmethod
+    async def load(cls, session: AsyncSession) -> UserMatchIndex:
+        return cls(await users_repo.list_match_candidates(session))
+
+    def match(self, email: str | None, full_name: str | None) -> str | None:
+        if email:
+            user_id = self._by_email.get(email.lower())
+            if user_id:
+                return user_id
+        if full_name:
+            return self._by_name.get(full_name.strip().lower())
+        return None
+
+
+async def reconcile_roster(
+    session: AsyncSession,
+    course_id: str,
+    entries: Sequence[RosterEntry],
+    index: UserMatchIndex,
+    *,
+    roles: Iterable[ParticipantRole] | None = None,
+    prune: bool = True,
+) -> list[dict[str, Any]]:
+    """Match a course roster against ``index`` and persist it with bulk statements.
+
+    With ``prune`` participants of ``roles`` (all roles when ``None``) that are no
+    longer in the roster are removed; callers streaming a roster page by page pass
+    ``prune=False`` and prune once at the end. A contact row is provisioned for
+    every matched user. Returns the participant values written, in roster order.
+    """
+
+    rows: list[dict[str, Any]] = []
+    contact_emails: dict[str, str | None] = {}
+    for entry in entries:
+        matched_user_id = index.match(entry.email, entry.full_name)
+        rows.append(
+            {
+                "google_user_id": entry.google_user_id,
+                "email": entry.email,
+                "full_name": entry.full_name,
+                "photo_url": entry.photo_url,
+                "role": entry.role,
+                "matched_user_id": matched_user_id,
+            }
+        )
+        if matched_user_id:
+            contact_emails[matched_user_id] = entry.email or contact_emails.get(matched_user_id)
+
+    written = await participants_repo.bulk_upsert(session, course_id, rows)
+    if prune:
+        await participants_repo.delete_missing(
+            session,
+            course_id,
+            {values["google_user_id"] for values in written},
+            roles=roles,
+        )
+    await user_contacts_repo.bulk_upsert(session, contact_emails)
+    return written
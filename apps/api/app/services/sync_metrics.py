@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import json
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field, fields
+from datetime import datetime
+from typing import Any
+
+STAGES = ("fetch", "parse", "db", "notify")
+
+
+@dataclass(slots=True)
+class SyncStats:
+    """Counters for one course (or a whole run) of a Classroom sync."""
+
+    requests: int = 0
+    not_modified: int = 0
+    bytes: int = 0
+    rows_inserted: int = 0
+    rows_updated: int = 0
+    rows_deleted: int = 0
+    fetch_seconds: float = 0.0
+    parse_seconds: float = 0.0
+    db_seconds: float = 0.0
+    notify_seconds: float = 0.0
+
+    @property
+    def not_modified_ratio(self) -> float:
+        return round(self.not_modified / self.requests, 3) if self.requests else 0.0
+
+    def merge(self, other: SyncStats) -> None:
+        for item in fields(self):
+            setattr(self, item.name, getattr(self, item.name) + getattr(other, item.name))
+
+    def as_dict(self) -> dict[str, Any]:
+        values = asdict(self)
+        for stage in STAGES:
+            values[f"{stage}_seconds"] = round(values[f"{stage}_seconds"], 4)
+        values["not_modified_ratio"] = self.not_modified_ratio
+        return values
+
+
+@dataclass(slots=True)
+class SyncRunRecorder:
+    kind: str
+    trigger: str
+    user_id: str | None = None
+    started_at: datetime = field(default_factory=datetime.utcnow)
+    courses: dict[str, SyncStats] = field(default_factory=dict)
+    _started: float = field(default_factory=time.perf_counter)
+
+    def course(self, course_id: str) -> SyncStats:
+        return self.courses.setdefault(course_id, SyncStats())
+
+    def totals(self) -> SyncStats:
+        totals = SyncStats()
+        for stats in self.courses.values():
+            totals.merge(stats)
+        return totals
+
+    def elapsed(self) -> float:
+        return round(time.perf_counter() - self._started, 3)
+
+    def to_row(self, *, status: str, error: str | None = None) -> dict[str, Any]:
+        """Column values for a ``sync_runs`` row; per-course stats go to ``course_breakdown``."""
+
+        totals = self.totals().as_dict()
+        totals.pop("not_modified_ratio")
+        return {
+            "kind": self.kind,
+            "trigger": self.trigger,
+            "user_id": self.user_id,
+            "status": status,
+            "started_at": self.started_at,
+            "finished_at": datetime.utcnow(),
+            "duration_seconds": self.elapsed(),
+            "courses": len(self.courses),
+            "course_breakdown": json.dumps(
+                {course_id: stats.as_dict() for course_id, stats in self.courses.items()}
+            ),
+            "error": error,
+            **totals,
+        }
+
+
+_current: ContextVar[SyncStats | None] = ContextVar("sync_course_stats", default=None)
+
+
+@contextmanager
+def track_course(stats: SyncStats) -> Iterator[None]:
+    """Attribute the hooks called inside this block (and its tasks) to ``stats``."""
+
+    reset = _current.set(stats)
+    try:
+        yield
+    finally:
+        _current.reset(reset)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Add the wall time of the block to the ``name`` stage of the current course."""
+
+    stats = _current.get()
+    if stats is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        attribute = f"{name}_seconds"
+        setattr(stats, attribute, getattr(stats, attribute) + time.perf_counter() - started)
+
+
+def record_request(size: int, *, not_modified: bool) -> None:
+    stats = _current.get()
+    if stats is None:
+        return
+    stats.requests += 1
+    stats.bytes += size
+    if not_modified:
+        stats.not_modified += 1
+
+
+def record_rows(*, inserted: int = 0, updated: int = 0, deleted: int = 0) -> None:
+    stats = _current.get()
+    if stats is None:
+        return
+    stats.rows_inserted += inserted
+    stats.rows_updated += updated
+    stats.rows_deleted += deleted
+
+
+__all__ = [
+    "SyncRunRecorder",
+    "SyncStats",
+    "record_request",
+    "record_rows",
+    "stage",
+    "track_course",
+]
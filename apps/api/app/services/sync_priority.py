@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.course_sync_schedule import CourseSyncSchedule
+from app.repositories import course_assignments as assignments_repo
+from app.repositories import course_sync_schedules as schedules_repo
+
+# Weight of the latest poll in the smoothed change rate (changes per hour).
+CHANGE_RATE_SMOOTHING = 0.3
+# Changes per hour at which the poll interval is halved from the base one.
+HOT_CHANGE_RATE = 10.0
+# Below this rate a course counts as dormant and its interval keeps doubling.
+DORMANT_CHANGE_RATE = 0.1
+# Assignments due within this window (or that closed this recently, for late
+# turn-ins) keep their course on the fast lane.
+DUE_SOON_WINDOW = timedelta(hours=24)
+DUE_GRACE = timedelta(hours=2)
+
+
+def next_poll_interval(
+    previous: CourseSyncSchedule | None,
+    updates: int,
+    now: datetime,
+    nearest_due_at: datetime | None = None,
+) -> tuple[float, int]:
+    """Return the smoothed change rate and the seconds until the next delta poll."""
+
+    base = settings.classroom_poll_base_seconds
+    if previous is None or previous.last_synced_at is None:
+        change_rate = float(updates)
+        previous_interval = base
+    else:
+        elapsed_hours = max((now - previous.last_synced_at).total_seconds() / 3600, 1 / 60)
+        observed = updates / elapsed_hours
+        change_rate = CHANGE_RATE_SMOOTHING * observed + (1 - CHANGE_RATE_SMOOTHING) * previous.change_rate
+        previous_interval = previous.interval_seconds
+
+    if change_rate >= DORMANT_CHANGE_RATE:
+        interval = base / (1 + change_rate / HOT_CHANGE_RATE)
+    else:
+        interval = max(previous_interval, base) * 2
+
+    if nearest_due_at is not None and nearest_due_at - now <= DUE_SOON_WINDOW:
+        interval = min(interval, settings.classroom_poll_min_seconds * 2)
+
+    interval = min(max(interval, settings.classroom_poll_min_seconds), settings.classroom_poll_max_seconds)
+    return change_rate, int(interval)
+
+
+async def record_course_poll(
+    session: AsyncSession, course_id: str, updates: int, now: datetime | None = None
+) -> CourseSyncSchedule:
+    """Fold the result of a delta poll into the course schedule."""
+
+    now = now or datetime.utcnow()
+    previous = await schedules_repo.get(session, course_id)
+    nearest_due_at = await assignments_repo.next_due_at(session, course_id, now - DUE_GRACE)
+    change_rate, interval = next_poll_interval(previous, updates, now, nearest_due_at)
+    return await schedules_repo.save(
+        session,
+        course_id,
+        change_rate=change_rate,
+        interval_seconds=interval,
+        last_updates=updates,
+        synced_at=now,
+        next_sync_at=now + timedelta(seconds=interval),
+    )
+
+
+async def courses_not_due(
+    session: AsyncSession, course_ids: list[str], now: datetime | None = None
+) -> set[str]:
+    return await schedules_repo.list_not_due(session, course_ids, now or datetime.utcnow())
+
+
+__all__ = ["courses_not_due", "next_poll_interval", "record_course_poll"]
@@ -1,7 +1,13 @@
 from __future__ import annotations
 
+import asyncio
 import logging
+import random
+import time
 from collections.abc import Awaitable, Callable
+from datetime import timedelta
+from functools import partial
+from typing import Any
 
 try:  # pragma: no cover - optional dependency guard
     from apscheduler.schedulers.asyncio import AsyncIOScheduler
@@ -10,7 +16,15 @@ except ImportError:  # pragma: no cover - fallback when apscheduler is absent
     AsyncIOScheduler = None  # type: ignore[assignment]
     IntervalTrigger = None  # type: ignore[assignment]
 
-from app.services.google_sync import sync_delta_courses, sync_full_metadata
+from app.core.config import settings
+from app.services.google_sync import (
+    ClassroomSyncResult,
+    prune_sync_runs,
+    sync_delta_courses,
+    sync_full_metadata,
+)
+from app.services.leases import CycleClaims, LeaseBackend
+from app.services.rate_limit import quota_scope
 
 logger = logging.getLogger("nerdeala.classroom.scheduler")
 
@@ -18,6 +32,17 @@ _scheduler: AsyncIOScheduler | None = None
 
 
 TokenProvider = Callable[[], Awaitable[list[tuple[str, str]]]]
+UserSync = Callable[..., Awaitable[ClassroomSyncResult]]
+
+# Delta ticks run at the fastest poll interval; each course is only synced when
+# its adaptive schedule (see app.services.sync_priority) says it is due.
+DELTA_INTERVAL = timedelta(seconds=settings.classroom_poll_min_seconds)
+FULL_INTERVAL = timedelta(hours=6)
+# Leases expire a bit before the next tick so the owner can be re-elected on time.
+LEASE_TTL_RATIO = 0.9
+
+_user_locks: dict[str, asyncio.Lock] = {}
+_last_cycles: dict[str, dict[str, Any]] = {}
 
 
 def start_scheduler(
@@ -35,40 +60,37 @@ def start_scheduler(
     scheduler = AsyncIOScheduler(timezone="UTC")
 
     async def delta_job() -> None:
-        tokens = await _safe_tokens(token_provider)
-        if not tokens:
-            logger.debug("Sin usuarios con token para delta sync")
-            return
-        for user_id, token in tokens:
-            try:
-                await sync_delta_courses(token)
-            except Exception:  # pragma: no cover - defensive logging
-                logger.exception("Error en delta sync para usuario %s", user_id)
+        await run_cycle(
+            "delta",
+            token_provider,
+            partial(sync_delta_courses, adaptive=True, trigger="scheduler"),
+            interval=DELTA_INTERVAL,
+        )
 
     async def full_job() -> None:
-        tokens = await _safe_tokens(token_provider)
-        if not tokens:
-            logger.debug("Sin usuarios con token para full sync")
-            return
-        for user_id, token in tokens:
-            try:
-                await sync_full_metadata(token)
-            except Exception:  # pragma: no cover - defensive logging
-                logger.exception("Error en full sync para usuario %s", user_id)
+        await prune_sync_runs()
+        await run_cycle(
+            "full",
+            token_provider,
+            partial(sync_full_metadata, trigger="scheduler"),
+            interval=FULL_INTERVAL,
+        )
 
     scheduler.add_job(
         delta_job,
-        IntervalTrigger(minutes=5),
+        IntervalTrigger(seconds=DELTA_INTERVAL.total_seconds()),
         id="classroom-delta",
-        max_instances=1,
+        # Per-user locks keep overlapping ticks from syncing the same user twice,
+        # so a slow run no longer makes APScheduler drop the next one.
+        max_instances=2,
         replace_existing=True,
         coalesce=True,
     )
     scheduler.add_job(
         full_job,
-        IntervalTrigger(hours=6),
+        IntervalTrigger(seconds=FULL_INTERVAL.total_seconds()),
         id="classroom-full",
-        max_instances=1,
+        max_instances=2,
         replace_existing=True,
         coalesce=True,
     )
@@ -87,6 +109,107 @@ def shutdown_scheduler() -> None:
     _scheduler = None
 
 
+async def run_cycle(
+    label: str,
+    token_provider: TokenProvider,
+    sync_user: UserSync,
+    *,
+    interval: timedelta,
+    workers: int | None = None,
+    backend: LeaseBackend | None = None,
+) -> dict[str, Any]:
+    """Sync every scheduler user once with a bounded pool of workers.
+
+    Workers pull users from a shared queue, so a slow tenant only ties up one
+    worker. A user whose previous run is still in progress is skipped. Users and
+    courses are leased for the interval, so across every replica each user is
+    listed once and each course synced once per cycle, even when several users
+    can see it.
+    """
+
+    started = time.perf_counter()
+    metrics: dict[str, Any] = {
+        "label": label,
+        "users": 0,
+        "skipped_users": [],
+        "remote_users": 0,
+        "failed_users": [],
+        "courses": 0,
+        "deduplicated": 0,
+        "deferred": 0,
+        "user_timings": {},
+    }
+    tokens = await _safe_tokens(token_provider)
+    if not tokens:
+        logger.debug("Sin usuarios con token para %s sync", label)
+        return metrics
+
+    # Replicas walk users in different orders so they spread the leases.
+    tokens = random.sample(tokens, len(tokens))
+    queue: asyncio.Queue[tuple[str, str]] = asyncio.Queue()
+    for item in tokens:
+        queue.put_nowait(item)
+    claims = CycleClaims(
+        label, ttl=interval.total_seconds() * LEASE_TTL_RATIO, backend=backend
+    )
+
+    async def _worker() -> None:
+        while True:
+            try:
+                user_id, token = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            lock = _user_locks.setdefault(user_id, asyncio.Lock())
+            if lock.locked():
+                logger.info("%s sync: usuario %s sigue en curso, se omite este ciclo", label, user_id)
+                metrics["skipped_users"].append(user_id)
+                continue
+            if not await claims.claim_user(user_id):
+                metrics["remote_users"] += 1
+                continue
+            async with lock:
+                user_started = time.perf_counter()
+                try:
+                    with quota_scope(user_id):
+                        result = await sync_user(token, claims=claims)
+                except Exception:  # pragma: no cover - defensive logging
+                    logger.exception("Error en %s sync para usuario %s", label, user_id)
+                    metrics["failed_users"].append(user_id)
+                else:
+                    metrics["users"] += 1
+                    metrics["courses"] += len(result.get("timings", {}))
+                    metrics["deduplicated"] += result.get("deduplicated", 0)
+                    metrics["deferred"] += result.get("deferred", 0)
+                finally:
+                    metrics["user_timings"][user_id] = round(time.perf_counter() - user_started, 3)
+
+    worker_count = max(1, min(workers or settings.classroom_scheduler_workers, len(tokens)))
+    await asyncio.gather(*(_worker() for _ in range(worker_count)))
+
+    metrics["workers"] = worker_count
+    metrics["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+    _last_cycles[label] = metrics
+    logger.info(
+        "%s sync: %s usuarios, %s cursos (%s deduplicados, %s sin vencer), %s omitidos, %s en otra réplica, "
+        "%s fallidos en %.2fs con %s workers",
+        label,
+        metrics["users"],
+        metrics["courses"],
+        metrics["deduplicated"],
+        metrics["deferred"],
+        len(metrics["skipped_users"]),
+        metrics["remote_users"],
+        len(metrics["failed_users"]),
+        metrics["elapsed_seconds"],
+        worker_count,
+    )
+    return metrics
+
+
+def last_cycle_metrics() -> dict[str, dict[str, Any]]:
+    return dict(_last_cycles)
+
+
 async def _safe_tokens(
     token_provider: TokenProvider,
 ) -> list[tuple[str, str]]:
@@ -97,4 +220,4 @@ async def _safe_tokens(
         return []
 
 
-__all__ = ["start_scheduler", "shutdown_scheduler"]
+__all__ = ["last_cycle_metrics", "run_cycle", "start_scheduler", "shutdown_scheduler"]
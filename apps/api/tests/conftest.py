@@ -15,6 +15,7 @@ if str(ROOT_DIR) not in sys.path:
 from app.api.deps import get_db
 from app.db.base import Base
 from app.main import app
+from app.services.report_cache import get_report_cache
 
 TEST_DATABASE_URL = "sqlite+aiosqlite:///./test.db"
 
@@ -46,6 +47,8 @@ async def async_client(
             yield session
 
     app.dependency_overrides[get_db] = override_get_db
+    # Every test starts from a fresh database, so cached reports must not leak across
+    get_report_cache().clear()
 
     async with AsyncClient(app=app, base_url="http://test") as client:
         yield client
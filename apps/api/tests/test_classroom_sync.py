@@ -1,11 +1,17 @@
+import asyncio
+from datetime import datetime, timedelta
+
 import pytest
 from sqlalchemy import select
 
 from app.models.course import Course
 from app.models.course_membership import ClassroomMemberRole, CourseMembership
 from app.models.course_participant import CourseParticipant, ParticipantRole
+from app.models.sync_job import SyncJob, SyncJobStatus
 from app.models.token import AuthToken, TokenType
 from app.models.user import User, UserRole
+from app.services import classroom_jobs
+from app.services.google_classroom import ClassroomCourseBundle, GoogleClassroomService
 
 
 async def register_and_verify(async_client, session_factory, email: str, role: UserRole):
@@ -30,8 +36,23 @@ async def register_and_verify(async_client, session_factory, email: str, role: U
     return login.json()["access_token"]
 
 
+async def wait_for_job(async_client, token: str, job_id: str) -> dict:
+    for _ in range(100):
+        response = await async_client.get(
+            f"/api/v1/classroom/sync/jobs/{job_id}",
+            headers={"Authorization": f"Bearer {token}"},
+        )
+        assert response.status_code == 200
+        job = response.json()
+        if job["status"] in {"succeeded", "failed"}:
+            return job
+        await asyncio.sleep(0.05)
+    raise AssertionError("La sincronización no terminó a tiempo")
+
+
 @pytest.mark.asyncio
-async def test_classroom_sync_creates_courses(async_client, session_factory):
+async def test_classroom_sync_creates_courses(async_client, session_factory, monkeypatch):
+    monkeypatch.setattr(classroom_jobs, "AsyncSessionLocal", session_factory)
     token = await register_and_verify(async_client, session_factory, "docente@example.com", UserRole.STUDENT)
 
     sync_response = await async_client.post(
@@ -41,18 +62,15 @@ async def test_classroom_sync_creates_courses(async_client, session_factory):
             "X-Goog-Access-Token": "demo-token",
         },
     )
-    assert sync_response.status_code == 200
-    payload = sync_response.json()
+    assert sync_response.status_code == 202
+    job = await wait_for_job(async_client, token, sync_response.json()["id"])
+    assert job["status"] == "succeeded"
+    assert job["total_courses"] == job["completed_courses"] >= 1
+    assert job["progress"]["demo-course-1"]["status"] == "done"
+    assert job["progress"]["demo-course-1"]["participants"] >= 1
+    payload = job["result"]
     assert payload["count"] >= 1
-    assert "participants" in payload
-    assert "demo-course-1" in payload["participants"]
-    assert any(
-        participant["role"] == "teacher" for participant in payload["participants"]["demo-course-1"]
-    )
-    assert any(
-        participant["email"] == "teacher@example.com"
-        for participant in payload["participants"]["demo-course-1"]
-    )
+    assert payload["participants"] >= 1
     assert "assignments" in payload
     assert "submissions" in payload
 
@@ -117,3 +135,82 @@ async def test_classroom_sync_creates_courses(async_client, session_factory):
     )
     assert any(participant.role == ParticipantRole.TEACHER for participant in participants)
     assert any(participant.role == ParticipantRole.STUDENT for participant in participants)
+
+
+@pytest.mark.asyncio
+async def test_only_jobs_whose_lease_lapsed_are_failed_as_interrupted(session_factory, monkeypatch):
+    monkeypatch.setattr(classroom_jobs, "AsyncSessionLocal", session_factory)
+    now = datetime.utcnow()
+    async with session_factory() as session:
+        leases = {"live": now + timedelta(minutes=1), "orphan": now - timedelta(seconds=1)}
+        for job_id, lease_expires_at in leases.items():
+            session.add(
+                User(id=f"jobs-{job_id}", name="Docente", email=f"{job_id}@example.com", hashed_password="x")
+            )
+            session.add(
+                SyncJob(
+                    id=job_id,
+                    user_id=f"jobs-{job_id}",
+                    status=SyncJobStatus.RUNNING,
+                    owner="other-replica",
+                    lease_expires_at=lease_expires_at,
+                )
+            )
+        await session.commit()
+
+    await classroom_jobs.fail_interrupted_jobs()
+
+    async with session_factory() as session:
+        live = await session.get(SyncJob, "live")
+        orphan = await session.get(SyncJob, "orphan")
+    assert live.status == SyncJobStatus.RUNNING
+    assert orphan.status == SyncJobStatus.FAILED
+
+
+@pytest.mark.asyncio
+async def test_concurrent_enqueues_share_one_job(session_factory, monkeypatch):
+    started: list[str] = []
+
+    async def fake_run(job_id, user_id, token):
+        started.append(job_id)
+
+    monkeypatch.setattr(classroom_jobs, "run_classroom_sync", fake_run)
+    async with session_factory() as session:
+        user = User(id="twice-user", name="Docente", email="twice@example.com", hashed_password="x")
+        session.add(user)
+        await session.commit()
+
+    async def enqueue() -> str:
+        async with session_factory() as session:
+            job = await classroom_jobs.enqueue_classroom_sync(session, user, "token")
+            return job.id
+
+    first, second = await asyncio.gather(enqueue(), enqueue())
+    await asyncio.sleep(0)
+    assert first == second
+    assert started == [first]
+    async with session_factory() as session:
+        jobs = (await session.execute(select(SyncJob).where(SyncJob.user_id == "twice-user"))).scalars().all()
+    assert len(jobs) == 1
+
+
+@pytest.mark.asyncio
+async def test_course_bundles_stream_with_bounded_prefetch(monkeypatch):
+    service = GoogleClassroomService(concurrency=2)
+    in_flight = 0
+    peak = 0
+
+    async def fake_bundle(token, course_id):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return ClassroomCourseBundle(course_id=course_id)
+
+    monkeypatch.setattr(service, "fetch_course_bundle", fake_bundle)
+    bundles = service.iter_course_bundles("token", ["a", "b", "c", "d", "e"])
+    received = [bundle.course_id async for bundle in bundles]
+
+    assert sorted(received) == ["a", "b", "c", "d", "e"]
+    assert peak == 2
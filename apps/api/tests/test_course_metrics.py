@@ -0,0 +1,73 @@
+import pytest
+from sqlalchemy import select
+
+from app.models.course import Course
+from app.models.course_assignment import CourseAssignment
+from app.models.course_metrics import AssignmentMetrics, CourseMetrics, StudentCourseMetrics
+from app.repositories import course_metrics as course_metrics_repo
+from app.repositories import course_submissions as submissions_repo
+
+
+def submission_row(submission_id, coursework_id, google_user_id, state, *, late=False, grade=None):
+    return {
+        "submission_id": submission_id,
+        "course_id": "metrics-course",
+        "coursework_id": coursework_id,
+        "google_user_id": google_user_id,
+        "state": state,
+        "late": late,
+        "assigned_grade": grade,
+    }
+
+
+async def snapshot_rollups(session):
+    rows = {}
+    for model in (CourseMetrics, StudentCourseMetrics, AssignmentMetrics):
+        result = await session.execute(select(model).execution_options(populate_existing=True))
+        rows[model.__tablename__] = sorted(
+            (
+                tuple(getattr(row, key) for key in model.__table__.primary_key.columns.keys()),
+                tuple(getattr(row, field) for field in course_metrics_repo.COUNTER_FIELDS),
+            )
+            for row in result.scalars().all()
+            if row.total
+        )
+    return rows
+
+
+@pytest.mark.asyncio
+async def test_incremental_rollups_match_a_rebuild(session_factory):
+    async with session_factory() as session:
+        session.add(Course(id="metrics-course", name="Química"))
+        session.add(CourseAssignment(id="cw-a", course_id="metrics-course", title="A"))
+        session.add(CourseAssignment(id="cw-b", course_id="metrics-course", title="B"))
+        await session.flush()
+
+        first = [
+            submission_row("s1", "cw-a", "g-1", "CREATED"),
+            submission_row("s2", "cw-a", "g-2", "TURNED_IN", late=True),
+            submission_row("s3", "cw-b", "g-1", "NEW"),
+        ]
+        changes = await submissions_repo.bulk_upsert(session, first)
+        await course_metrics_repo.apply_submission_changes(session, changes)
+
+        course = await course_metrics_repo.get_course(session, "metrics-course")
+        assert (course.total, course.submitted, course.drafts, course.late) == (3, 1, 1, 1)
+
+        # Draft turned in and graded, the late one returned with a grade, a new one appears.
+        second = [
+            submission_row("s1", "cw-a", "g-1", "TURNED_IN", grade=80.0),
+            submission_row("s2", "cw-a", "g-2", "RETURNED", late=True, grade=50.0),
+            submission_row("s3", "cw-b", "g-1", "NEW"),
+            submission_row("s4", "cw-b", "g-2", "CREATED"),
+        ]
+        changes = await submissions_repo.bulk_upsert(session, second)
+        await course_metrics_repo.apply_submission_changes(session, changes)
+        incremental = await snapshot_rollups(session)
+
+        await course_metrics_repo.rebuild(session, "metrics-course")
+        assert await snapshot_rollups(session) == incremental
+
+        assert incremental["course_metrics"] == [(("metrics-course",), (4, 2, 1, 1, 2, 130.0))]
+        assert (("metrics-course", "g-1"), (2, 1, 0, 0, 1, 80.0)) in incremental["student_course_metrics"]
+        assert (("metrics-course", "cw-a"), (2, 2, 0, 1, 2, 130.0)) in incremental["assignment_metrics"]
@@ -0,0 +1,278 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+
+from app.api.routes import auth as auth_routes
+from app.models.course import Course
+from app.models.course_assignment import CourseAssignment
+from app.models.course_participant import CourseParticipant, ParticipantRole
+from app.models.course_submission import CourseSubmission
+from app.models.token import AuthToken, TokenType
+from app.models.user import UserRole
+from app.repositories import course_metrics as course_metrics_repo
+
+
+async def bootstrap_admin(async_client, session_factory):
+    # Every test logs the same admin in; keep the login rate limit out of the way
+    auth_routes._login_attempts.clear()
+    await async_client.post(
+        "/api/v1/auth/register",
+        json={
+            "name": "Admin",
+            "email": "admin@example.com",
+            "password": "AdminPass123",
+            "role": UserRole.ADMIN.value,
+        },
+    )
+    async with session_factory() as session:
+        result = await session.execute(
+            select(AuthToken).where(AuthToken.token_type == TokenType.VERIFY).order_by(AuthToken.created_at.desc())
+        )
+        token = result.scalars().first()
+    await async_client.post("/api/v1/auth/verify", json={"token": token.token})
+    login = await async_client.post(
+        "/api/v1/auth/login", json={"email": "admin@example.com", "password": "AdminPass123"}
+    )
+    return login.json()["access_token"]
+
+
+async def seed_course(session_factory):
+    now = datetime.now()
+    async with session_factory() as session:
+        session.add(Course(id="report-course", name="Historia"))
+        session.add(
+            CourseParticipant(
+                id="p-teacher", course_id="report-course", google_user_id="g-teacher",
+                full_name="Docente", role=ParticipantRole.TEACHER,
+            )
+        )
+        for index in range(3):
+            session.add(
+                CourseParticipant(
+                    id=f"p-{index}", course_id="report-course", google_user_id=f"g-{index}",
+                    full_name=f"Alumno {index}", email=f"alumno{index}@example.com",
+                    role=ParticipantRole.STUDENT,
+                )
+            )
+        session.add(CourseAssignment(id="cw-1", course_id="report-course", title="TP 1", due_at=now - timedelta(days=2)))
+        session.add(CourseAssignment(id="cw-2", course_id="report-course", title="TP 2", due_at=now + timedelta(days=1)))
+        submissions = [
+            ("g-0", "cw-1", "RETURNED", 95.0, now - timedelta(days=2, hours=3)),
+            ("g-0", "cw-2", "TURNED_IN", None, now - timedelta(hours=1)),
+            ("g-1", "cw-1", "TURNED_IN", 55.0, now - timedelta(days=1)),
+            ("g-1", "cw-2", "CREATED", None, None),
+        ]
+        for google_user_id, coursework_id, state, grade, turned_in_at in submissions:
+            session.add(
+                CourseSubmission(
+                    id=f"{google_user_id}:{coursework_id}", course_id="report-course",
+                    coursework_id=coursework_id, google_user_id=google_user_id, state=state,
+                    late=turned_in_at is not None and coursework_id == "cw-1" and google_user_id == "g-1",
+                    assigned_grade=grade, turned_in_at=turned_in_at,
+                )
+            )
+        await session.commit()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("rolled_up", [False, True])
+async def test_comprehensive_report_sections(async_client, session_factory, rolled_up):
+    token = await bootstrap_admin(async_client, session_factory)
+    await seed_course(session_factory)
+    if rolled_up:
+        async with session_factory() as session:
+            await course_metrics_repo.rebuild(session, "report-course")
+            await session.commit()
+
+    response = await async_client.get(
+        "/api/v1/course-reports/report-course/comprehensive",
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    assert response.status_code == 200
+    report = response.json()["report"]
+
+    summary = report["summary_metrics"]
+    assert summary["total_students"] == 3
+    assert summary["total_submissions"] == 4
+    assert summary["submitted_count"] == 3
+    assert summary["draft_count"] == 1
+    assert summary["late_submissions"] == 1
+    assert summary["students_with_no_submissions"] == 1
+    assert summary["completion_rate"] == 50.0
+
+    assignments = {row["id"]: row for row in report["assignments_analysis"]["assignments"]}
+    assert assignments["cw-1"]["submitted_count"] == 2
+    assert assignments["cw-1"]["average_grade"] == 75.0
+    assert assignments["cw-2"]["draft_count"] == 1
+
+    students = {row["google_user_id"]: row for row in report["students_overview"]["students"]}
+    assert students["g-0"]["completed_submissions"] == 2
+    assert students["g-2"]["total_submissions"] == 0
+
+    grades = report["grade_analysis"]
+    assert grades["total_graded"] == 2 and grades["passing_rate"] == 50.0
+    time_analysis = report["time_analysis"]
+    assert time_analysis["total_analyzed"] == 3
+    assert sum(time_analysis["day_distribution"].values()) == 3
+    assert time_analysis["last_minute_submissions"] == 1
+
+    alerts = report["alerts_and_recommendations"]["summary"]
+    # g-1 and g-2 completed less than 60%; cw-2 is due tomorrow with 1/3 turned in.
+    assert alerts["students_at_risk"] == 2
+    assert alerts["total_alerts"] == 3
+
+
+@pytest.mark.asyncio
+async def test_export_csv_uses_the_same_tallies(async_client, session_factory):
+    token = await bootstrap_admin(async_client, session_factory)
+    await seed_course(session_factory)
+
+    response = await async_client.get(
+        "/api/v1/course-reports/report-course/export-csv",
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    assert response.status_code == 200
+    lines = response.text.splitlines()
+    assert "Entregas Finalizadas,3" in lines
+    assert "Alumno 0,alumno0@example.com,2,2,0,0,100.0,0,0,50.0" in lines
+    assert any(line.startswith("TP 1,") and line.endswith(",2,2,0,1,66.7,75.0") for line in lines)
+
+
+@pytest.mark.asyncio
+async def test_aggregates_bucket_turn_ins_by_weekday_and_week(session_factory):
+    from app.repositories import course_report_aggregates as aggregates_repo
+
+    async with session_factory() as session:
+        session.add(Course(id="agg-course", name="Geografía"))
+        # 2024-01-07 was a Sunday, 2024-01-08 a Monday
+        turn_ins = [datetime(2024, 1, 7, 10), datetime(2024, 1, 8, 10), datetime(2024, 1, 8, 18)]
+        for index, turned_in_at in enumerate(turn_ins):
+            session.add(
+                CourseSubmission(
+                    id=f"agg-{index}", course_id="agg-course", coursework_id="cw-agg",
+                    google_user_id=f"g-{index}", state="TURNED_IN",
+                    assigned_grade=float(50 + index * 20), turned_in_at=turned_in_at,
+                )
+            )
+        await session.commit()
+
+        histogram = await aggregates_repo.completed_turn_in_histogram(session, "agg-course")
+        assert [tuple(row) for row in histogram] == [(0, 10, 1), (1, 10, 1), (1, 18, 1)]
+        weeks = await aggregates_repo.turn_ins_per_week(session, "agg-course")
+        assert [tuple(row) for row in weeks] == [("2024-01-01", 1), ("2024-01-08", 2)]
+        stats = await aggregates_repo.grade_stats(session, "agg-course")
+        assert stats["count"] == 3 and stats["median"] == 70.0
+        assert stats["buckets"]["F (<60)"] == 1 and stats["buckets"]["A (90-100)"] == 1
+
+
+@pytest.mark.asyncio
+async def test_comprehensive_report_is_cached_until_the_course_changes(async_client, session_factory):
+    token = await bootstrap_admin(async_client, session_factory)
+    await seed_course(session_factory)
+    headers = {"Authorization": f"Bearer {token}"}
+    url = "/api/v1/course-reports/report-course/comprehensive"
+
+    first = await async_client.get(url, headers=headers)
+    etag = first.headers["etag"]
+    second = await async_client.get(url, headers=headers)
+    assert second.json()["generated_at"] == first.json()["generated_at"]
+
+    not_modified = await async_client.get(url, headers={**headers, "If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.headers["etag"] == etag
+
+    # Other flags are a different entry
+    flags = await async_client.get(url, params={"include_temporal": "false"}, headers=headers)
+    assert "temporal_trends" not in flags.json()["report"]
+
+    attendance = await async_client.post(
+        "/api/v1/attendance/",
+        json={"student_id": "p-0", "course_id": "report-course", "date": "2024-03-01", "status": "present"},
+        headers=headers,
+    )
+    assert attendance.status_code == 201
+    refreshed = await async_client.get(url, headers={**headers, "If-None-Match": etag})
+    assert refreshed.status_code == 200
+    assert refreshed.headers["etag"] != etag
+    assert refreshed.json()["report"]["attendance_analysis"]["total_sessions"] == 1
+
+
+@pytest.mark.asyncio
+async def test_admin_course_edits_invalidate_the_cached_report(async_client, session_factory):
+    token = await bootstrap_admin(async_client, session_factory)
+    await seed_course(session_factory)
+    headers = {"Authorization": f"Bearer {token}"}
+    url = "/api/v1/course-reports/report-course/comprehensive"
+
+    etag = (await async_client.get(url, headers=headers)).headers["etag"]
+    patched = await async_client.patch(
+        "/api/v1/courses/report-course", json={"name": "Historia II"}, headers=headers
+    )
+    assert patched.status_code == 200
+
+    refreshed = await async_client.get(url, headers={**headers, "If-None-Match": etag})
+    assert refreshed.status_code == 200
+    assert refreshed.json()["report"]["course_info"]["name"] == "Historia II"
+
+
+@pytest.mark.asyncio
+async def test_report_cache_expires_and_evicts():
+    from app.services.report_cache import CachedReport, ReportCache
+
+    now = [0.0]
+    cache = ReportCache(max_entries=2, ttl_seconds=60, clock=lambda: now[0])
+    for key in ("a", "b"):
+        await cache.set(key, CachedReport(generated_at=key, report={}))
+    assert await cache.get("a") is not None  # "b" is now the least recently used
+    await cache.set("c", CachedReport(generated_at="c", report={}))
+    assert await cache.get("b") is None
+
+    now[0] = 61
+    assert await cache.get("a") is None and await cache.get("c") is None
+
+
+@pytest.mark.asyncio
+async def test_assignment_csv_streams_every_student(async_client, session_factory):
+    token = await bootstrap_admin(async_client, session_factory)
+    await seed_course(session_factory)
+
+    response = await async_client.get("/api/v1/assignment-export/cw-1/csv", params={"token": token})
+    assert response.status_code == 200
+    assert response.headers["content-disposition"].startswith('attachment; filename="tarea_TP 1_')
+    lines = response.text.splitlines()
+    assert lines[0].startswith("Nombre del Estudiante,Email,")
+    rows = {line.split(",")[0]: line for line in lines[1:]}
+    assert set(rows) == {"Alumno 0", "Alumno 1", "Alumno 2"}
+    assert rows["Alumno 0"].startswith("Alumno 0,alumno0@example.com,Entregada,")
+    assert rows["Alumno 1"].split(",")[4] == "Sí"
+    assert rows["Alumno 2"].endswith(",Sin entregar,No entregada,No,,,NO_SUBMISSION,,")
+
+
+@pytest.mark.asyncio
+async def test_school_csv_lists_students_of_every_course(async_client, session_factory):
+    token = await bootstrap_admin(async_client, session_factory)
+    await seed_course(session_factory)
+    async with session_factory() as session:
+        session.add(Course(id="other-course", name="Arte"))
+        session.add(
+            CourseParticipant(
+                id="p-art", course_id="other-course", google_user_id="g-0",
+                full_name="Alumno 0", role=ParticipantRole.STUDENT,
+            )
+        )
+        await session.commit()
+
+    response = await async_client.get(
+        "/api/v1/course-reports/export-csv", headers={"Authorization": f"Bearer {token}"}
+    )
+    assert response.status_code == 200
+    lines = response.text.splitlines()
+    assert lines[0].startswith("ID Curso,Curso,Nombre,Email,")
+    # Ordered by course name; submissions only count in their own course
+    assert lines[1:] == [
+        "other-course,Arte,Alumno 0,Sin email,0,0,0,0,0,N/A,0,0,0",
+        "report-course,Historia,Alumno 0,alumno0@example.com,2,2,0,0,1,95.0,0,0,0",
+        "report-course,Historia,Alumno 1,alumno1@example.com,2,1,1,1,1,55.0,0,0,0",
+        "report-course,Historia,Alumno 2,alumno2@example.com,0,0,0,0,0,N/A,0,0,0",
+    ]
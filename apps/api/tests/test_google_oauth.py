@@ -0,0 +1,55 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.oauth_credential import UserOAuthCredential
+from app.repositories import oauth_credentials
+from app.services import google_oauth
+
+
+@pytest.mark.asyncio
+async def test_token_manager_refreshes_once_for_concurrent_callers(monkeypatch, session_factory):
+    async with session_factory() as session:
+        session.add(
+            UserOAuthCredential(
+                id="cred-1",
+                user_id="coordinator-1",
+                provider="google",
+                access_token="stale",
+                refresh_token="refresh",
+                token_expires_at=datetime.utcnow() + timedelta(seconds=30),
+            )
+        )
+        await session.commit()
+
+    refreshes = 0
+
+    async def fake_refresh(session, user_id):
+        nonlocal refreshes
+        refreshes += 1
+        await asyncio.sleep(0.01)
+        return await oauth_credentials.upsert_google_credentials(
+            session,
+            user_id=user_id,
+            access_token=f"fresh-{refreshes}",
+            refresh_token=None,
+            expires_at=datetime.utcnow() + timedelta(hours=1),
+        )
+
+    monkeypatch.setattr(google_oauth, "_refresh_google_access_token", fake_refresh)
+    manager = google_oauth.GoogleTokenManager()
+
+    async def get_token() -> str:
+        async with session_factory() as session:
+            return await manager.get_token(session, "coordinator-1")
+
+    tokens = await asyncio.gather(*(get_token() for _ in range(5)))
+    assert tokens == ["fresh-1"] * 5
+    assert refreshes == 1
+
+    assert await get_token() == "fresh-1"
+    assert refreshes == 1
+
+    async with session_factory() as session:
+        assert await manager.get_token(session, "coordinator-1", force_refresh=True) == "fresh-2"
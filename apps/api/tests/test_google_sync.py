@@ -0,0 +1,507 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.models.assignment_announcement import PendingAssignmentAnnouncement
+from app.models.course import Course
+from app.models.course_assignment import CourseAssignment
+from app.models.course_metrics import AssignmentMetrics, CourseMetrics, StudentCourseMetrics
+from app.models.course_participant import CourseParticipant
+from app.models.course_submission import CourseSubmission
+from app.models.course_sync_schedule import CourseSyncSchedule
+from app.models.notification_outbox import NotificationOutbox, OutboxStatus
+from app.models.sync_run import SyncRun
+from app.models.user import User
+from app.models.user_contact import UserContact
+from app.repositories import etag_cache as etag_repo
+from app.repositories import notification_outbox as outbox_repo
+from app.repositories import user_contacts as user_contacts_repo
+from app.services import google_sync, leases
+from app.services.leases import MemoryLeaseBackend
+from app.services.notifications import dispatcher as dispatcher_module
+from app.services.notifications.base import ConsoleNotifier
+from app.services.roster import UserMatchIndex
+from app.services.sync_priority import next_poll_interval
+from app.sync import scheduler
+
+COURSE_IDS = ["sync-course-1", "sync-course-2", "sync-course-3"]
+SUBMISSION_STATE = {"state": "TURNED_IN", "late": False, "updateTime": "2025-09-22T15:30:00Z"}
+
+
+def _fake_payload(url: str, params: dict | None) -> dict:
+    params = params or {}
+    if url.endswith("/courses"):
+        if params.get("teacherId") == "me":
+            return {"courses": [{"id": course_id, "name": f"Curso {course_id}"} for course_id in COURSE_IDS]}
+        return {"courses": []}
+    course_id = url.split("/courses/")[1].split("/")[0]
+    if url.endswith("/students"):
+        return {
+            "students": [
+                {
+                    "userId": f"student-{course_id}",
+                    "profile": {"emailAddress": f"{course_id}@example.com", "name": {"fullName": "Alumno"}},
+                }
+            ]
+        }
+    if url.endswith("/teachers"):
+        return {"teachers": [{"userId": f"teacher-{course_id}", "profile": {"name": {"fullName": "Docente"}}}]}
+    if url.endswith("/courseWork"):
+        return {"courseWork": [{"id": f"cw-{course_id}", "title": "Tarea"}]}
+    if url.endswith("/studentSubmissions"):
+        return {
+            "studentSubmissions": [
+                {
+                    "id": f"ss-{course_id}",
+                    "courseWorkId": f"cw-{course_id}",
+                    "userId": f"student-{course_id}",
+                    "state": SUBMISSION_STATE["state"],
+                    "late": SUBMISSION_STATE["late"],
+                    "updateTime": SUBMISSION_STATE["updateTime"],
+                }
+            ]
+        }
+    return {}
+
+
+@pytest.fixture
+def fake_classroom(monkeypatch, session_factory):
+    calls: list[str] = []
+
+    async def fake_get(client, url, token, *, params=None, etag=None):
+        calls.append(url)
+        return {"not_modified": False, "etag": f"etag-{len(calls)}", "data": _fake_payload(url, params)}
+
+    monkeypatch.setattr(google_sync, "_get", fake_get)
+    monkeypatch.setitem(SUBMISSION_STATE, "state", "TURNED_IN")
+    monkeypatch.setitem(SUBMISSION_STATE, "late", False)
+    monkeypatch.setitem(SUBMISSION_STATE, "updateTime", "2025-09-22T15:30:00Z")
+    monkeypatch.setattr(google_sync, "AsyncSessionLocal", session_factory)
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_full_and_delta_sync_fan_out_per_course(fake_classroom, session_factory):
+    full = await google_sync.sync_full_metadata("token", workers=2)
+    assert full["courses"] == len(COURSE_IDS)
+    assert full["participants"] == 2 * len(COURSE_IDS)
+    assert full["workers"] == 2
+    assert set(full["timings"]) == set(COURSE_IDS)
+
+    delta = await google_sync.sync_delta_courses("token", workers=3)
+    assert set(delta["timings"]) == set(COURSE_IDS)
+
+    async with session_factory() as session:
+        courses = (await session.execute(select(Course))).scalars().all()
+        participants = (await session.execute(select(CourseParticipant))).scalars().all()
+        assignments = (await session.execute(select(CourseAssignment))).scalars().all()
+        submissions = (await session.execute(select(CourseSubmission))).scalars().all()
+
+    assert {course.id for course in courses} == set(COURSE_IDS)
+    assert len(participants) == 2 * len(COURSE_IDS)
+
+    async with session_factory() as session:
+        run = await session.get(SyncRun, full["run_id"])
+    assert run.kind == "full" and run.status == "ok"
+    assert run.courses == len(COURSE_IDS)
+    assert run.rows_inserted == len(COURSE_IDS)
+    assert run.rows_updated == 2 * len(COURSE_IDS)
+    breakdown = json.loads(run.course_breakdown)
+    assert set(breakdown) == set(COURSE_IDS)
+    assert all(stats["db_seconds"] > 0 for stats in breakdown.values())
+    assert len(assignments) == len(COURSE_IDS)
+    assert {submission.course_id for submission in submissions} == set(COURSE_IDS)
+
+
+@pytest.mark.asyncio
+async def test_full_sync_only_bumps_courses_that_changed(fake_classroom, session_factory, monkeypatch):
+    from app.repositories import course_data_versions as data_versions_repo
+
+    async def versions() -> dict[str, int]:
+        async with session_factory() as session:
+            return {course_id: await data_versions_repo.get(session, course_id) for course_id in COURSE_IDS}
+
+    await google_sync.sync_full_metadata("token")
+    before = await versions()
+    assert all(before.values())
+
+    async def unchanged_get(client, url, token, *, params=None, etag=None):
+        if url.endswith("/courses"):
+            return {"not_modified": False, "etag": None, "data": _fake_payload(url, params)}
+        return {"not_modified": True, "etag": etag, "data": None}
+
+    monkeypatch.setattr(google_sync, "_get", unchanged_get)
+    await google_sync.sync_full_metadata("token")
+    assert await versions() == before
+
+    async def renamed_get(client, url, token, *, params=None, etag=None):
+        response = await unchanged_get(client, url, token, params=params, etag=etag)
+        for course in response["data"]["courses"] if url.endswith("/courses") else []:
+            if course["id"] == COURSE_IDS[0]:
+                course["name"] = "Renombrado"
+        return response
+
+    monkeypatch.setattr(google_sync, "_get", renamed_get)
+    await google_sync.sync_full_metadata("token")
+    after = await versions()
+    assert after[COURSE_IDS[0]] == before[COURSE_IDS[0]] + 1
+    assert {course_id: after[course_id] for course_id in COURSE_IDS[1:]} == {
+        course_id: before[course_id] for course_id in COURSE_IDS[1:]
+    }
+
+@pytest.mark.asyncio
+async def test_delta_sync_bulk_upsert_reports_state_changes(fake_classroom, session_factory):
+    await google_sync.sync_full_metadata("token")
+    first = await google_sync.sync_delta_courses("token")
+    assert first["processed"] == 0
+
+    unchanged = await google_sync.sync_delta_courses("token")
+    assert unchanged["processed"] == 0
+
+    SUBMISSION_STATE["state"] = "RETURNED"
+    SUBMISSION_STATE["late"] = True
+    changed = await google_sync.sync_delta_courses("token")
+    assert changed["processed"] == len(COURSE_IDS)
+
+    async with session_factory() as session:
+        submissions = (await session.execute(select(CourseSubmission))).scalars().all()
+
+    assert len(submissions) == len(COURSE_IDS)
+    assert all(submission.state == "RETURNED" and submission.late for submission in submissions)
+
+
+@pytest.mark.asyncio
+async def test_submission_alerts_go_through_the_outbox_once(fake_classroom, session_factory, monkeypatch):
+    await google_sync.sync_full_metadata("token")
+    await google_sync.sync_delta_courses("token")
+
+    SUBMISSION_STATE["late"] = True
+    SUBMISSION_STATE["updateTime"] = "2025-09-23T00:00:00Z"
+    await google_sync.sync_delta_courses("token")
+    await google_sync.sync_delta_courses("token")
+
+    async with session_factory() as session:
+        await outbox_repo.enqueue(
+            session,
+            [{"id": "manual:1", "kind": "manual", "phone": "+5491100000000", "message": "hola"}],
+        )
+        await session.commit()
+        queued = (await session.execute(select(NotificationOutbox))).scalars().all()
+    assert sorted(intent.kind for intent in queued) == ["manual"] + ["submission_late"] * len(COURSE_IDS)
+
+    sent: list[tuple[str, str]] = []
+    failures = iter([RuntimeError("bridge down")])
+
+    class FlakyNotifier(ConsoleNotifier):
+        async def send_message(self, phone, text, *, message_id=None):
+            error = next(failures, None)
+            if error:
+                raise error
+            sent.append((phone, text))
+
+    monkeypatch.setattr(dispatcher_module, "AsyncSessionLocal", session_factory)
+    dispatcher = dispatcher_module.OutboxDispatcher(FlakyNotifier())
+    assert await dispatcher.drain() == len(COURSE_IDS) + 1
+
+    async with session_factory() as session:
+        manual = await session.get(NotificationOutbox, "manual:1")
+        assert manual.status == OutboxStatus.PENDING
+        assert manual.attempts == 1 and manual.last_error == "bridge down"
+        manual.next_attempt_at = manual.created_at
+        await session.commit()
+
+    assert await dispatcher.drain() == 1
+    assert sent == [("+5491100000000", "hola")]
+    async with session_factory() as session:
+        statuses = (await session.execute(select(NotificationOutbox.status))).scalars().all()
+    assert set(statuses) == {OutboxStatus.SENT}
+
+
+@pytest.mark.asyncio
+async def test_deleted_assignments_leave_the_rollups(fake_classroom, session_factory, monkeypatch):
+    await google_sync.sync_full_metadata("token")
+    await google_sync.sync_delta_courses("token")
+    async with session_factory() as session:
+        metrics = await session.get(CourseMetrics, "sync-course-1")
+        assert (metrics.total, metrics.submitted) == (1, 1)
+
+    fake_get = google_sync._get
+
+    async def without_coursework(client, url, token, *, params=None, etag=None):
+        if url.endswith("/courses/sync-course-1/courseWork"):
+            return {"not_modified": False, "etag": "gone", "data": {"courseWork": []}}
+        return await fake_get(client, url, token, params=params, etag=etag)
+
+    monkeypatch.setattr(google_sync, "_get", without_coursework)
+    await google_sync.sync_full_metadata("token")
+
+    async with session_factory() as session:
+        submissions = (await session.execute(select(CourseSubmission.course_id))).scalars().all()
+        assert "sync-course-1" not in submissions
+        metrics = await session.get(CourseMetrics, "sync-course-1")
+        assert (metrics.total, metrics.submitted) == (0, 0)
+        student = await session.get(
+            StudentCourseMetrics, {"course_id": "sync-course-1", "google_user_id": "student-sync-course-1"}
+        )
+        assert student.total == 0
+        assignment = await session.get(
+            AssignmentMetrics, {"course_id": "sync-course-1", "coursework_id": "cw-sync-course-1"}
+        )
+        assert assignment.total == 0
+        untouched = await session.get(CourseMetrics, "sync-course-2")
+        assert untouched.total == 1
+
+
+@pytest.mark.asyncio
+async def test_new_assignments_are_announced_only_once_their_course_commits(
+    fake_classroom, session_factory, monkeypatch
+):
+    async with session_factory() as session:
+        for position, course_id in enumerate(COURSE_IDS):
+            session.add(
+                User(
+                    id=f"user-{position}",
+                    name=f"Alumno {position}",
+                    email=f"{course_id}@example.com",
+                    hashed_password="x",
+                )
+            )
+        await session.commit()
+
+    fake_get = google_sync._get
+
+    async def coursework_down(client, url, token, *, params=None, etag=None):
+        if url.endswith("/courses/sync-course-2/courseWork"):
+            raise RuntimeError("classroom down")
+        return await fake_get(client, url, token, params=params, etag=etag)
+
+    monkeypatch.setattr(google_sync, "_get", coursework_down)
+    first = await google_sync.sync_full_metadata("token")
+    assert first["notified_students"] == 2
+
+    monkeypatch.setattr(google_sync, "_get", fake_get)
+    second = await google_sync.sync_full_metadata("token")
+    assert second["notified_students"] == 1
+
+    async with session_factory() as session:
+        intents = (await session.execute(select(NotificationOutbox.id))).scalars().all()
+        pending = (await session.execute(select(PendingAssignmentAnnouncement))).scalars().all()
+    assert sorted(intents) == [
+        f"new_assignment:cw-{course_id}:student-{course_id}" for course_id in COURSE_IDS
+    ]
+    assert pending == []
+
+
+@pytest.mark.asyncio
+async def test_delta_sync_skips_submissions_below_high_water_mark(fake_classroom, session_factory):
+    await google_sync.sync_full_metadata("token")
+    await google_sync.sync_delta_courses("token")
+
+    SUBMISSION_STATE["state"] = "RETURNED"
+    SUBMISSION_STATE["updateTime"] = "2025-09-01T00:00:00Z"
+    stale = await google_sync.sync_delta_courses("token")
+    assert stale["processed"] == 0
+
+    SUBMISSION_STATE["updateTime"] = "2025-09-23T00:00:00Z"
+    fresh = await google_sync.sync_delta_courses("token")
+    assert fresh["processed"] == len(COURSE_IDS)
+
+
+@pytest.mark.asyncio
+async def test_collection_stream_revalidates_each_page(monkeypatch, session_factory):
+    pages = {
+        None: {"etag": "e1", "data": {"items": [{"id": "a"}, {"id": "b"}], "nextPageToken": "p2"}},
+        "p2": {"etag": "e2", "data": {"items": [{"id": "c"}], "nextPageToken": "p3"}},
+        "p3": {"etag": "e3", "data": {"items": [{"id": "d"}]}},
+    }
+    requested: list[tuple[str | None, str | None]] = []
+
+    async def fake_get(client, url, token, *, params=None, etag=None):
+        page_token = (params or {}).get("pageToken")
+        requested.append((page_token, etag))
+        page = pages[page_token]
+        if etag == page["etag"]:
+            return {"not_modified": True, "etag": etag, "data": None}
+        return {"not_modified": False, "etag": page["etag"], "data": page["data"]}
+
+    monkeypatch.setattr(google_sync, "_get", fake_get)
+
+    def stream(session, *, complete=False):
+        return google_sync.CollectionStream(
+            session,
+            None,
+            "token",
+            "course",
+            "items",
+            "https://example.test/items",
+            root_key="items",
+            params={},
+            complete=complete,
+        )
+
+    async with session_factory() as session:
+        first = stream(session)
+        assert [[item["id"] for item in page] async for page in first] == [["a", "b"], ["c"], ["d"]]
+        assert first.modified
+        assert requested == [(None, None), ("p2", None), ("p3", None)]
+
+        requested.clear()
+        unchanged = stream(session)
+        assert [page async for page in unchanged] == []
+        assert not unchanged.modified
+        assert requested == [(None, "e1"), ("p2", "e2"), ("p3", "e3")]
+
+        pages["p3"] = {"etag": "e3b", "data": {"items": [{"id": "d"}, {"id": "e"}]}}
+        later_change = stream(session)
+        assert [[item["id"] for item in page] async for page in later_change] == [["d", "e"]]
+        assert later_change.modified
+        assert await etag_repo.get(session, "course", "items", "p3") == "e3b"
+
+        pages["p2"] = {"etag": "e2b", "data": {"items": [{"id": "x"}], "nextPageToken": "p3"}}
+        complete = stream(session, complete=True)
+        seen = [[item["id"] for item in page] async for page in complete]
+        assert seen == [["x"], ["a", "b"], ["d", "e"]]
+
+
+@pytest.mark.asyncio
+async def test_scheduler_cycle_syncs_shared_courses_once(fake_classroom, session_factory):
+    async def token_provider():
+        return [("coordinator-1", "token-1"), ("coordinator-2", "token-2"), ("busy", "token-3")]
+
+    busy = scheduler._user_locks.setdefault("busy", asyncio.Lock())
+    async with busy:
+        metrics = await scheduler.run_cycle(
+            "full",
+            token_provider,
+            google_sync.sync_full_metadata,
+            interval=scheduler.FULL_INTERVAL,
+            workers=2,
+            backend=MemoryLeaseBackend(),
+        )
+
+    assert metrics["users"] == 2
+    assert metrics["skipped_users"] == ["busy"]
+    assert metrics["courses"] == len(COURSE_IDS)
+    assert metrics["deduplicated"] == len(COURSE_IDS)
+    assert set(metrics["user_timings"]) == {"coordinator-1", "coordinator-2"}
+    roster_calls = [url for url in fake_classroom if url.endswith("/students")]
+    assert len(roster_calls) == len(COURSE_IDS)
+
+
+@pytest.mark.asyncio
+async def test_database_leases_give_each_course_a_single_owner(monkeypatch, session_factory):
+    monkeypatch.setattr(leases, "AsyncSessionLocal", session_factory)
+    backend = leases.DatabaseLeaseBackend()
+    replica_a = leases.CycleClaims("delta", ttl=60, backend=backend, owner="replica-a")
+    replica_b = leases.CycleClaims("delta", ttl=60, backend=backend, owner="replica-b")
+
+    assert await replica_a.claim("course-1")
+    assert not await replica_a.claim("course-1")
+    assert not await replica_b.claim("course-1")
+    assert await replica_b.claim("course-2")
+
+    assert await backend.acquire("classroom:delta:course:course-1", "replica-a", 60)
+    await backend.release("classroom:delta:course:course-1", "replica-a")
+    assert await backend.acquire("classroom:delta:course:course-1", "replica-b", 60)
+    assert not await backend.acquire("classroom:delta:course:course-1", "replica-a", 60)
+    assert await backend.acquire("classroom:delta:course:course-3", "replica-a", 0)
+    assert await backend.acquire("classroom:delta:course:course-3", "replica-b", 60)
+
+
+@pytest.mark.asyncio
+async def test_adaptive_delta_sync_defers_courses_until_due(fake_classroom, session_factory):
+    await google_sync.sync_full_metadata("token")
+    first = await google_sync.sync_delta_courses("adaptive-token", adaptive=True)
+    assert first["deferred"] == 0
+    assert set(first["timings"]) == set(COURSE_IDS)
+
+    fake_classroom.clear()
+    second = await google_sync.sync_delta_courses("adaptive-token", adaptive=True)
+    assert second["deferred"] == len(COURSE_IDS)
+    assert second["timings"] == {}
+    assert fake_classroom == []
+
+    async with session_factory() as session:
+        schedules = (await session.execute(select(CourseSyncSchedule))).scalars().all()
+    assert {schedule.course_id for schedule in schedules} == set(COURSE_IDS)
+
+
+
+@pytest.mark.asyncio
+async def test_idle_scheduler_ticks_stay_out_of_the_run_ledger(fake_classroom, session_factory):
+    from app.repositories import sync_runs as sync_runs_repo
+
+    await google_sync.sync_full_metadata("token")
+    busy = await google_sync.sync_delta_courses("idle-token", adaptive=True, trigger="scheduler")
+    idle = await google_sync.sync_delta_courses("idle-token", adaptive=True, trigger="scheduler")
+    assert "run_id" in busy and "run_id" not in idle
+    manual = await google_sync.sync_delta_courses("idle-token", adaptive=True)
+    assert manual["timings"] == {} and "run_id" in manual
+
+    async with session_factory() as session:
+        old = await session.get(SyncRun, busy["run_id"])
+        old.started_at = datetime.utcnow() - timedelta(days=settings.sync_run_retention_days + 1)
+        await session.commit()
+    assert await google_sync.prune_sync_runs() == 1
+    async with session_factory() as session:
+        remaining = await sync_runs_repo.list_runs(session)
+    remaining_ids = {run.id for run in remaining}
+    assert manual["run_id"] in remaining_ids and busy["run_id"] not in remaining_ids
+
+def test_poll_interval_tracks_activity_and_due_dates():
+    now = datetime(2025, 9, 22, 12, 0)
+    previous = CourseSyncSchedule(
+        course_id="c", change_rate=0.0, interval_seconds=300, last_synced_at=now - timedelta(minutes=5)
+    )
+
+    _, hot = next_poll_interval(previous, 50, now)
+    assert hot == settings.classroom_poll_min_seconds
+
+    _, dormant = next_poll_interval(previous, 0, now)
+    assert dormant == 600
+    previous.interval_seconds = settings.classroom_poll_max_seconds
+    _, capped = next_poll_interval(previous, 0, now)
+    assert capped == settings.classroom_poll_max_seconds
+
+    _, due_soon = next_poll_interval(previous, 0, now, nearest_due_at=now + timedelta(hours=3))
+    assert due_soon == 2 * settings.classroom_poll_min_seconds
+
+
+def test_user_match_index_prefers_email_and_skips_homonyms():
+    index = UserMatchIndex(
+        [
+            ("u1", "ana@example.com", "Ana Pérez"),
+            ("u2", "otra@example.com", "Juan Gómez"),
+            ("u3", "juan@example.com", "juan gómez"),
+        ]
+    )
+    assert index.match("ANA@example.com", "Otro Nombre") == "u1"
+    assert index.match(None, " ana pérez ") == "u1"
+    assert index.match("nadie@example.com", "Juan Gómez") is None
+    assert index.match(None, None) is None
+
+
+@pytest.mark.asyncio
+async def test_contact_prepass_creates_missing_contacts_and_returns_phones(session_factory):
+    async with session_factory() as session:
+        session.add(UserContact(user_id="user-1", email="uno@example.com", phone_e164="+5491100000001"))
+        await session.commit()
+
+        emails = {"user-1": "uno@example.com", "user-2": "Dos@Example.com", "user-3": None}
+        phone_map = await user_contacts_repo.ensure_contacts(session, emails)
+        await session.commit()
+        assert phone_map == {"user-1": "+5491100000001"}
+
+        contacts = {
+            contact.user_id: contact
+            for contact in (await session.execute(select(UserContact))).scalars().all()
+        }
+    assert set(contacts) == {"user-1", "user-2", "user-3"}
+    assert contacts["user-2"].email == "dos@example.com" and contacts["user-2"].phone_e164 is None
+
+    async with session_factory() as session:
+        assert await user_contacts_repo.ensure_contacts(session, emails) == phone_map
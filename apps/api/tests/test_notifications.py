@@ -0,0 +1,257 @@
+import asyncio
+import json
+from datetime import datetime
+
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.models.course_participant import CourseParticipant, ParticipantRole
+from app.models.notification_outbox import NotificationOutbox, OutboxStatus
+from app.models.user_contact import UserContact
+from app.repositories import notification_outbox as outbox_repo
+from app.services.assignment_digest import AssignmentDigest, NewAssignment
+from app.services.leases import PROCESS_OWNER
+from app.services.notifications import dispatcher as dispatcher_module
+from app.services.notifications import redis_wa
+from app.services.notifications.base import ConsoleNotifier, OutboundMessage
+from app.services.notifications.hub import InProcessBackplane, NotificationHub
+from app.services.notifications.redis_wa import RedisWhatsAppNotifier
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def lpush(self, queue, *values):
+        self.commands.append((queue, values))
+
+    async def execute(self):
+        if self.redis.down:
+            raise RedisConnectionError("redis down")
+        self.redis.round_trips += 1
+        for queue, values in self.commands:
+            self.redis.queues.setdefault(queue, [])[:0] = reversed(values)
+
+
+class FakeRedis:
+    def __init__(self, down=False):
+        self.down = down
+        self.round_trips = 0
+        self.queues = {}
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class RecordingNotifier(ConsoleNotifier):
+    def __init__(self):
+        self.sent = []
+
+    async def send_message(self, phone, text, *, message_id=None):
+        self.sent.append((phone, text, message_id))
+
+
+@pytest.mark.asyncio
+async def test_redis_notifier_pipelines_jobs_with_unique_ids(monkeypatch):
+    monkeypatch.setattr(redis_wa, "LPUSH_CHUNK", 100)
+    redis = FakeRedis()
+    notifier = RedisWhatsAppNotifier(redis, "whatsapp:pending")
+
+    errors = await notifier.send_bulk(
+        [OutboundMessage(f"+54911{index:08d}", "Nueva tarea") for index in range(300)]
+    )
+
+    assert errors == [None] * 300
+    assert redis.round_trips == 1
+    jobs = [json.loads(payload) for payload in redis.queues["whatsapp:pending"]]
+    assert len(jobs) == 300
+    assert len({job["id"] for job in jobs}) == 300
+    # BRPOP takes from the tail, so the first job queued is the first delivered.
+    assert jobs[-1]["recipient"]["phone"] == "+5491100000000"
+    assert jobs[0]["message"] == {"type": "text", "text": "Nueva tarea"}
+
+
+@pytest.mark.asyncio
+async def test_redis_notifier_falls_back_to_http_when_redis_is_down():
+    fallback = RecordingNotifier()
+    notifier = RedisWhatsAppNotifier(FakeRedis(down=True), "whatsapp:pending", fallback=fallback)
+
+    await notifier.send_message("+5491100000000", "hola", message_id="outbox-1")
+
+    assert fallback.sent == [("+5491100000000", "hola", "outbox-1")]
+
+    with pytest.raises(RedisConnectionError):
+        await RedisWhatsAppNotifier(FakeRedis(down=True), "whatsapp:pending").send_message(
+            "+5491100000000", "hola"
+        )
+
+
+@pytest.mark.asyncio
+async def test_assignment_digest_sends_one_message_per_student(session_factory):
+    async with session_factory() as session:
+        for course_id, google_user_id, matched_user_id in (
+            ("course-a", "g-ana", "user-ana"),
+            ("course-b", "g-ana", "user-ana"),
+            ("course-b", "g-beto", "user-beto"),
+            ("course-c", "g-carla", None),
+        ):
+            session.add(
+                CourseParticipant(
+                    id=f"{course_id}:{google_user_id}",
+                    course_id=course_id,
+                    google_user_id=google_user_id,
+                    email=f"{google_user_id}@example.com",
+                    role=ParticipantRole.STUDENT,
+                    matched_user_id=matched_user_id,
+                )
+            )
+        session.add(UserContact(user_id="user-ana", phone_e164="+5491100000001"))
+        await session.commit()
+
+    digest = AssignmentDigest()
+    digest.add(NewAssignment("cw-1", "course-a", "TP 1", due_at=datetime(2025, 10, 1, 23, 59)))
+    digest.add(NewAssignment("cw-2", "course-a", "TP 2"))
+    digest.add(NewAssignment("cw-3", "course-b", "Lectura", max_points=10))
+    # Nobody in course-c has linked an account, so it is not announced.
+    digest.add(NewAssignment("cw-4", "course-c", "Quiz"))
+
+    async with session_factory() as session:
+        assert await digest.enqueue(session) == 2
+        await session.commit()
+        # A rerun of the same cycle does not queue anything new.
+        await digest.enqueue(session)
+        await session.commit()
+        intents = {
+            intent.user_id: intent
+            for intent in (await session.execute(select(NotificationOutbox))).scalars().all()
+        }
+
+    assert set(intents) == {"user-ana", "user-beto"}
+    ana = intents["user-ana"]
+    assert ana.kind == "assignment_digest" and ana.phone == "+5491100000001"
+    assert "3 tareas nuevas" in ana.message
+    assert ana.message.index("TP 1") < ana.message.index("Lectura")
+    beto = intents["user-beto"]
+    assert beto.id == "new_assignment:cw-3:g-beto"
+    assert beto.phone is None and beto.email == "g-beto@example.com"
+    assert "Lectura" in beto.message and "🏆 Puntos: 10" in beto.message
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_commits_the_claim_before_sending(session_factory, monkeypatch):
+    monkeypatch.setattr(dispatcher_module, "AsyncSessionLocal", session_factory)
+    async with session_factory() as session:
+        await outbox_repo.enqueue(
+            session,
+            [
+                {"id": "claim:1", "kind": "manual", "phone": "+5491100000001", "message": "uno"},
+                {"id": "claim:2", "kind": "manual", "phone": "+5491100000002", "message": "dos"},
+            ],
+        )
+        await session.commit()
+
+    class CheckingNotifier(ConsoleNotifier):
+        async def send_message(self, phone, text, *, message_id=None):
+            # Another session already sees the committed claim while we send
+            async with session_factory() as session:
+                intent = await session.get(NotificationOutbox, message_id)
+                assert intent.locked_by == PROCESS_OWNER
+                if message_id == "claim:2":
+                    # Lease lost meanwhile: another dispatcher owns the intent now
+                    intent.locked_by = "other-dispatcher"
+                    await session.commit()
+
+    assert await dispatcher_module.OutboxDispatcher(CheckingNotifier()).drain() == 2
+
+    async with session_factory() as session:
+        sent = await session.get(NotificationOutbox, "claim:1")
+        taken = await session.get(NotificationOutbox, "claim:2")
+    assert sent.status == OutboxStatus.SENT and sent.locked_by is None
+    assert taken.status == OutboxStatus.PENDING and taken.locked_by == "other-dispatcher"
+
+
+class FakeWebSocket:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.received = []
+        self.closed_with = None
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        await asyncio.sleep(self.delay)
+        self.received.append(json.loads(text))
+
+    async def close(self, code=1000):
+        self.closed_with = code
+
+
+class SharedBus:
+    """Stands in for Redis pub/sub: every subscribed hub gets every message."""
+
+    def __init__(self):
+        self.subscribers = []
+
+    def backplane(self):
+        bus = self
+
+        class _Backplane:
+            async def start(self, deliver):
+                bus.subscribers.append(deliver)
+
+            async def stop(self):
+                pass
+
+            async def publish(self, channel, text):
+                for deliver in bus.subscribers:
+                    deliver(channel, text)
+
+        return _Backplane()
+
+
+@pytest.mark.asyncio
+async def test_hub_broadcast_reaches_other_processes_without_waiting_for_slow_clients(monkeypatch):
+    monkeypatch.setattr(settings, "notification_ws_send_timeout", 0.2)
+    bus = SharedBus()
+    hub_a, hub_b = NotificationHub(bus.backplane()), NotificationHub(bus.backplane())
+    fast, slow, remote = FakeWebSocket(), FakeWebSocket(delay=1.0), FakeWebSocket()
+    await hub_a.connect(fast, "student-1")
+    await hub_a.connect(slow, "student-1")
+    await hub_b.connect(remote, "student-1")
+
+    await asyncio.wait_for(
+        hub_a.broadcast("student-1", {"event": "created", "at": datetime(2025, 1, 1)}), timeout=0.1
+    )
+    await asyncio.sleep(0.3)
+
+    assert fast.received == remote.received == [{"event": "created", "at": "2025-01-01T00:00:00"}]
+    # The slow client timed out and was dropped instead of holding the others back.
+    assert slow.closed_with == 1013
+    await hub_a.stop()
+    await hub_b.stop()
+
+
+@pytest.mark.asyncio
+async def test_hub_queue_is_bounded_and_drops_oldest(monkeypatch):
+    monkeypatch.setattr(settings, "notification_ws_queue_size", 2)
+    hub = NotificationHub(InProcessBackplane())
+    websocket = FakeWebSocket(delay=0.01)
+    await hub.connect(websocket, "student-1")
+
+    for index in range(5):
+        await hub.broadcast("student-1", {"n": index})
+    await asyncio.sleep(0.1)
+
+    # Broadcasting never waited for the socket: only the two newest messages survived.
+    assert [message["n"] for message in websocket.received] == [3, 4]
+    await hub.stop()
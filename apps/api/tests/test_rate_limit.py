@@ -0,0 +1,68 @@
+import httpx
+import pytest
+from tenacity import wait_none
+
+from app.services import google_classroom, rate_limit
+
+
+@pytest.mark.asyncio
+async def test_send_with_backoff_honours_retry_after_and_shrinks_window(monkeypatch):
+    responses = [
+        httpx.Response(429, headers={"retry-after": "0"}),
+        httpx.Response(503),
+        httpx.Response(200, json={"ok": True}),
+    ]
+    calls = 0
+
+    async def send() -> httpx.Response:
+        nonlocal calls
+        calls += 1
+        return responses.pop(0)
+
+    limiter = rate_limit.AdaptiveLimiter(rate=100.0, burst=10, max_concurrency=8)
+    monkeypatch.setitem(rate_limit._limiters, "user:limited", limiter)
+    monkeypatch.setattr(rate_limit, "DEFAULT_BACKOFF_SECONDS", 0.0)
+
+    with rate_limit.quota_scope("limited"):
+        response = await rate_limit.send_with_backoff("token", send, attempts=3)
+
+    assert response.status_code == 200
+    assert calls == 3
+    assert 2.0 <= limiter.window < 8.0
+    assert limiter.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_send_with_backoff_returns_last_throttled_response():
+    async def send() -> httpx.Response:
+        return httpx.Response(429, headers={"retry-after": "0"})
+
+    with rate_limit.quota_scope("always-throttled"):
+        response = await rate_limit.send_with_backoff("token", send, attempts=2)
+
+    assert response.status_code == 429
+    assert rate_limit.get_limiter("user:always-throttled").window == 3.0
+
+
+@pytest.mark.asyncio
+async def test_classroom_requests_only_retry_transport_errors_on_top_of_backoff(monkeypatch):
+    calls = 0
+    failures = [httpx.ConnectError("reset")]
+
+    class FakeClient:
+        async def request(self, method, url, **kwargs):
+            nonlocal calls
+            calls += 1
+            if failures:
+                raise failures.pop()
+            return httpx.Response(429, headers={"retry-after": "0"}, request=httpx.Request(method, url))
+
+    monkeypatch.setattr(google_classroom, "get_http_client", lambda: FakeClient())
+    monkeypatch.setattr(google_classroom.GoogleClassroomService._request.retry, "wait", wait_none())
+    monkeypatch.setattr(rate_limit.settings, "google_throttle_retries", 2)
+
+    with rate_limit.quota_scope("classroom-throttled"), pytest.raises(httpx.HTTPStatusError):
+        await google_classroom.GoogleClassroomService()._request("GET", "/courses", "token")
+
+    # One dropped connection, then the 429s are only retried by send_with_backoff
+    assert calls == 1 + 2
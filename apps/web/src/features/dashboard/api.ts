@@ -64,10 +64,38 @@ export async function fetchAttendance(params?: { studentId?: string; date?: stri
   return response;
 }
 
-export async function syncClassroomCourses(accessToken: string) {
-  return apiPost<{ items: Course[]; count: number }>(
+type ClassroomSyncJob = {
+  id: string;
+  status: "queued" | "running" | "succeeded" | "failed";
+  total_courses: number;
+  completed_courses: number;
+  progress: Record<string, { status: string; participants?: number; assignments?: number; submissions?: number }> | null;
+  result: { items: Course[]; count: number; participants: number; assignments: number; submissions: number } | null;
+  error: string | null;
+};
+
+const SYNC_POLL_INTERVAL_MS = 1500;
+
+export async function fetchClassroomSyncJob(jobId: string) {
+  return apiGet<ClassroomSyncJob>(`/api/v1/classroom/sync/jobs/${jobId}`);
+}
+
+export async function syncClassroomCourses(
+  accessToken: string,
+  onProgress?: (job: ClassroomSyncJob) => void
+) {
+  let job = await apiPost<ClassroomSyncJob>(
     "/api/v1/classroom/sync",
     {},
     { headers: { "X-Goog-Access-Token": accessToken } }
   );
+  while (job.status === "queued" || job.status === "running") {
+    onProgress?.(job);
+    await new Promise((resolve) => setTimeout(resolve, SYNC_POLL_INTERVAL_MS));
+    job = await fetchClassroomSyncJob(job.id);
+  }
+  if (job.status === "failed" || !job.result) {
+    throw new Error(job.error ?? "No se pudo sincronizar Classroom");
+  }
+  return job.result;
 }
@@ -13,6 +13,8 @@ const redisUrl = process.env.REDIS_URL || 'redis://redis:6379';
 const queueName = process.env.WHATSAPP_QUEUE || 'whatsapp:pending';
 const failedQueueName = process.env.WHATSAPP_FAILED_QUEUE || `${queueName}:failed`;
 const maxRetries = Number.parseInt(process.env.WHATSAPP_MAX_RETRIES || '5', 10);
+const dedupPrefix = process.env.WHATSAPP_DEDUP_PREFIX || `${queueName}:delivered:`;
+const dedupTtlSeconds = Number.parseInt(process.env.WHATSAPP_DEDUP_TTL_SECONDS || '604800', 10);
 const sessionDir = process.env.WHATSAPP_SESSION_DIR || path.join(__dirname, 'session-data');
 const clientId = process.env.WHATSAPP_CLIENT_ID || 'nerdeala';
 const defaultChromiumPath = '/usr/bin/chromium-browser';
@@ -130,6 +132,14 @@ async function processQueueJob(job) {
   await client.sendMessage(recipientPhone, text.trim());
 }
 
+// The job id is the idempotency key: the API reuses its outbox id when it
+// redelivers, so a job id that was already sent (or is being sent) is dropped.
+async function claimJobId(job) {
+  if (!job.id) return true;
+  const claimed = await redis.set(`${dedupPrefix}${job.id}`, 'sending', 'EX', dedupTtlSeconds, 'NX');
+  return claimed === 'OK';
+}
+
 async function handleJobPayload(payload) {
   let job;
   try {
@@ -150,7 +160,19 @@ async function handleJobPayload(payload) {
       return;
     }
 
-    await processQueueJob(job);
+    if (!(await claimJobId(job))) {
+      log(`job ${job.id} already delivered, duplicate dropped`);
+      return;
+    }
+
+    try {
+      await processQueueJob(job);
+    } catch (error) {
+      // Not sent: free the id so the retry below can claim it again
+      if (job.id) await redis.del(`${dedupPrefix}${job.id}`);
+      throw error;
+    }
+    if (job.id) await redis.set(`${dedupPrefix}${job.id}`, 'sent', 'EX', dedupTtlSeconds);
     log(`job ${job.id || 'unknown'} processed successfully`);
   } catch (error) {
     const retries = Number.parseInt(job.metadata.retries || 0, 10) + 1;